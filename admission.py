@@ -0,0 +1,191 @@
+"""
+Command Admission
+Per-user / per-guild rate limits and fair queuing for expensive slash commands
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+import metrics
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class Rejected(Exception):
+    """A request that wasn't admitted; `retry_after` is None when retrying won't help soon"""
+
+    def __init__(self, reason: str, retry_after: float = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """One admitted request waiting for (or holding) an execution slot"""
+
+    __slots__ = ('user_id', 'pro', 'granted', 'enqueued_at', 'released')
+
+    def __init__(self, user_id: int, pro: bool):
+        self.user_id = user_id
+        self.pro = pro
+        self.granted = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.released = False
+
+
+class AdmissionController:
+    """
+    Gatekeeper for one expensive command
+
+    A request first spends a token from its user's bucket and its guild's
+    bucket (`user_rate` / `guild_rate` per `per` seconds; Pro users get
+    `pro_user_rate`), else it's rejected with a retry time. Admitted requests
+    wait for one of `concurrency` execution slots. Waiting requests are served
+    round-robin across users, so one member queuing several tickers can't
+    starve everyone else, and Pro users have their own lane that is always
+    served first.
+    """
+
+    def __init__(self, name: str, concurrency: int = 2, user_rate: float = 5, pro_user_rate: float = 15,
+                 guild_rate: float = 30, per: float = 60.0, max_queued_per_user: int = 3,
+                 max_buckets: int = 10000):
+        self.name = name
+        self.concurrency = concurrency
+        self.user_rate = user_rate
+        self.pro_user_rate = pro_user_rate
+        self.guild_rate = guild_rate
+        self.per = per
+        self.max_queued_per_user = max_queued_per_user
+        self.max_buckets = max_buckets
+        self.user_buckets: 'OrderedDict[Tuple[int, bool], TokenBucket]' = OrderedDict()
+        self.guild_buckets: 'OrderedDict[int, TokenBucket]' = OrderedDict()
+        self.waiting: Dict[int, Deque[Ticket]] = {}
+        self.lanes: Dict[bool, Deque[int]] = {True: deque(), False: deque()}   # pro -> users in turn order
+        self.active = 0
+
+    def _bucket(self, buckets: OrderedDict, key, rate: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, self.per)
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, user_id: int, guild_id: Optional[int] = None, pro: bool = False) -> Ticket:
+        """Charge the user's and guild's budgets and queue the request (raises Rejected)"""
+        queued = len(self.waiting.get(user_id, ()))
+        if queued >= self.max_queued_per_user:
+            metrics.inc('swarm_admissions_total', command=self.name, outcome='queue_full')
+            raise Rejected(f'you already have {queued} requests waiting')
+
+        user_bucket = self._bucket(self.user_buckets, (user_id, pro), self.pro_user_rate if pro else self.user_rate)
+        guild_bucket = self._bucket(self.guild_buckets, guild_id, self.guild_rate) if guild_id else None
+        # Only spend tokens when both budgets allow it
+        wait = max(user_bucket.delay(), guild_bucket.delay() if guild_bucket else 0.0)
+        if wait > 0:
+            limit = 'user' if user_bucket.delay() > 0 else 'guild'
+            metrics.inc('swarm_admissions_total', command=self.name, outcome=f'{limit}_limited')
+            raise Rejected(f'{limit} rate limit', retry_after=wait)
+        user_bucket.try_acquire()
+        if guild_bucket:
+            guild_bucket.try_acquire()
+
+        ticket = Ticket(user_id, pro)
+        queue = self.waiting.setdefault(user_id, deque())
+        if not queue:
+            self.lanes[pro].append(user_id)
+        queue.append(ticket)
+        self._dispatch()
+        metrics.inc('swarm_admissions_total', command=self.name,
+                    outcome='admitted' if ticket.granted.done() else 'queued')
+        return ticket
+
+    def _dispatch(self):
+        """Hand free slots to waiting requests, Pro lane first, round-robin by user"""
+        while self.active < self.concurrency:
+            lane = self.lanes[True] if self.lanes[True] else self.lanes[False]
+            if not lane:
+                break
+            user_id = lane.popleft()
+            queue = self.waiting[user_id]
+            ticket = queue.popleft()
+            if queue:
+                lane.append(user_id)
+            else:
+                del self.waiting[user_id]
+            self.active += 1
+            ticket.granted.set_result(None)
+        metrics.set_gauge('swarm_queue_depth', self.depth(), queue=f'command:{self.name}')
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self.waiting.values())
+
+    def position(self, ticket: Ticket) -> int:
+        """Requests that will be served before this one (0 once it has a slot)"""
+        if ticket.granted.done():
+            return 0
+        queue = self.waiting.get(ticket.user_id)
+        if not queue or ticket not in queue:
+            return 0
+        turn = queue.index(ticket)          # rounds this user must wait
+        lane = self.lanes[ticket.pro]
+        order = lane.index(ticket.user_id)
+        ahead = 0
+        for i, user_id in enumerate(lane):
+            # Users earlier in the rotation get one more turn before ours comes up
+            ahead += min(len(self.waiting[user_id]), turn + (1 if i < order else 0))
+        if not ticket.pro:
+            ahead += sum(len(self.waiting[user_id]) for user_id in self.lanes[True])
+        return ahead
+
+    def release(self, ticket: Ticket):
+        """Give up a ticket: frees its slot, or drops it from the queue if still waiting"""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.granted.done():
+            self.active -= 1
+        else:
+            ticket.granted.cancel()
+            queue = self.waiting.get(ticket.user_id)
+            if queue and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self.waiting[ticket.user_id]
+                    self.lanes[ticket.pro].remove(ticket.user_id)
+        self._dispatch()
+
+    async def wait(self, ticket: Ticket, on_position=None, update_every: float = 3.0, timeout: float = None):
+        """
+        Wait for a slot, calling `await on_position(n)` whenever the queue position changes
+
+        Raises Rejected (and gives up the place in line) after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        last = None
+        while not ticket.granted.done():
+            position = self.position(ticket)
+            if on_position is not None and position != last:
+                last = position
+                try:
+                    await on_position(position)
+                except Exception as e:
+                    logger.warning(f'Error reporting {self.name} queue position: {e}')
+            remaining = deadline - time.monotonic() if deadline else update_every
+            if remaining <= 0:
+                self.release(ticket)
+                metrics.inc('swarm_admissions_total', command=self.name, outcome='timeout')
+                raise Rejected('queue timeout')
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.granted), min(update_every, remaining))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                self.release(ticket)
+                raise
+        metrics.observe_stage(f'{self.name}_queue_wait', time.monotonic() - ticket.enqueued_at)
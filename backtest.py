@@ -0,0 +1,417 @@
+"""
+SWARM Backtest
+Forward returns, hit rates and hold times for stored alerts, computed with array operations
+"""
+
+import logging
+import os
+import threading
+import warnings
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'backtest_prices.npz'
+
+HORIZONS = (1, 2, 3, 5, 10, 20)   # Trading days after the alert bar
+MARKET_CLOSE_UTC_HOURS = 20       # Daily bars settle at 4 PM ET
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_CLOSE_HOUR = 16            # Alerts from 4 PM ET on can only trade the next session
+COMPACT_DAYS = 100                # Bars returned by outputsize=compact
+_EPOCH = date(1970, 1, 1)
+
+TIERS = ('critical', 'active', 'watchlist')
+
+
+def tier_for_score(score: float) -> str:
+    """Same thresholds post_alert uses to pick a channel"""
+    if score >= 90:
+        return 'critical'
+    if score >= 75:
+        return 'active'
+    return 'watchlist'
+
+
+def _day(value) -> int:
+    """Days since epoch for a date, datetime or 'YYYY-MM-DD' string"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+class PriceHistory:
+    """Daily bars for one symbol as sorted numpy columns"""
+
+    __slots__ = ('dates', 'close', 'high', 'low')
+
+    def __init__(self, dates=None, close=None, high=None, low=None):
+        self.dates = np.asarray(dates if dates is not None else [], dtype=np.int64)
+        self.close = np.asarray(close if close is not None else [], dtype=np.float64)
+        self.high = np.asarray(high if high is not None else [], dtype=np.float64)
+        self.low = np.asarray(low if low is not None else [], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_day(self) -> Optional[int]:
+        return int(self.dates[-1]) if len(self.dates) else None
+
+    def merge(self, time_series: Dict) -> int:
+        """Fold an Alpha Vantage 'Time Series (Daily)' dict in; returns bars added"""
+        bars = {}
+        for day, bar in time_series.items():
+            try:
+                bars[_day(day)] = (float(bar['4. close']), float(bar['2. high']), float(bar['3. low']))
+            except (KeyError, TypeError, ValueError):
+                continue
+        if not bars:
+            return 0
+
+        existing = set(self.dates.tolist())
+        added = sum(1 for day in bars if day not in existing)
+        for day, close, high, low in zip(self.dates.tolist(), self.close.tolist(),
+                                         self.high.tolist(), self.low.tolist()):
+            bars.setdefault(day, (close, high, low))
+
+        days = np.fromiter(sorted(bars), dtype=np.int64, count=len(bars))
+        values = np.array([bars[d] for d in days.tolist()], dtype=np.float64)
+        self.dates, self.close, self.high, self.low = days, values[:, 0], values[:, 1], values[:, 2]
+        return added
+
+
+def entry_days(alert_times: np.ndarray) -> np.ndarray:
+    """
+    Session date (days since epoch) whose close an alert can enter at: its own
+    New York date, or the next one when it fired after the close
+    """
+    def day(timestamp):
+        moment = datetime.fromtimestamp(timestamp, MARKET_TZ)
+        return _day(moment) + (moment.hour >= MARKET_CLOSE_HOUR)
+    return np.fromiter((day(t) for t in alert_times.tolist()), dtype=np.int64, count=len(alert_times))
+
+
+def evaluate(history: PriceHistory, alert_times: np.ndarray, horizons=HORIZONS,
+             target_pct: float = 5.0, stop_pct: float = 3.0, max_hold: int = 10) -> Dict[str, np.ndarray]:
+    """
+    Outcomes for every alert on one symbol at once
+
+    `alert_times` are UTC epoch seconds. Entry is the close of the first bar
+    on/after the alert's session (see entry_days), so an alert that fired
+    after the close never enters at a close it had already missed; a trade exits on the first bar whose high/low
+    touches the target/stop (stop wins ties) or at the close after `max_hold`
+    bars. Returns per-alert columns: `returns` (alerts x horizons, NaN where
+    the bar hasn't printed yet), `resolved`, `win`, `exit_return`, `peak`,
+    `hold_hours` and `settled` (every horizon is known).
+    """
+    count = len(alert_times)
+    bars = len(history)
+    length = max(max(horizons), max_hold)
+    nan = np.full(count, np.nan)
+
+    if not bars or not count:
+        return {
+            'returns': np.full((count, len(horizons)), np.nan), 'resolved': np.zeros(count, bool),
+            'win': np.zeros(count, bool), 'exit_return': nan, 'peak': nan.copy(),
+            'hold_hours': nan.copy(), 'settled': np.zeros(count, bool),
+        }
+
+    entry = np.searchsorted(history.dates, entry_days(alert_times), side='left')
+    has_entry = entry < bars
+    entry_c = np.minimum(entry, bars - 1)
+    entry_price = np.where(has_entry, history.close[entry_c], np.nan)
+
+    index = entry_c[:, None] + np.arange(1, length + 1)[None, :]
+    available = (index < bars) & has_entry[:, None]
+    index = np.minimum(index, bars - 1)
+
+    forward = np.where(available, history.close[index] / entry_price[:, None] - 1, np.nan)
+    returns = forward[:, np.asarray(horizons) - 1]
+
+    hold = slice(0, max_hold)
+    high = np.where(available[:, hold], history.high[index[:, hold]], -np.inf)
+    low = np.where(available[:, hold], history.low[index[:, hold]], np.inf)
+    hit_target = high >= entry_price[:, None] * (1 + target_pct / 100)
+    hit_stop = low <= entry_price[:, None] * (1 - stop_pct / 100)
+
+    never = max_hold + 1
+    first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), never)
+    first_stop = np.where(hit_stop.any(axis=1), hit_stop.argmax(axis=1), never)
+    timed_out = available[:, max_hold - 1] & (first_target == never) & (first_stop == never)
+
+    exit_bar = np.minimum(np.minimum(first_target, first_stop), max_hold - 1)
+    resolved = (first_target < never) | (first_stop < never) | timed_out
+    exit_return = np.select(
+        [first_stop <= first_target, first_target < first_stop],
+        [-stop_pct / 100, target_pct / 100],
+    )
+    exit_return = np.where(timed_out, forward[:, max_hold - 1], exit_return)
+    exit_return = np.where(resolved, exit_return, np.nan)
+    win = resolved & (exit_return > 0)
+
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN rows (no bars yet)
+        peak = np.nanmax(np.where(available[:, hold], high / entry_price[:, None] - 1, np.nan), axis=1)
+    exit_day = history.dates[np.minimum(entry_c + exit_bar + 1, bars - 1)]
+    hold_hours = (exit_day * 86400 + MARKET_CLOSE_UTC_HOURS * 3600 - alert_times) / 3600
+    hold_hours = np.where(resolved, hold_hours, np.nan)
+
+    return {
+        'returns': returns,
+        'resolved': resolved,
+        'win': win,
+        'exit_return': exit_return,
+        'peak': peak,
+        'hold_hours': hold_hours,
+        'settled': available[:, -1],
+    }
+
+
+class Backtester:
+    """
+    Joins stored alerts with the bars that followed them
+
+    Outcomes are recomputed per symbol only when that symbol gets new bars or
+    new alerts, and per-tier statistics are cached until something changes.
+    """
+
+    def __init__(self, horizons=HORIZONS, target_pct: float = None, stop_pct: float = None,
+                 max_hold: int = None, cache_path: str = None):
+        self.horizons = tuple(horizons)
+        self.target_pct = target_pct if target_pct is not None else float(os.getenv('BACKTEST_TARGET_PCT', '5'))
+        self.stop_pct = stop_pct if stop_pct is not None else float(os.getenv('BACKTEST_STOP_PCT', '3'))
+        self.max_hold = max_hold if max_hold is not None else int(os.getenv('BACKTEST_MAX_HOLD_DAYS', '10'))
+        self.cache_path = Path(cache_path or os.getenv('BACKTEST_CACHE_PATH', DEFAULT_CACHE_PATH))
+
+        self.prices: Dict[str, PriceHistory] = {}
+        self.alerts: Dict[str, Dict[str, list]] = {}      # symbol -> {'id', 'time', 'tier'}
+        self.outcomes: Dict[str, Dict[str, np.ndarray]] = {}
+        self.rows: Dict[int, tuple] = {}                   # alert id -> (symbol, row)
+        self.fetched_on: Dict[str, int] = {}
+        self.last_alert_id = 0
+        self.lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+
+    # Alerts and bars
+
+    def add_alerts(self, alerts: List[Dict]):
+        """Register alerts ({'id', 'ticker', 'score', 'created_at'}) and re-evaluate their symbols"""
+        touched = set()
+        with self.lock:
+            for alert in alerts:
+                symbol = alert['ticker']
+                column = self.alerts.setdefault(symbol, {'id': [], 'time': [], 'tier': []})
+                self.rows[alert['id']] = (symbol, len(column['id']))
+                column['id'].append(alert['id'])
+                column['time'].append(alert['created_at'].timestamp()
+                                      if alert['created_at'].tzinfo else
+                                      (alert['created_at'] - datetime(1970, 1, 1)).total_seconds())
+                column['tier'].append(tier_for_score(alert['score'] or 0))
+                self.last_alert_id = max(self.last_alert_id, alert['id'])
+                touched.add(symbol)
+            for symbol in touched:
+                self._evaluate(symbol)
+
+    def add_bars(self, symbol: str, time_series: Dict) -> int:
+        """Merge daily bars for a symbol; re-evaluates its alerts if anything new arrived"""
+        with self.lock:
+            history = self.prices.setdefault(symbol, PriceHistory())
+            added = history.merge(time_series)
+            if added and symbol in self.alerts:
+                self._evaluate(symbol)
+            return added
+
+    def _evaluate(self, symbol: str):
+        column = self.alerts.get(symbol)
+        if not column:
+            return
+        self.outcomes[symbol] = evaluate(
+            self.prices.get(symbol, PriceHistory()), np.asarray(column['time'], dtype=np.float64),
+            self.horizons, self.target_pct, self.stop_pct, self.max_hold,
+        )
+        self._stats.clear()
+
+    def symbols_needing_bars(self, today: int = None) -> Dict[str, str]:
+        """Symbols with unsettled alerts not fetched today -> outputsize to request"""
+        today = today if today is not None else _day(datetime.utcnow())
+        needed = {}
+        with self.lock:
+            for symbol, column in self.alerts.items():
+                outcome = self.outcomes.get(symbol)
+                if outcome is not None and outcome['settled'].all():
+                    continue
+                if self.fetched_on.get(symbol) == today:
+                    continue
+                history = self.prices.get(symbol)
+                if history is not None and len(history):
+                    gap_start = history.last_day
+                else:
+                    gap_start = int(min(column['time']) // 86400)
+                # compact covers ~100 trading days; older gaps need the full series
+                needed[symbol] = 'full' if today - gap_start > COMPACT_DAYS * 7 // 5 else 'compact'
+        return needed
+
+    def refresh(self, db, fetch_daily: Callable[[str, str], Optional[Dict]]) -> int:
+        """
+        Pull new alerts from the database and new bars for unsettled symbols
+
+        `fetch_daily(symbol, outputsize)` returns an Alpha Vantage daily series.
+        Runs off the event loop; returns the number of bars added.
+        """
+        new_alerts = db.get_alerts_since(self.last_alert_id)
+        if new_alerts:
+            self.add_alerts(new_alerts)
+
+        today = _day(datetime.utcnow())
+        added = 0
+        for symbol, outputsize in self.symbols_needing_bars(today).items():
+            series = fetch_daily(symbol, outputsize)
+            if series:
+                added += self.add_bars(symbol, series)
+                self.fetched_on[symbol] = today
+
+        if added:
+            self.save()
+        logger.info(f'Backtest refreshed: {len(new_alerts)} new alerts, {added} new bars')
+        return added
+
+    # Statistics
+
+    def stats(self, tier: str = None) -> Dict:
+        """Win rate, average gain, hold time and per-horizon returns for a tier (or all alerts)"""
+        key = tier or 'all'
+        with self.lock:
+            cached = self._stats.get(key)
+            if cached is not None:
+                return cached
+
+            selected = []
+            for symbol, outcome in self.outcomes.items():
+                mask = outcome['resolved']
+                if tier:
+                    mask = mask & (np.asarray(self.alerts[symbol]['tier']) == tier)
+                if mask.any():
+                    selected.append({name: values[mask] for name, values in outcome.items()})
+
+            result = self._summarize(selected)
+            self._stats[key] = result
+            return result
+
+    def stats_for_ids(self, alert_ids: List[int]) -> Dict:
+        """Same statistics over specific alerts (e.g. the nearest past setups)"""
+        by_symbol: Dict[str, List[int]] = {}
+        with self.lock:
+            for alert_id in alert_ids:
+                location = self.rows.get(alert_id)
+                if location is not None:
+                    by_symbol.setdefault(location[0], []).append(location[1])
+
+            selected = []
+            for symbol, rows in by_symbol.items():
+                outcome = self.outcomes[symbol]
+                rows = np.asarray(rows)
+                rows = rows[outcome['resolved'][rows]]
+                if len(rows):
+                    selected.append({name: values[rows] for name, values in outcome.items()})
+            return self._summarize(selected)
+
+    def _summarize(self, selected: List[Dict[str, np.ndarray]]) -> Dict:
+        empty = {
+            'sample_size': 0, 'wins': 0, 'win_rate': 0, 'avg_gain': 0.0, 'avg_return': 0.0,
+            'avg_hold_time': 0, 'max_win': 0.0, 'horizons': {},
+        }
+        if not selected:
+            return empty
+
+        merged = {name: np.concatenate([s[name] for s in selected]) for name in selected[0]}
+        win = merged['win']
+        sample = len(win)
+        wins = int(win.sum())
+
+        horizons = {}
+        for column, days in enumerate(self.horizons):
+            values = merged['returns'][:, column]
+            values = values[~np.isnan(values)]
+            if len(values):
+                horizons[days] = {
+                    'mean': round(float(values.mean()) * 100, 2),
+                    'median': round(float(np.median(values)) * 100, 2),
+                    'hit_rate': round(float((values > 0).mean()) * 100, 1),
+                    'samples': int(len(values)),
+                }
+
+        return {
+            'sample_size': sample,
+            'wins': wins,
+            'win_rate': round(wins / sample * 100),
+            'avg_gain': float(merged['exit_return'][win].mean() * 100) if wins else 0.0,
+            'avg_return': float(merged['exit_return'].mean() * 100),
+            'avg_hold_time': int(round(float(np.nanmean(merged['hold_hours'])))),
+            'max_win': float(np.nanmax(merged['peak']) * 100) if not np.isnan(merged['peak']).all() else 0.0,
+            'horizons': horizons,
+        }
+
+    # Persistence (bars only; alerts come back from the database)
+
+    def save(self):
+        try:
+            arrays = {}
+            with self.lock:
+                for symbol, history in self.prices.items():
+                    for name in PriceHistory.__slots__:
+                        arrays[f'{symbol}/{name}'] = getattr(history, name)
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_name(self.cache_path.name + '.tmp')
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            logger.error(f'Error saving backtest price cache: {e}')
+
+    def load(self) -> int:
+        """Restore cached bars; returns the number of symbols loaded"""
+        if not self.cache_path.exists():
+            return 0
+        try:
+            with np.load(self.cache_path) as data:
+                columns: Dict[str, Dict[str, np.ndarray]] = {}
+                for key in data.files:
+                    symbol, _, name = key.rpartition('/')
+                    columns.setdefault(symbol, {})[name] = data[key]
+            with self.lock:
+                for symbol, column in columns.items():
+                    self.prices[symbol] = PriceHistory(**column)
+                    if symbol in self.alerts:
+                        self._evaluate(symbol)
+            logger.info(f'Loaded cached bars for {len(columns)} symbols')
+            return len(columns)
+        except Exception as e:
+            logger.error(f'Error loading backtest price cache: {e}')
+            return 0
+
+
+if __name__ == "__main__":
+    from database import Database
+    from swarm_score import SwarmScore
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    backtester = Backtester()
+    backtester.load()
+    scorer = SwarmScore()
+    backtester.refresh(Database(), scorer.get_daily_data)
+
+    for tier in TIERS + (None,):
+        stats = backtester.stats(tier)
+        print(f"\n{tier or 'all'}: {stats['win_rate']}% win rate ({stats['wins']}/{stats['sample_size']}), "
+              f"avg gain +{stats['avg_gain']:.1f}%, avg hold {stats['avg_hold_time']}h, "
+              f"largest winner +{stats['max_win']:.1f}%")
+        for days, row in stats['horizons'].items():
+            print(f"  {days:>2}d: mean {row['mean']:+.2f}%  median {row['median']:+.2f}%  "
+                  f"hit {row['hit_rate']}%  (n={row['samples']})")
@@ -0,0 +1,4 @@
+"""
+SWARM benchmark suite
+Offline performance measurements for the SWARM SCORE pipeline
+"""
@@ -0,0 +1,256 @@
+"""
+Alpha Vantage fixtures for offline benchmarking
+Recorded responses live in benchmarks/fixtures/<SYMBOL>_<FUNCTION>.json
+"""
+
+import json
+import os
+import random
+import zlib
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest import mock
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures'
+FUNCTIONS = ('GLOBAL_QUOTE', 'TIME_SERIES_DAILY', 'OVERVIEW')
+DEFAULT_SYMBOLS = ['AAPL', 'NVDA', 'TSLA', 'SOFI', 'PLTR']
+
+# Fixed end date so regenerated fixtures are byte-identical
+SYNTHETIC_END_DATE = date(2024, 6, 14)
+FULL_HISTORY_DAYS = 1000    # Bars in an outputsize=full series (the real one goes back 20+ years)
+
+
+def fixture_path(symbol: str, function: str) -> Path:
+    """Path of the recorded response for a symbol/function pair"""
+    return FIXTURE_DIR / f'{symbol.upper()}_{function}.json'
+
+
+def recorded_symbols() -> List[str]:
+    """Symbols with a complete set of recorded responses"""
+    symbols = set()
+    for path in FIXTURE_DIR.glob('*_GLOBAL_QUOTE.json'):
+        symbol = path.name[:-len('_GLOBAL_QUOTE.json')]
+        if all(fixture_path(symbol, fn).exists() for fn in FUNCTIONS):
+            symbols.add(symbol)
+    return sorted(symbols)
+
+
+def _trading_days(end: date, count: int) -> List[date]:
+    """Most recent `count` weekdays up to and including `end`, newest first"""
+    days = []
+    current = end
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current)
+        current -= timedelta(days=1)
+    return days
+
+
+def synthetic_payloads(symbol: str, days: int = 100, end: date = SYNTHETIC_END_DATE) -> Dict[str, dict]:
+    """Generate deterministic responses shaped like the real Alpha Vantage API"""
+    rng = random.Random(zlib.crc32(symbol.encode()))
+    price = rng.uniform(5, 400)
+    base_volume = rng.uniform(2e5, 5e7)
+
+    # Walk forward from the oldest day so the series reads naturally
+    bars = []
+    for day in reversed(_trading_days(end, days + 1)):
+        open_price = price
+        price = max(0.5, price * (1 + rng.gauss(0.0008, 0.022)))
+        high = max(open_price, price) * (1 + abs(rng.gauss(0, 0.008)))
+        low = min(open_price, price) * (1 - abs(rng.gauss(0, 0.008)))
+        volume = int(base_volume * rng.lognormvariate(0, 0.35))
+        bars.append((day, open_price, high, low, price, volume))
+    bars.reverse()
+
+    latest, previous = bars[0], bars[1]
+    series = {
+        day.isoformat(): {
+            '1. open': f'{o:.4f}',
+            '2. high': f'{h:.4f}',
+            '3. low': f'{l:.4f}',
+            '4. close': f'{c:.4f}',
+            '5. volume': str(v),
+        }
+        for day, o, h, l, c, v in bars[:days]
+    }
+
+    change = latest[4] - previous[4]
+    quote_volume = int(latest[5] * rng.uniform(0.8, 3.5))
+    quote = {
+        'Global Quote': {
+            '01. symbol': symbol,
+            '02. open': f'{latest[1]:.4f}',
+            '03. high': f'{latest[2]:.4f}',
+            '04. low': f'{latest[3]:.4f}',
+            '05. price': f'{latest[4]:.4f}',
+            '06. volume': str(quote_volume),
+            '07. latest trading day': latest[0].isoformat(),
+            '08. previous close': f'{previous[4]:.4f}',
+            '09. change': f'{change:.4f}',
+            '10. change percent': f'{change / previous[4] * 100:.4f}%',
+        }
+    }
+
+    daily = {
+        'Meta Data': {
+            '1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+            '2. Symbol': symbol,
+            '3. Last Refreshed': latest[0].isoformat(),
+            '4. Output Size': 'Compact',
+            '5. Time Zone': 'US/Eastern',
+        },
+        'Time Series (Daily)': series,
+    }
+
+    shares = rng.uniform(5e7, 5e9)
+    overview = {
+        'Symbol': symbol,
+        'AssetType': 'Common Stock',
+        'Name': f'{symbol} Inc',
+        'Exchange': rng.choice(['NASDAQ', 'NYSE']),
+        'Currency': 'USD',
+        'Country': 'USA',
+        'Sector': rng.choice(['TECHNOLOGY', 'FINANCE', 'LIFE SCIENCES', 'MANUFACTURING']),
+        'MarketCapitalization': str(int(shares * latest[4])),
+        'SharesOutstanding': str(int(shares)),
+        'PERatio': f'{rng.uniform(-20, 80):.2f}',
+        'ProfitMargin': f'{rng.uniform(-0.2, 0.35):.3f}',
+        'QuarterlyRevenueGrowthYOY': f'{rng.uniform(-0.1, 0.6):.3f}',
+        '52WeekHigh': f'{max(b[2] for b in bars):.2f}',
+        '52WeekLow': f'{min(b[3] for b in bars):.2f}',
+    }
+
+    return {'GLOBAL_QUOTE': quote, 'TIME_SERIES_DAILY': daily, 'OVERVIEW': overview}
+
+
+def full_history(daily: dict, days: int = FULL_HISTORY_DAYS) -> dict:
+    """
+    outputsize=full version of a compact TIME_SERIES_DAILY payload: the same
+    recent bars, preceded by a deterministic walk back to `days` bars
+    """
+    series = daily.get('Time Series (Daily)')
+    if not series:
+        return daily
+    symbol = daily.get('Meta Data', {}).get('2. Symbol', '')
+    rng = random.Random(zlib.crc32(f'{symbol}:full'.encode()))
+    oldest = min(series)
+    price = float(series[oldest].get('1. open', series[oldest]['4. close']))
+    volumes = sorted(int(float(bar.get('5. volume', 0))) for bar in series.values())
+    base_volume = volumes[len(volumes) // 2] or 1e6
+
+    bars = dict(series)
+    current = date.fromisoformat(oldest)
+    while len(bars) < days:
+        current -= timedelta(days=1)
+        if current.weekday() >= 5:
+            continue
+        # Walk backwards: this bar's close is the next bar's open
+        close = price
+        price = max(0.5, close / (1 + rng.gauss(0.0008, 0.022)))
+        high = max(price, close) * (1 + abs(rng.gauss(0, 0.008)))
+        low = min(price, close) * (1 - abs(rng.gauss(0, 0.008)))
+        bars[current.isoformat()] = {
+            '1. open': f'{price:.4f}',
+            '2. high': f'{high:.4f}',
+            '3. low': f'{low:.4f}',
+            '4. close': f'{close:.4f}',
+            '5. volume': str(int(base_volume * rng.lognormvariate(0, 0.35))),
+        }
+
+    meta = dict(daily.get('Meta Data', {}))
+    meta['4. Output Size'] = 'Full size'
+    return {'Meta Data': meta, 'Time Series (Daily)': dict(sorted(bars.items(), reverse=True))}
+
+
+def write_fixtures(symbol: str, payloads: Dict[str, dict]):
+    """Write one symbol's responses to the fixture directory"""
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    for function, payload in payloads.items():
+        with open(fixture_path(symbol, function), 'w') as f:
+            json.dump(payload, f, indent=1)
+            f.write('\n')
+
+
+def record(symbols: List[str], api_key: Optional[str] = None):
+    """Capture live Alpha Vantage responses as fixtures (uses API quota)"""
+    import requests
+    import time
+
+    api_key = api_key or os.getenv('ALPHA_VANTAGE_API_KEY')
+    if not api_key:
+        raise RuntimeError('ALPHA_VANTAGE_API_KEY not set')
+
+    for symbol in symbols:
+        payloads = {}
+        for function in FUNCTIONS:
+            params = {'function': function, 'symbol': symbol, 'apikey': api_key}
+            if function == 'TIME_SERIES_DAILY':
+                params['outputsize'] = 'compact'
+            data = requests.get('https://www.alphavantage.co/query', params=params, timeout=10).json()
+            if 'Note' in data or 'Information' in data or 'Error Message' in data:
+                raise RuntimeError(f'Alpha Vantage refused {function} for {symbol}: {data}')
+            payloads[function] = data
+            time.sleep(1.2)
+        write_fixtures(symbol, payloads)
+
+
+class FixtureStore:
+    """Serves raw response bodies; unknown symbols reuse a recorded one"""
+
+    def __init__(self, symbols: Optional[List[str]] = None):
+        self.symbols = symbols or recorded_symbols()
+        if not self.symbols:
+            raise RuntimeError(f'No fixtures found in {FIXTURE_DIR}')
+        self.bodies = {
+            (symbol, function): fixture_path(symbol, function).read_bytes()
+            for symbol in self.symbols
+            for function in FUNCTIONS
+        }
+
+    def body(self, symbol: str, function: str) -> bytes:
+        """Raw JSON body for a request"""
+        symbol = symbol.upper()
+        if (symbol, function) not in self.bodies:
+            symbol = self.symbols[zlib.crc32(symbol.encode()) % len(self.symbols)]
+        return self.bodies[(symbol, function)]
+
+
+class FixtureResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, body: bytes, status_code: int = 200):
+        self.content = body
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.content)
+
+
+@contextmanager
+def serve_fixtures(store: FixtureStore):
+    """Route SwarmScore HTTP calls to the fixture store instead of the network"""
+    def fake_get(url, params=None, timeout=None):
+        params = params or {}
+        return FixtureResponse(store.body(params.get('symbol', ''), params.get('function', '')))
+
+    with mock.patch('market_data.requests.get', side_effect=fake_get):
+        yield
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage Alpha Vantage benchmark fixtures')
+    parser.add_argument('symbols', nargs='*', default=DEFAULT_SYMBOLS)
+    parser.add_argument('--record', action='store_true', help='Capture live responses (needs ALPHA_VANTAGE_API_KEY)')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.symbols)
+    else:
+        for sym in args.symbols:
+            write_fixtures(sym, synthetic_payloads(sym))
+    print(f"✅ Wrote fixtures for {', '.join(args.symbols)} to {FIXTURE_DIR}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Local Alpha Vantage stand-in server
+Serves GLOBAL_QUOTE, TIME_SERIES_DAILY and OVERVIEW from recorded or synthetic
+data, with configurable latency, rate-limit bodies and error injection.
+
+Usage:
+    python -m benchmarks.av_standin --port 8765 --latency-ms 150 --per-minute 5
+    ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8765/query python bot.py
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Allow `python benchmarks/av_standin.py` as well as `python -m benchmarks.av_standin`
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.av_fixtures import FUNCTIONS, FixtureStore, full_history, recorded_symbols, synthetic_payloads
+
+logger = logging.getLogger(__name__)
+
+# Bodies Alpha Vantage returns with HTTP 200 when throttling
+NOTE_BODY = {
+    'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute '
+            'and 500 calls per day. Please visit https://www.alphavantage.co/premium/ if you would '
+            'like to target a higher API call frequency.'
+}
+INFORMATION_BODY = {
+    'Information': 'Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. '
+                   'Please subscribe to any of the premium plans at https://www.alphavantage.co/premium/ '
+                   'to instantly remove all daily rate limits.'
+}
+INVALID_CALL_BODY = {
+    'Error Message': 'Invalid API call. Please retry or visit the documentation '
+                     '(https://www.alphavantage.co/documentation/) for TIME_SERIES_DAILY.'
+}
+
+
+class StandinConfig:
+    """Fault and latency injection settings"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0,
+                 per_minute: int = 0, per_day: int = 0,
+                 note_rate: float = 0, info_rate: float = 0,
+                 error_rate: float = 0, hang_rate: float = 0, hang_s: float = 15,
+                 synthetic: bool = False, seed: Optional[int] = None):
+        self.latency_ms = latency_ms      # Base response delay
+        self.jitter_ms = jitter_ms        # Uniform extra delay on top of latency_ms
+        self.per_minute = per_minute      # Sliding-window quota → 'Note' bodies (0 = unlimited)
+        self.per_day = per_day            # Total quota → 'Information' bodies (0 = unlimited)
+        self.note_rate = note_rate        # Probability of a spurious 'Note' body
+        self.info_rate = info_rate        # Probability of a spurious 'Information' body
+        self.error_rate = error_rate      # Probability of an HTTP 503
+        self.hang_rate = hang_rate        # Probability of stalling past the client timeout
+        self.hang_s = hang_s
+        self.synthetic = synthetic        # Generate data for every symbol instead of using fixtures
+        self.seed = seed
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+class StandinState:
+    """Data source, quota windows and counters shared by request threads"""
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.minute_window = deque()
+        self.day_count = 0
+        self.stats = Counter()
+        self.fixtures = None if config.synthetic or not recorded_symbols() else FixtureStore()
+        self.synthetic_cache = {}
+        self.full_cache = {}
+
+    def payload(self, symbol: str, function: str, outputsize: str = None) -> bytes:
+        """Response body for a symbol/function pair (TIME_SERIES_DAILY honours outputsize=full)"""
+        if function == 'TIME_SERIES_DAILY' and outputsize == 'full':
+            with self.lock:
+                body = self.full_cache.get(symbol)
+            if body is None:
+                body = json.dumps(full_history(json.loads(self.payload(symbol, function)))).encode()
+                with self.lock:
+                    self.full_cache[symbol] = body
+            return body
+        if self.fixtures:
+            return self.fixtures.body(symbol, function)
+        with self.lock:
+            if symbol not in self.synthetic_cache:
+                payloads = synthetic_payloads(symbol)
+                self.synthetic_cache[symbol] = {fn: json.dumps(p).encode() for fn, p in payloads.items()}
+            return self.synthetic_cache[symbol][function]
+
+    def admit(self) -> Optional[Dict]:
+        """Apply quota and fault injection; returns an override body or None"""
+        cfg = self.config
+        now = time.monotonic()
+        with self.lock:
+            self.stats['requests'] += 1
+            roll = self.rng.random()
+
+            if cfg.per_day and self.day_count >= cfg.per_day:
+                self.stats['information'] += 1
+                return INFORMATION_BODY
+
+            while self.minute_window and now - self.minute_window[0] >= 60:
+                self.minute_window.popleft()
+            if cfg.per_minute and len(self.minute_window) >= cfg.per_minute:
+                self.stats['note'] += 1
+                return NOTE_BODY
+
+            if roll < cfg.note_rate:
+                self.stats['note'] += 1
+                return NOTE_BODY
+            roll -= cfg.note_rate
+            if roll < cfg.info_rate:
+                self.stats['information'] += 1
+                return INFORMATION_BODY
+            roll -= cfg.info_rate
+            if roll < cfg.error_rate:
+                self.stats['http_error'] += 1
+                return {'_status': 503}
+            roll -= cfg.error_rate
+            if roll < cfg.hang_rate:
+                self.stats['hang'] += 1
+                return {'_hang': True}
+
+            self.minute_window.append(now)
+            self.day_count += 1
+            self.stats['ok'] += 1
+            return None
+
+    def delay(self) -> float:
+        """Seconds to wait before answering"""
+        cfg = self.config
+        with self.lock:
+            jitter = self.rng.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0
+        return (cfg.latency_ms + jitter) / 1000
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Handles /query like Alpha Vantage, plus /stats for the load tester"""
+
+    server_version = 'AlphaVantageStandin/1.0'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state: StandinState = self.server.state
+        url = urlparse(self.path)
+
+        if url.path == '/stats':
+            with state.lock:
+                stats = dict(state.stats)
+            self._send(200, json.dumps({'stats': stats, 'config': state.config.to_dict()}).encode())
+            return
+
+        if url.path != '/query':
+            self._send(404, b'{}')
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        function = params.get('function', '')
+        symbol = params.get('symbol', '').upper()
+        outputsize = params.get('outputsize')
+
+        time.sleep(state.delay())
+
+        if function not in FUNCTIONS or not symbol:
+            with state.lock:
+                state.stats['invalid'] += 1
+            self._send(200, json.dumps(INVALID_CALL_BODY).encode())
+            return
+
+        override = state.admit()
+        if override is None:
+            self._send(200, state.payload(symbol, function, outputsize))
+        elif '_status' in override:
+            self._send(override['_status'], b'Service Unavailable', 'text/plain')
+        elif '_hang' in override:
+            time.sleep(state.config.hang_s)
+            self._send(200, state.payload(symbol, function, outputsize))
+        else:
+            self._send(200, json.dumps(override).encode())
+
+
+def make_server(host: str, port: int, config: StandinConfig) -> ThreadingHTTPServer:
+    """Bind the stand-in; server.url is the endpoint to use as ALPHA_VANTAGE_BASE_URL"""
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(config)
+    server.url = f'http://{host}:{server.server_address[1]}/query'
+    return server
+
+
+def start_standin(host: str = '127.0.0.1', port: int = 0, config: StandinConfig = None) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread (port 0 picks a free port)"""
+    server = make_server(host, port, config or StandinConfig())
+    thread = threading.Thread(target=server.serve_forever, name='av-standin', daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local Alpha Vantage stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--per-minute', type=int, default=0, help="Calls per minute before 'Note' bodies")
+    parser.add_argument('--per-day', type=int, default=0, help="Calls per run before 'Information' bodies")
+    parser.add_argument('--note-rate', type=float, default=0)
+    parser.add_argument('--info-rate', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--hang-rate', type=float, default=0)
+    parser.add_argument('--hang-s', type=float, default=15)
+    parser.add_argument('--synthetic', action='store_true', help='Generate data for every symbol')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    config = StandinConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        per_minute=args.per_minute, per_day=args.per_day,
+        note_rate=args.note_rate, info_rate=args.info_rate,
+        error_rate=args.error_rate, hang_rate=args.hang_rate, hang_s=args.hang_s,
+        synthetic=args.synthetic, seed=args.seed,
+    )
+
+    server = make_server(args.host, args.port, config)
+    logger.info(f'Alpha Vantage stand-in listening on {server.url}')
+    logger.info(f'Set ALPHA_VANTAGE_BASE_URL={server.url} to use it')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+SWARM Benchmark Runner
+Measures the scoring pipeline offline against recorded Alpha Vantage fixtures
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare baseline.json --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Allow `python benchmarks/run.py` as well as `python -m benchmarks.run`
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.av_fixtures import FixtureStore, serve_fixtures
+from benchmarks.av_standin import StandinConfig, start_standin
+from dispatcher import AlertDispatcher
+from routing import ChannelRouter
+from swarm_score import SwarmScore
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+COMPARED_METRICS = ('mean_ms', 'p50_ms', 'p95_ms', 'total_s', 'tickers_per_s')
+NOISE_FLOOR_MS = 0.005
+
+
+class OfflineSwarmScore(SwarmScore):
+    """SwarmScore without rate limiting or response caching, so timings measure our own code"""
+    request_delay = 0
+    cache_ttls = {}
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Latency summary in milliseconds"""
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p):
+        return ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+
+    return {
+        'n': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 4),
+        'p50_ms': round(pct(50), 4),
+        'p95_ms': round(pct(95), 4),
+        'p99_ms': round(pct(99), 4),
+        'min_ms': round(ms[0], 4),
+        'max_ms': round(ms[-1], 4),
+    }
+
+
+def measure(fn: Callable, iterations: int, warmup: int = 5) -> Dict:
+    """Time `fn` over a number of iterations"""
+    for i in range(warmup):
+        fn(-1 - i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_components(store: FixtureStore, iterations: int) -> Dict:
+    """Per-component scoring latency"""
+    scorer = OfflineSwarmScore()
+    symbols = store.symbols
+
+    def pick(i):
+        return symbols[i % len(symbols)]
+
+    cases = {
+        'fetch_quote': lambda i: scorer.get_quote(pick(i)),
+        'fetch_daily': lambda i: scorer.get_daily_data(pick(i)),
+        'fetch_overview': lambda i: scorer.get_company_overview(pick(i)),
+        'sec_score': lambda i: scorer.calculate_sec_score(pick(i)),
+        'technical_score': lambda i: scorer.calculate_technical_score(pick(i)),
+        'financial_score': lambda i: scorer.calculate_financial_score(pick(i)),
+        'news_score': lambda i: scorer.calculate_news_score(pick(i)),
+        'swarm_score': lambda i: scorer.calculate_swarm_score(pick(i)),
+    }
+    return {name: measure(fn, iterations) for name, fn in cases.items()}
+
+
+def bench_batch(store: FixtureStore, sizes: List[int]) -> Dict:
+    """Batch throughput of calculate_swarm_score over synthetic universes"""
+    scorer = OfflineSwarmScore()
+    results = {}
+    for size in sizes:
+        tickers = [f'SYN{i:05d}' for i in range(size)]
+        start = time.perf_counter()
+        for ticker in tickers:
+            scorer.calculate_swarm_score(ticker)
+        elapsed = time.perf_counter() - start
+        results[str(size)] = {
+            'tickers': size,
+            'total_s': round(elapsed, 4),
+            'tickers_per_s': round(size / elapsed, 2) if elapsed else None,
+            'per_ticker_ms': round(elapsed / size * 1000, 4),
+        }
+    return results
+
+
+def _sample_score_data(i: int) -> Dict:
+    """Flat score payload in the shape post_alert/save_alert expect"""
+    return {
+        'score': 60 + i % 40,
+        'sec_score': 20 + i % 20,
+        'technical_score': 10 + i % 25,
+        'financial_score': i % 15,
+        'news_score': i % 10,
+    }
+
+
+def bench_database(iterations: int, workdir: Path) -> Dict:
+    """Write and read latency of Database methods on a scratch SQLite file"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir / "bench_db.sqlite"}'
+    from database import Database
+    db = Database()
+
+    tickers = [f'DB{i:03d}' for i in range(50)]
+
+    def ticker(i):
+        return tickers[i % len(tickers)]
+
+    cases = {
+        'save_alert': lambda i: db.save_alert(ticker(i), 60 + i % 40, _sample_score_data(i), 'benchmark'),
+        'get_recent_alerts': lambda i: db.get_recent_alerts(ticker(i), hours=4),
+        'get_todays_alerts': lambda i: db.get_todays_alerts(min_score=75),
+        'get_ticker_history': lambda i: db.get_ticker_history(ticker(i), days=30),
+        'add_to_watchlist': lambda i: db.add_to_watchlist(1000 + i, ticker(i)),
+        'get_community_trending': lambda i: db.get_community_trending(limit=10),
+    }
+    results = {name: measure(fn, iterations) for name, fn in cases.items()}
+    db.session.close()
+    db.engine.dispose()
+    return results
+
+
+def bench_throttling(tickers: int, config: StandinConfig) -> Dict:
+    """calculate_swarm_score over HTTP against the stand-in with faults injected"""
+    server = start_standin(config=config)
+    try:
+        scorer = OfflineSwarmScore(base_url=server.url)
+        samples = []
+        degraded = 0
+        for i in range(tickers):
+            start = time.perf_counter()
+            result = scorer.calculate_swarm_score(f'THR{i:04d}')
+            samples.append(time.perf_counter() - start)
+            breakdown = result['breakdown']
+            if breakdown['technical']['details'].startswith('No ') or breakdown['financial']['details'].startswith('No '):
+                degraded += 1
+        result = summarize(samples)
+        result['degraded_scores'] = degraded
+        result['standin'] = {k: v for k, v in server.state.stats.items()}
+        result['config'] = config.to_dict()
+        return result
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _BenchChannel:
+    """Discord channel stand-in that records sends"""
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+def bench_post_alert(iterations: int, workdir: Path) -> Dict:
+    """End-to-end post_alert time (format, dedupe, enqueue, save); the queue is drained after"""
+    try:
+        import discord  # noqa: F401
+    except ImportError:
+        return {'skipped': 'discord.py not installed'}
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir / "bench_bot.sqlite"}'
+    # bot.py configures logging on import; keep it at the benchmark's level and off disk
+    os.environ['LOG_FILE'] = ''
+    os.environ['LOG_LEVEL'] = logging.getLevelName(logging.getLogger().level)
+    import bot
+
+    channels = {}
+    for key in ('critical_setups', 'active_setups', 'watchlist'):
+        channel_id = 900000 + len(channels)
+        bot.CHANNEL_IDS[key] = channel_id
+        channels[channel_id] = _BenchChannel(channel_id)
+    bot.bot.get_channel = channels.get
+    bot.router = ChannelRouter(bot.CHANNEL_IDS)
+    # Measure our pipeline, not Discord's per-channel limit or the coalescing window
+    bot.dispatcher = AlertDispatcher(rate=1e9, per=1, coalesce_window=0.01, merge=bot.format_watchlist_digest)
+
+    async def run():
+        samples = []
+        for i in range(iterations):
+            score_data = _sample_score_data(i)
+            start = time.perf_counter()
+            await bot.post_alert(f'PA{i:05d}', score_data, 'benchmark')
+            samples.append(time.perf_counter() - start)
+        await bot.dispatcher.drain(timeout=30)
+        await bot.dispatcher.close()
+        return samples
+
+    samples = asyncio.run(run())
+    result = summarize(samples)
+    result['messages_sent'] = sum(c.sent for c in channels.values())
+    return result
+
+
+def git_revision() -> str:
+    """Short hash of the checked-out revision, if available"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def _flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    """Flatten nested results into metric-path -> value"""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print deltas against a baseline run; return metrics that regressed"""
+    old = _flatten(baseline.get('results', {}))
+    new = _flatten(current.get('results', {}))
+    regressions = []
+
+    print(f"\n📊 Compared with {baseline.get('meta', {}).get('revision', '?')}:")
+    for path in sorted(set(old) & set(new)):
+        if not path.endswith(COMPARED_METRICS):
+            continue
+        before, after = old[path], new[path]
+        # Sub-microsecond timings are mostly timer noise
+        if not before or (path.endswith('_ms') and abs(after - before) < NOISE_FLOOR_MS):
+            continue
+        delta = (after - before) / before * 100
+        # Throughput regresses when it drops, latency when it rises
+        worse = -delta if path.endswith('tickers_per_s') else delta
+        flag = ''
+        if worse > threshold:
+            flag = '  ⚠️ regression'
+            regressions.append(path)
+        print(f'   {path}: {before} → {after} ({delta:+.1f}%){flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline SWARM SCORE benchmarks')
+    parser.add_argument('--iterations', type=int, default=200, help='Samples per latency benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Batch sizes (tickers)')
+    parser.add_argument('--only', nargs='+', choices=['components', 'batch', 'database', 'post_alert', 'throttling'])
+    parser.add_argument('--throttle-tickers', type=int, default=20, help='Tickers scored in the throttling run')
+    parser.add_argument('--standin-latency-ms', type=float, default=120)
+    parser.add_argument('--standin-jitter-ms', type=float, default=80)
+    parser.add_argument('--standin-per-minute', type=int, default=0)
+    parser.add_argument('--standin-note-rate', type=float, default=0.1)
+    parser.add_argument('--standin-error-rate', type=float, default=0.02)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Baseline JSON results to diff against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format='[%(asctime)s] %(levelname)s: %(message)s')
+    selected = set(args.only or ['components', 'batch', 'database', 'post_alert'])
+    store = FixtureStore()
+
+    results = {}
+    with serve_fixtures(store), tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        if 'components' in selected:
+            print('⏱️  Component latency...')
+            results['components'] = bench_components(store, args.iterations)
+        if 'batch' in selected:
+            print('⏱️  Batch throughput...')
+            results['batch'] = bench_batch(store, args.sizes)
+        if 'database' in selected:
+            print('⏱️  Database latency...')
+            results['database'] = bench_database(args.iterations, workdir)
+        if 'post_alert' in selected:
+            print('⏱️  post_alert end-to-end...')
+            results['post_alert'] = bench_post_alert(args.iterations, workdir)
+
+    # Goes over real HTTP, so it runs outside the fixture patch; opt-in because it sleeps
+    if args.only and 'throttling' in selected:
+        print('⏱️  Throttled pipeline against the stand-in...')
+        results['throttling'] = bench_throttling(args.throttle_tickers, StandinConfig(
+            latency_ms=args.standin_latency_ms, jitter_ms=args.standin_jitter_ms,
+            per_minute=args.standin_per_minute, note_rate=args.standin_note_rate,
+            error_rate=args.standin_error_rate, seed=0,
+        ))
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixtures': store.symbols,
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\n✅ Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
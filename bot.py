@@ -8,30 +8,92 @@ from discord.ext import commands, tasks
 from discord import app_commands
 import os
 import asyncio
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 import json
 from pathlib import Path
-from swarm_score import SwarmScore
+from swarm_score import SwarmScore, flatten_score
 from database import Database, Alert, Ticker
+from backtest import Backtester
+from neighbors import NeighborIndex, similar_setup_stats
+from dispatcher import AlertDispatcher
+from job_queue import JobQueue
+from routing import ChannelRouter
+from watchers import WatcherIndex, WatchlistNotifier
+from admission import AdmissionController, Rejected
+from dashboard import MoversBoard, PinnedBoards
+from score_cache import ScoreCache
+from sec_index import get_index
+import indicators
+import market_data
+import metrics
+from log_config import setup_logging
 import logging
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] %(levelname)s: %(message)s',
-    handlers=[
-        logging.FileHandler('swarm_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Setup logging (JSON, written by a background thread; see log_config.py)
+setup_logging()
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='/', intents=intents)
+# DISCORD_SHARDED=true runs the gateway auto-sharded for large multi-server
+# deployments (DISCORD_SHARD_COUNT pins the count; otherwise Discord decides)
+SHARDED = os.getenv('DISCORD_SHARDED', 'false').lower() in ('1', 'true', 'yes')
+if SHARDED:
+    shard_count = os.getenv('DISCORD_SHARD_COUNT')
+    bot = commands.AutoShardedBot(command_prefix='/', intents=intents,
+                                  shard_count=int(shard_count) if shard_count else None)
+else:
+    bot = commands.Bot(command_prefix='/', intents=intents)
 db = Database()
+sec_index = get_index()   # Shared with SwarmScore, so updates are visible to scoring
+
+# SCORING_MODE=workers hands scoring (and SEC indexing) to workers.py processes
+# through a durable job queue; this process only dispatches and delivers
+SCORING_MODE = os.getenv('SCORING_MODE', 'inline')
+job_queue = JobQueue() if SCORING_MODE == 'workers' else None
+if job_queue is not None:
+    # Fetches left in this process (backtest refresh) draw from the workers' API budget
+    market_data.share_limits(job_queue.path)
+# Scores /score and the warmup are waiting on from the workers, by ticker
+pending_scores = {}
+SCORE_WORKER_TIMEOUT = float(os.getenv('SCORE_WORKER_TIMEOUT', '120'))
+
+# Outcomes of past alerts (win rate / gain / hold time shown in critical alerts)
+backtester = Backtester()
+neighbor_index = NeighborIndex()
+SIMILAR_SETUPS_K = int(os.getenv('SIMILAR_SETUPS_K', '20'))
+SIMILAR_SETUPS_MIN = int(os.getenv('SIMILAR_SETUPS_MIN', '5'))  # Resolved neighbours needed
+
+# Outbound alert queue: per-channel rate limits, watchlist alerts coalesced into digests
+dispatcher = AlertDispatcher(
+    rate=float(os.getenv('DISCORD_CHANNEL_RATE', '5')),
+    per=float(os.getenv('DISCORD_CHANNEL_PER', '5')),
+    coalesce_window=float(os.getenv('WATCHLIST_COALESCE_SECONDS', '10')),
+    merge=lambda messages: format_watchlist_digest(messages),
+    global_rate=float(os.getenv('DISCORD_GLOBAL_RATE', '50')),
+)
+
+# Users watching each ticker (/watch) get alerts on it by DM, batched per user
+# and sharing the dispatcher's global rate limit
+watchers = WatcherIndex()
+
+
+async def open_dm(user_id):
+    user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+    return user.dm_channel or await user.create_dm()
+
+
+watchlist_notifier = WatchlistNotifier(
+    watchers, open_dm,
+    bucket=dispatcher.global_bucket,
+    concurrency=int(os.getenv('WATCHLIST_DM_CONCURRENCY', '25')),
+    coalesce_window=float(os.getenv('WATCHLIST_DM_COALESCE_SECONDS', '5')),
+    merge=lambda messages: format_watcher_digest(messages),
+)
 
 # Channel IDs (set these after creating channels)
 CHANNEL_IDS = {
@@ -49,12 +111,61 @@ CHANNEL_IDS = {
     'daily_context': None,         # Morning briefings
 }
 
+# Live top gainers / losers, fed by every quote the scoring pipeline sees and
+# shown as one pinned message per channel, edited every DASHBOARD_REFRESH_SECONDS
+movers = MoversBoard(
+    size=int(os.getenv('DASHBOARD_SIZE', '10')),
+    max_age=float(os.getenv('DASHBOARD_MAX_AGE_SECONDS', '21600')),
+)
+dashboard_boards = PinnedBoards(lambda: bot.user.id if bot.user else None, bucket=dispatcher.global_bucket)
+dashboard_version = None
+
+
+def record_mover(ticker, score_data):
+    """Feed a new score's quote to the dashboard (older fallback quotes keep their age)"""
+    features = score_data.get('features') or {}
+    if 'change_percent' not in features or not features.get('price'):
+        return
+    quote_age = (score_data.get('stale') or {}).get('quote', 0)
+    movers.update(ticker, features['change_percent'], features['price'], as_of=time.time() - quote_age)
+
+
+# Latest score per ticker, shared by the scanner loop and /score
+score_cache = ScoreCache(on_put=record_mover)
+
+# Morning briefing, computed by premarket_warmup and posted by post_daily_context
+MARKET_TZ = ZoneInfo('America/New_York')
+daily_briefing = None
+
+
+def market_time(env_name, default):
+    """HH:MM wall-clock time in New York from an env var"""
+    hour, minute = (int(part) for part in os.getenv(env_name, default).split(':'))
+    return dt_time(hour=hour, minute=minute, tzinfo=MARKET_TZ)
+
+# Alert type -> channels in every server that ran /setup (plus CHANNEL_IDS above)
+router = ChannelRouter(CHANNEL_IDS)
+
 # Role IDs (set these after creating roles)
 ROLE_IDS = {
     'pro': None,
     'free': None,
 }
 
+# /score admission: fresh computations cost several API calls, so they're
+# rate limited per user and per server and queued fairly (Pro role first)
+score_admission = AdmissionController(
+    'score',
+    concurrency=int(os.getenv('SCORE_COMMAND_CONCURRENCY', '2')),
+    user_rate=float(os.getenv('SCORE_USER_RATE', '5')),
+    pro_user_rate=float(os.getenv('SCORE_PRO_USER_RATE', '15')),
+    guild_rate=float(os.getenv('SCORE_GUILD_RATE', '30')),
+    per=float(os.getenv('SCORE_RATE_PER', '60')),
+    max_queued_per_user=int(os.getenv('SCORE_USER_MAX_QUEUED', '3')),
+)
+SCORE_QUEUE_TIMEOUT = float(os.getenv('SCORE_QUEUE_TIMEOUT', '120'))
+SCORE_QUEUE_UPDATE_SECONDS = float(os.getenv('SCORE_QUEUE_UPDATE_SECONDS', '3'))
+
 # Professional trader voice templates
 ALERT_TEMPLATES = {
     'critical': """🎯 SWARM SCORE: {score} - High Probability Setup
@@ -126,9 +237,41 @@ async def on_ready():
     except Exception as e:
         logging.error(f'Failed to sync commands: {e}')
     
-    # Start background tasks
-    check_for_alerts.start()
-    post_daily_context.start()
+    # Start background tasks (on_ready fires again after every reconnect)
+    if not check_for_alerts.is_running():
+        check_for_alerts.start()
+    if not post_daily_context.is_running():
+        post_daily_context.start()
+    if not premarket_warmup.is_running():
+        premarket_warmup.start()
+    if not refresh_dashboard.is_running():
+        refresh_dashboard.start()
+    if job_queue is not None and not deliver_job_results.is_running():
+        deliver_job_results.start()
+    if not refresh_backtest.is_running():
+        router.load(await run_db(db.get_guild_channels))
+        watchers.load(await run_db(db.get_watchers))
+        await asyncio.to_thread(indicators.get_store().load)
+        await asyncio.to_thread(backtester.load)
+        alerts = await run_db(db.get_alerts_since, 0, True)
+        neighbor_index.load(alerts)
+        refresh_backtest.start()
+        archive_alerts.start()
+        if db.read_session is not None:
+            check_replica_lag.start()
+
+
+@bot.event
+async def on_shard_ready(shard_id):
+    logging.info(f'Shard {shard_id} ready')
+
+
+@bot.event
+async def on_guild_remove(guild):
+    """Stop routing alerts to a server that removed the bot"""
+    router.remove(guild.id)
+    await run_db(db.remove_guild_channels, guild.id)
+    logging.info(f'Removed channel routes for guild {guild.id}')
 
 
 @tasks.loop(minutes=5)
@@ -151,8 +294,24 @@ async def check_for_alerts():
             if scanner_file.exists():
                 await process_scanner_results(scanner_file, strategy)
         
-        # Check for new SEC filings (CHIRP would create alerts)
-        # This would integrate with your existing CHIRP output
+        if job_queue is not None:
+            # Workers index filings and backfill indicators themselves
+            await asyncio.to_thread(job_queue.enqueue, 'sec_index', {}, 0, 'sec_index')
+            return
+        
+        # Index any SEC filings CHIRP has written since the last pass
+        # (off the event loop; scoring then reads the index instead of rescanning)
+        await asyncio.to_thread(sec_index.update)
+        
+        # Backfill a year of bars for newly scored tickers, then snapshot
+        # indicator state so a restart resumes without refetching history
+        scorer = SwarmScore()
+        store = indicators.get_store()
+        await asyncio.to_thread(
+            store.seed_pending, scorer.get_daily_data,
+            int(os.getenv('INDICATOR_SEED_BATCH', '5')),
+        )
+        await asyncio.to_thread(store.save)
         
     except Exception as e:
         logging.error(f'Error in check_for_alerts: {e}')
@@ -164,14 +323,25 @@ async def process_flock_results(file_path):
         import pandas as pd
         df = pd.read_csv(file_path)
         
-        for _, row in df.iterrows():
+        if job_queue is None:
+            # One bulk download for the whole scan where the provider supports it
+            await asyncio.to_thread(SwarmScore().prefetch, df['Ticker'].tolist())
+        
+        for position, (_, row) in enumerate(df.iterrows()):
+            metrics.set_gauge('swarm_queue_depth', len(df) - position, queue='flock')
             ticker = row['Ticker']
             
-            # Calculate SWARM SCORE
-            score_data = await calculate_swarm_score(ticker)
+            if job_queue is not None:
+                await enqueue_score(ticker, 'momentum')
+                continue
+            
+            # Calculate SWARM SCORE (joins a /score computation already running)
+            score_data = dict(await score_cache.refresh(ticker, calculate_swarm_score))
             
             if score_data['score'] >= 60:  # Minimum threshold
                 await post_alert(ticker, score_data, 'momentum')
+        
+        metrics.set_gauge('swarm_queue_depth', 0, queue='flock')
                 
     except Exception as e:
         logging.error(f'Error processing FLOCK results: {e}')
@@ -183,59 +353,190 @@ async def process_scanner_results(file_path, strategy):
         import pandas as pd
         df = pd.read_csv(file_path)
         
-        for _, row in df.iterrows():
+        if job_queue is None:
+            await asyncio.to_thread(SwarmScore().prefetch, df['Ticker'].tolist())
+        
+        for position, (_, row) in enumerate(df.iterrows()):
+            metrics.set_gauge('swarm_queue_depth', len(df) - position, queue=strategy)
             ticker = row['Ticker']
             
-            score_data = await calculate_swarm_score(ticker)
+            if job_queue is not None:
+                await enqueue_score(ticker, f'{strategy}_technical', strategy=strategy)
+                continue
+            
+            score_data = dict(await score_cache.refresh(ticker, calculate_swarm_score))
             score_data['strategy'] = strategy
             
             if score_data['score'] >= 60:
                 await post_alert(ticker, score_data, f'{strategy}_technical')
+        
+        metrics.set_gauge('swarm_queue_depth', 0, queue=strategy)
                 
     except Exception as e:
         logging.error(f'Error processing scanner results: {e}')
 
 
+# Replica reads are pinned per thread, but the bot is one caller whose work
+# hops between pool threads: carry its pin from thread to thread so it still
+# reads its own writes (e.g. the duplicate-alert check after a save)
+db_read_pin = 0.0
+
+
+async def run_db(func, *args):
+    """Run blocking database work in a worker thread on that thread's own session"""
+    def call():
+        global db_read_pin
+        db.pin_reads(db_read_pin)
+        try:
+            return func(*args)
+        finally:
+            db_read_pin = max(db_read_pin, db.pinned_until)
+            db.release()
+    return await asyncio.to_thread(call)
+
+
+async def calculate_swarm_score(ticker):
+    """Score a ticker off the event loop (on the workers in worker mode), returned as flat score_data"""
+    if job_queue is not None:
+        return await score_on_workers(ticker)
+    scorer = SwarmScore()
+    result = await asyncio.to_thread(scorer.calculate_swarm_score, ticker)
+    return flatten_score(result)
+
+
+async def enqueue_score(ticker, alert_type, strategy=None):
+    """Queue a ticker for the scoring workers (skipped if it's already waiting)"""
+    payload = {'ticker': ticker, 'alert_type': alert_type}
+    if strategy:
+        payload['strategy'] = strategy
+    await asyncio.to_thread(job_queue.enqueue, 'score', payload, 1, f'score:{ticker}:{alert_type}')
+
+
+async def score_on_workers(ticker, timeout=None, priority=0):
+    """Queue a ticker ahead of scan jobs and wait for deliver_job_results to hand back its score"""
+    future = pending_scores.get(ticker)
+    if future is None:
+        future = pending_scores[ticker] = asyncio.get_running_loop().create_future()
+        await asyncio.to_thread(job_queue.enqueue, 'score', {'ticker': ticker}, priority, f'score:{ticker}')
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), SCORE_WORKER_TIMEOUT if timeout is None else timeout)
+    except asyncio.TimeoutError:
+        if pending_scores.get(ticker) is future:
+            del pending_scores[ticker]  # The next request queues it again
+        raise TimeoutError(f'Scoring workers did not answer for {ticker}')
+
+
+@tasks.loop(seconds=float(os.getenv('JOB_RESULT_POLL_SECONDS', '2')))
+async def deliver_job_results():
+    """Post alerts for tickers the scoring workers have finished"""
+    try:
+        jobs = await asyncio.to_thread(job_queue.results)
+        for job in jobs:
+            if job['kind'] != 'score':
+                continue
+            ticker = job['payload']['ticker']
+            waiting = pending_scores.pop(ticker, None)
+            if job['status'] == 'failed':
+                error = (job['error'] or '').strip().splitlines()[-1:]
+                logging.error(f'Scoring {ticker} failed: {error}')
+                if waiting is not None and not waiting.done():
+                    waiting.set_exception(RuntimeError(f'Scoring {ticker} failed: {"".join(error)}'))
+                continue
+            score_data = job['result']
+            score_cache.put(ticker, score_data)
+            if waiting is not None and not waiting.done():
+                waiting.set_result(score_data)
+            # /score and warmup jobs have no alert type; only scan results post
+            if job['payload'].get('alert_type') and score_data['score'] >= 60:
+                await post_alert(ticker, score_data, job['payload']['alert_type'])
+        
+        await asyncio.to_thread(job_queue.mark_delivered, [job['id'] for job in jobs])
+        depth = await asyncio.to_thread(job_queue.depth)
+        metrics.set_gauge('swarm_queue_depth', depth.get('queued', 0), queue='jobs')
+        metrics.set_gauge('swarm_queue_depth', depth.get('running', 0), queue='jobs_running')
+        
+    except Exception as e:
+        logging.error(f'Error delivering job results: {e}')
+
+
 async def post_alert(ticker, score_data, alert_type):
     """Post alert to appropriate channel based on SWARM SCORE"""
     try:
         score = score_data['score']
         
+        # A component the provider couldn't serve scores 0 and drags the total
+        # into a lower tier; skip rather than misroute (the next scan retries)
+        if score_data.get('partial'):
+            metrics.inc('swarm_alerts_total', tier='none', outcome='partial')
+            logging.warning(f"Skipping alert for {ticker}: partial score ({', '.join(score_data['partial'])} unavailable)")
+            return
+        
         # Determine channel based on score
         if score >= 90:
-            channel_id = CHANNEL_IDS['critical_setups']
+            channel_key = 'critical_setups'
             template = 'critical'
         elif score >= 75:
-            channel_id = CHANNEL_IDS['active_setups']
+            channel_key = 'active_setups'
             template = 'active'
         else:
-            channel_id = CHANNEL_IDS['watchlist']
+            channel_key = 'watchlist'
             template = 'watchlist'
         
-        if not channel_id:
-            logging.warning(f'Channel ID not set for score {score}')
-            return
+        # Every subscribed server's channel for this tier (cached routes)
+        channel_ids = router.channels_for(channel_key)
+        if not channel_ids:
+            logging.warning(f'No channels routed for {channel_key} (score {score})')
         
-        channel = bot.get_channel(channel_id)
-        if not channel:
-            logging.error(f'Channel {channel_id} not found')
+        channels = []
+        for channel_id in channel_ids:
+            channel = bot.get_channel(channel_id)
+            if channel:
+                channels.append(channel)
+            else:
+                logging.error(f'Channel {channel_id} not found')
+        # Watchers still get their DM when no server routes this tier
+        if not channels and not watchers.watchers(ticker):
             return
         
+        # Historical outcomes: the most similar past setups, else the whole tier
+        # (kept if the caller already supplied them). Added to a copy: the
+        # caller's dict may be the cached score, and stats aren't stored
+        with metrics.timed('similar_setups'):
+            stats = similar_setup_stats(neighbor_index, backtester, score_data, k=SIMILAR_SETUPS_K)
+        if not stats or stats['sample_size'] < SIMILAR_SETUPS_MIN:
+            stats = backtester.stats(template)
+        display_data = dict(score_data)
+        for key, value in stats.items():
+            if key not in ('horizons', 'neighbours'):
+                display_data.setdefault(key, value)
+        
         # Format alert message
-        message = format_alert(ticker, score_data, template)
+        message = format_alert(ticker, display_data, template)
         
         # Check if already posted recently (dedupe)
-        if await is_duplicate_alert(ticker, score):
+        with metrics.timed('duplicate_check'):
+            duplicate = await is_duplicate_alert(ticker, score)
+        if duplicate:
+            metrics.inc('swarm_alerts_total', tier=template, outcome='duplicate')
             logging.info(f'Skipping duplicate alert for {ticker}')
             return
         
-        # Post to Discord
-        await channel.send(message)
+        # Queue for Discord: each channel has its own worker and rate limit,
+        # so servers are delivered concurrently rather than one after another
+        summary = format_alert_summary(ticker, display_data)
+        for channel in channels:
+            dispatcher.enqueue(channel, message, tier=template, ticker=ticker, summary=summary)
+        dm_count = watchlist_notifier.notify(ticker, f"👀 {ticker} is on your watchlist\n\n{message}",
+                                             summary=summary, tier=template)
         
         # Save to database
-        db.save_alert(ticker, score, score_data, alert_type)
+        with metrics.timed('db_write'):
+            alert_id = await run_db(db.save_alert, ticker, score, score_data, alert_type)
+        neighbor_index.add(alert_id, score_data)
         
-        logging.info(f'Posted {template} alert for {ticker} (score: {score})')
+        metrics.inc('swarm_alerts_total', tier=template, outcome='queued')
+        logging.info(f'Queued {template} alert for {ticker} (score: {score}) to {len(channels)} channel(s), '
+                     f'{dm_count} watcher(s)')
         
     except Exception as e:
         logging.error(f'Error posting alert: {e}')
@@ -258,7 +559,9 @@ Setup Analysis:
 ├─ Financial: {score_data.get('financial_score', 0)}/15
 └─ News: {score_data.get('news_score', 0)}/10
 
-Historical pattern: {score_data.get('win_rate', 0)}% win rate on similar setups.
+Historical pattern: {score_data.get('win_rate', 0)}% win rate on {score_data.get('sample_size', 0)} similar setups \
+({score_data.get('wins', 0)}/{score_data.get('sample_size', 0)}, avg gain +{score_data.get('avg_gain', 0):.1f}%, \
+avg hold {score_data.get('avg_hold_time', 0)}h).
 
 [Full analysis available to Pro members]
 [Upgrade to Pro for entry zones, stops, and targets]"""
@@ -283,28 +586,255 @@ Current Analysis:
 Score breakdown: SEC {score_data.get('sec_score', 0)} | Tech {score_data.get('technical_score', 0)} | Finance {score_data.get('financial_score', 0)}"""
 
 
+def format_alert_summary(ticker, score_data):
+    """One-line alert summary used in coalesced digests"""
+    return (f"• {ticker} - SWARM {score_data['score']} | SEC {score_data.get('sec_score', 0)} | "
+            f"Tech {score_data.get('technical_score', 0)} | Finance {score_data.get('financial_score', 0)}")
+
+
+def format_watcher_digest(messages):
+    """One DM for several alerts on a user's watched tickers"""
+    lines = [f"👀 {len(messages)} tickers on your watchlist just alerted", ""]
+    lines.extend(msg.summary or msg.content.splitlines()[0] for msg in messages)
+    return '\n'.join(lines)
+
+
+def format_watchlist_digest(messages):
+    """Merge several watchlist alerts into one multi-ticker message"""
+    lines = [f"📋 SWARM Watchlist - {len(messages)} Early Stage Setups", ""]
+    lines.extend(msg.summary for msg in messages)
+    lines.append("")
+    lines.append("Status: Monitor only. Not actionable yet.")
+    return "\n".join(lines)
+
+
 async def is_duplicate_alert(ticker, score):
     """Check if alert was recently posted"""
-    # Check database for alerts in last 4 hours
-    recent = db.get_recent_alerts(ticker, hours=4)
+    # Check database for alerts in last 4 hours (off the event loop)
+    recent = await run_db(db.get_recent_alerts, ticker, 4)
     if recent and abs(recent[0]['score'] - score) < 5:
         return True
     return False
 
 
-@tasks.loop(hours=24)
+def warm_ticker(scorer, store, ticker):
+    """Backfill a ticker's indicator history if it has none (runs in a thread)"""
+    state = store.get(ticker)
+    if state is None or not state.seeded:
+        series = scorer.get_daily_data(ticker, 'full')
+        if series:
+            store.seed(ticker, series)
+
+
+def build_daily_briefing(tickers):
+    """Top scores, community trending and the biggest moves among warmed tickers"""
+    scored = []
+    for ticker in tickers:
+        cached = score_cache.peek(ticker)
+        if cached is not None:
+            scored.append((ticker, cached[0]))
+    
+    gap_threshold = float(os.getenv('BRIEFING_GAP_PERCENT', '3'))
+    gaps = []
+    for ticker, score_data in scored:
+        change = (score_data.get('features') or {}).get('change_percent')
+        if change is not None and abs(change) >= gap_threshold:
+            gaps.append((ticker, change))
+    
+    scored.sort(key=lambda item: item[1]['score'], reverse=True)
+    gaps.sort(key=lambda item: abs(item[1]), reverse=True)
+    return {
+        'date': datetime.now(MARKET_TZ).date().isoformat(),
+        'top': [(ticker, data['score'], data.get('confidence')) for ticker, data in scored[:5]],
+        'trending': db.get_community_trending(5),
+        'gaps': gaps[:5],
+        'tickers': len(tickers),
+    }
+
+
+def format_daily_briefing(briefing):
+    """Morning context message"""
+    day = datetime.fromisoformat(briefing['date']).strftime('%A, %B %d')
+    lines = [f"☀️ SWARM Morning Briefing - {day}", ""]
+    
+    lines.append("Top SWARM Scores:")
+    if briefing['top']:
+        lines.extend(f"├─ {ticker}: {score}/100 ({confidence})" for ticker, score, confidence in briefing['top'])
+    else:
+        lines.append("├─ No scored setups")
+    
+    lines.append("")
+    lines.append("Community Trending:")
+    if briefing['trending']:
+        lines.extend(f"├─ {ticker} ({count} watches)" for ticker, count in briefing['trending'])
+    else:
+        lines.append("├─ Nothing trending")
+    
+    lines.append("")
+    lines.append("Biggest Moves Last Session:")
+    if briefing['gaps']:
+        lines.extend(f"├─ {ticker}: {change:+.1f}%" for ticker, change in briefing['gaps'])
+    else:
+        lines.append("├─ No moves above threshold")
+    
+    lines.append("")
+    lines.append(f"Tracking {briefing['tickers']} watchlisted and recently alerted tickers.")
+    return "\n".join(lines)
+
+
+@tasks.loop(time=market_time('PREMARKET_WARMUP_TIME', '06:00'))
+async def premarket_warmup():
+    """
+    Spend the overnight API budget before the open: seed indicators and score
+    watchlisted and recently alerted tickers (which caches their daily bars and
+    overviews), then precompute the morning briefing
+    """
+    global daily_briefing
+    if datetime.now(MARKET_TZ).weekday() >= 5:
+        return
+    
+    try:
+        tickers = dict.fromkeys(await run_db(db.get_watchlisted_tickers))
+        tickers.update(dict.fromkeys(await run_db(
+            db.get_alerted_tickers, int(os.getenv('PREMARKET_ALERT_DAYS', '5')))))
+        tickers = list(tickers)[:int(os.getenv('PREMARKET_WARMUP_LIMIT', '100'))]
+        logging.info(f'Pre-market warmup for {len(tickers)} tickers')
+        
+        briefing_time = market_time('DAILY_CONTEXT_TIME', '07:00')
+        warmed = []
+        if job_queue is not None:
+            # The workers fetch, score and seed indicators; wait for them until the briefing
+            now = datetime.now(MARKET_TZ)
+            deadline = datetime.combine(now.date(), briefing_time.replace(tzinfo=None), MARKET_TZ)
+            budget = max(0.0, (deadline - now).total_seconds())
+            results = await asyncio.gather(
+                *(score_cache.refresh(ticker, lambda t: score_on_workers(t, budget, 2)) for ticker in tickers),
+                return_exceptions=True,
+            )
+            warmed = [ticker for ticker, result in zip(tickers, results) if not isinstance(result, BaseException)]
+            daily_briefing = await run_db(build_daily_briefing, tickers)
+            logging.info(f'Pre-market warmup done on the workers: {len(warmed)}/{len(tickers)} tickers')
+            return
+        
+        scorer = SwarmScore()
+        store = indicators.get_store()
+        await asyncio.to_thread(scorer.prefetch, tickers)
+        for ticker in tickers:
+            # Leave the briefing whatever is done by the time it posts
+            if datetime.now(MARKET_TZ).time() >= briefing_time.replace(tzinfo=None):
+                logging.warning(f'Pre-market warmup stopped at the briefing time ({len(warmed)}/{len(tickers)})')
+                break
+            try:
+                await asyncio.to_thread(warm_ticker, scorer, store, ticker)
+                await score_cache.refresh(ticker, calculate_swarm_score)
+                warmed.append(ticker)
+            except Exception as e:
+                logging.error(f'Error warming {ticker}: {e}')
+        
+        await asyncio.to_thread(store.save)
+        daily_briefing = await run_db(build_daily_briefing, tickers)
+        logging.info(f'Pre-market warmup done: {len(warmed)}/{len(tickers)} tickers')
+        
+    except Exception as e:
+        logging.error(f'Error in pre-market warmup: {e}')
+
+
+@tasks.loop(time=market_time('DAILY_CONTEXT_TIME', '07:00'))
 async def post_daily_context():
     """Post morning market context (7:00 AM ET)"""
+    global daily_briefing
+    if datetime.now(MARKET_TZ).weekday() >= 5:
+        return
+    
     try:
-        # Calculate time until 7 AM ET
-        now = datetime.now()
-        # This would post daily market context
-        # Implement based on your needs
+        briefing = daily_briefing
+        if briefing is None or briefing['date'] != datetime.now(MARKET_TZ).date().isoformat():
+            # Warmup didn't run (e.g. the bot started after it); use what's cached
+            tickers = await run_db(db.get_watchlisted_tickers)
+            tickers += await run_db(db.get_alerted_tickers)
+            briefing = await run_db(build_daily_briefing, list(dict.fromkeys(tickers)))
+        
+        message = format_daily_briefing(briefing)
+        for channel_id in router.channels_for('daily_context'):
+            channel = bot.get_channel(channel_id)
+            if channel:
+                dispatcher.enqueue(channel, message, tier='active')
+            else:
+                logging.error(f'Channel {channel_id} not found')
+        daily_briefing = None
         
     except Exception as e:
         logging.error(f'Error in daily context: {e}')
 
 
+@tasks.loop(seconds=float(os.getenv('DASHBOARD_REFRESH_SECONDS', '60')))
+async def refresh_dashboard():
+    """Edit the pinned top gainers / losers messages if any quote changed"""
+    global dashboard_version
+    
+    try:
+        if movers.version == dashboard_version:
+            return
+        dashboard_version = movers.version
+        
+        gainers, losers = movers.top()
+        as_of = datetime.now(MARKET_TZ).strftime('%H:%M ET')
+        for channel_key, title, rows in (('top_gainers', '📈 SWARM Top Gainers', gainers),
+                                          ('top_losers', '📉 SWARM Top Losers', losers)):
+            content = format_movers(title, rows, as_of)
+            for channel_id in router.channels_for(channel_key):
+                channel = bot.get_channel(channel_id)
+                if channel is None:
+                    continue
+                try:
+                    await dashboard_boards.publish(channel, title, content)
+                except Exception as e:
+                    logging.error(f'Error updating {channel_key} dashboard in {channel_id}: {e}')
+        
+    except Exception as e:
+        logging.error(f'Error refreshing dashboard: {e}')
+
+
+def format_movers(title, rows, as_of):
+    """Dashboard message for one side of the board"""
+    lines = [f"{title} (as of {as_of})", ""]
+    if not rows:
+        lines.append("No movers yet today.")
+    for rank, (ticker, change, price) in enumerate(rows, 1):
+        lines.append(f"{rank}. {ticker} {change:+.1f}% (${price:,.2f})")
+    return '\n'.join(lines)
+
+
+@tasks.loop(hours=float(os.getenv('BACKTEST_REFRESH_HOURS', '6')))
+async def refresh_backtest():
+    """
+    Join new alerts with the bars that followed them (off the event loop)
+    
+    Stays in the bot in worker mode too: it needs the alerts database, and its
+    fetches draw from the shared API budget (see market_data.share_limits).
+    """
+    try:
+        scorer = SwarmScore()
+        await run_db(backtester.refresh, db, scorer.get_daily_data)
+    except Exception as e:
+        logging.error(f'Error refreshing backtest: {e}')
+
+
+@tasks.loop(seconds=float(os.getenv('DATABASE_REPLICA_LAG_CHECK_SECONDS', '30')))
+async def check_replica_lag():
+    """Track read replica lag (reads fall back to the primary when it's too far behind)"""
+    await run_db(db.check_replica_lag)
+
+
+@tasks.loop(hours=float(os.getenv('ALERT_ARCHIVE_HOURS', '24')))
+async def archive_alerts():
+    """Move payloads of alerts past ALERT_HOT_DAYS into compressed archive segments"""
+    try:
+        await run_db(db.archive_alert_payloads)
+    except Exception as e:
+        logging.error(f'Error archiving alerts: {e}')
+
+
 # Slash Commands
 
 @bot.tree.command(name="score", description="Get current SWARM SCORE for any ticker")
@@ -313,12 +843,26 @@ async def score_command(interaction: discord.Interaction, ticker: str):
     """Get SWARM SCORE for a ticker"""
     await interaction.response.defer()
     
+    ticket = None
     try:
         ticker = ticker.upper().strip()
-        scorer = SwarmScore()
-        score_data = scorer.calculate_swarm_score(ticker)
         
-        message = f"""🎯 SWARM SCORE for {ticker}: {score_data['total_score']}/100
+        # Cached scores are cheap; only a fresh computation goes through admission
+        cached = score_cache.peek(ticker)
+        if cached is None or cached[1] > score_cache.max_stale_seconds:
+            ticket = score_admission.admit(interaction.user.id, interaction.guild_id, is_pro(interaction.user))
+            await score_admission.wait(
+                ticket,
+                on_position=lambda position: interaction.edit_original_response(
+                    content=f"⏳ Queued for a fresh {ticker} score: #{position + 1} in line"),
+                update_every=SCORE_QUEUE_UPDATE_SECONDS,
+                timeout=SCORE_QUEUE_TIMEOUT,
+            )
+        
+        # Served from the shared cache; a stale entry is refreshed in the background
+        score_data, age, stale = await score_cache.get(ticker, calculate_swarm_score)
+        
+        message = f"""🎯 SWARM SCORE for {ticker}: {score_data['score']}/100
 
 Breakdown:
 ├─ SEC Signal: {score_data['breakdown']['sec']['score']}/40
@@ -327,11 +871,60 @@ Breakdown:
 └─ News: {score_data['breakdown']['news']['score']}/10
 
 Confidence: {score_data['confidence']}"""
+        if age >= 60:
+            message += f"\nAs of {int(age // 60)}m ago" + (" (refreshing)" if stale else "")
+        if score_data.get('stale'):
+            oldest = max(score_data['stale'].values())
+            message += f"\n⚠️ Market data provider degraded: using data up to {oldest // 60}m old"
+        if score_data.get('partial'):
+            message += f"\n⚠️ Partial score: {', '.join(score_data['partial'])} data unavailable"
         
-        await interaction.followup.send(message)
+        await interaction.edit_original_response(content=message)
+        
+    except Rejected as e:
+        await interaction.edit_original_response(content=format_rejection(e))
+    except Exception as e:
+        await interaction.edit_original_response(content=f"Error calculating score: {str(e)}")
+    finally:
+        if ticket is not None:
+            score_admission.release(ticket)
+
+
+def is_pro(member):
+    """Whether a member has the Pro role (ROLE_IDS['pro'])"""
+    pro_role = ROLE_IDS.get('pro')
+    return bool(pro_role) and any(role.id == pro_role for role in getattr(member, 'roles', ()))
+
+
+def format_rejection(rejected):
+    """Reply for a /score request that wasn't admitted"""
+    if rejected.retry_after:
+        return f"⏳ Too many score requests ({rejected.reason}). Try again in {rejected.retry_after:.0f}s."
+    return f"⏳ /score is busy ({rejected.reason}). Try again shortly."
+
+
+@bot.tree.command(name="setup", description="Route a SWARM alert type to a channel in this server")
+@app_commands.describe(alert_type="Which alerts to route", channel="Channel to post them in")
+@app_commands.choices(alert_type=[app_commands.Choice(name=key, value=key) for key in CHANNEL_IDS])
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.guild_only()
+async def setup_command(interaction: discord.Interaction, alert_type: app_commands.Choice[str],
+                        channel: discord.TextChannel):
+    """Store this server's channel for an alert type"""
+    try:
+        await run_db(db.set_guild_channel, interaction.guild_id, alert_type.value, channel.id)
+        router.set(interaction.guild_id, alert_type.value, channel.id)
+        
+        await interaction.response.send_message(
+            f"✅ {alert_type.value} alerts will post in {channel.mention}",
+            ephemeral=True
+        )
         
     except Exception as e:
-        await interaction.followup.send(f"Error calculating score: {str(e)}")
+        await interaction.response.send_message(
+            f"Error: {str(e)}",
+            ephemeral=True
+        )
 
 
 @bot.tree.command(name="watch", description="Add ticker to your personal watchlist")
@@ -342,10 +935,11 @@ async def watch_command(interaction: discord.Interaction, ticker: str):
         ticker = ticker.upper().strip()
         user_id = interaction.user.id
         
-        db.add_to_watchlist(user_id, ticker)
+        await run_db(db.add_to_watchlist, user_id, ticker)
+        watchers.add(user_id, ticker)
         
         await interaction.response.send_message(
-            f"✅ Added {ticker} to your watchlist", 
+            f"✅ Added {ticker} to your watchlist (you'll get a DM when it alerts)", 
             ephemeral=True
         )
         
@@ -362,7 +956,7 @@ async def alerts_command(interaction: discord.Interaction):
     await interaction.response.defer()
     
     try:
-        alerts = db.get_todays_alerts(min_score=75)
+        alerts = await run_db(db.get_todays_alerts, 75)
         
         if not alerts:
             await interaction.followup.send("No high-scoring alerts today yet.")
@@ -386,7 +980,7 @@ async def history_command(interaction: discord.Interaction, ticker: str):
     
     try:
         ticker = ticker.upper().strip()
-        history = db.get_ticker_history(ticker, days=30)
+        history = await run_db(db.get_ticker_history, ticker, 30)
         
         if not history:
             await interaction.followup.send(f"No history found for {ticker}")
@@ -411,5 +1005,8 @@ if __name__ == "__main__":
         logging.error("DISCORD_BOT_TOKEN not set in environment")
         exit(1)
     
-    # Run bot
-    bot.run(TOKEN)
+    # Local Prometheus endpoint (METRICS_PORT, 0 disables)
+    metrics.start_metrics_server()
+    
+    # Run bot (log_handler=None keeps discord.py on our queued handlers)
+    bot.run(TOKEN, log_handler=None)
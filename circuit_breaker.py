@@ -0,0 +1,105 @@
+"""
+Circuit Breaker
+Stops calling a failing or throttled dependency for a cool-down period
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures
+
+    Once `cooldown` seconds have passed, a single trial call is let through
+    (half-open); its outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            # Open, or a half-open trial that never reported back
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state != 'closed':
+                self.state = 'closed'
+                metrics.set_gauge('swarm_circuit_open', 0, circuit=self.name)
+                logger.info(f'Circuit {self.name} closed')
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        if self.state != 'open':
+            metrics.set_gauge('swarm_circuit_open', 1, circuit=self.name)
+            logger.warning(f'Circuit {self.name} open for {self.cooldown:g}s')
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """
+    CircuitBreaker that publishes openings to a SQLite file
+
+    Failures are still counted per process, but once any process opens the
+    circuit, every process sharing the file stays out until the cooldown ends
+    (or until a trial call somewhere succeeds).
+    """
+
+    def __init__(self, path: str, name: str, failure_threshold: int = 3, cooldown: float = 60.0):
+        super().__init__(name, failure_threshold, cooldown)
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS circuit_breakers '
+                          '(name TEXT PRIMARY KEY, open_until REAL NOT NULL)')
+        self.db_lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not super().allow():
+            return False
+        if self.state != 'closed':
+            return True     # Our own half-open trial
+        with self.db_lock:
+            row = self.conn.execute('SELECT open_until FROM circuit_breakers WHERE name = ?',
+                                    (self.name,)).fetchone()
+        return row is None or row[0] <= time.time()
+
+    def record_success(self):
+        reopened = self.state != 'closed'
+        super().record_success()
+        if reopened:
+            with self.db_lock:
+                self.conn.execute('DELETE FROM circuit_breakers WHERE name = ?', (self.name,))
+
+    def _open(self):
+        super()._open()
+        with self.db_lock:
+            self.conn.execute('INSERT OR REPLACE INTO circuit_breakers (name, open_until) VALUES (?, ?)',
+                              (self.name, time.time() + self.cooldown))
@@ -0,0 +1,136 @@
+"""
+Live Dashboard
+Top gainers / losers kept as incremental top-K and shown in one pinned message per channel
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+Mover = Tuple[str, float, float]  # (ticker, change percent, price)
+
+
+class MoversBoard:
+    """
+    Latest daily change per ticker with the top and bottom `size` kept in heaps
+
+    Each quote is one push onto a max-heap and a min-heap (O(log n)). A
+    ticker's older entries aren't removed on update; they're recognised by
+    sequence number and dropped when they surface, and the heaps are rebuilt
+    once stale entries outnumber live ones. Reading the board pops at most
+    `size` live entries per side and pushes them back.
+    """
+
+    def __init__(self, size: int = 10, max_age: float = 21600.0):
+        self.size = size
+        self.max_age = max_age
+        self.latest: Dict[str, Tuple[float, float, float, int]] = {}  # ticker -> (change, price, as of, seq)
+        self.gainers: List[Tuple[float, int, str]] = []   # (-change, seq, ticker)
+        self.losers: List[Tuple[float, int, str]] = []    # (change, seq, ticker)
+        self.version = 0
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.latest)
+
+    def update(self, ticker: str, change: float, price: float, as_of: float = None):
+        """Record a quote (`as_of` is a wall-clock timestamp; defaults to now)"""
+        seq = next(self._seq)
+        self.latest[ticker] = (change, price, as_of if as_of is not None else time.time(), seq)
+        heapq.heappush(self.gainers, (-change, seq, ticker))
+        heapq.heappush(self.losers, (change, seq, ticker))
+        self.version += 1
+        if len(self.gainers) > 2 * len(self.latest) + 64:
+            self._compact()
+
+    def _compact(self):
+        self.gainers = [(-change, seq, ticker) for ticker, (change, _, _, seq) in self.latest.items()]
+        self.losers = [(change, seq, ticker) for ticker, (change, _, _, seq) in self.latest.items()]
+        heapq.heapify(self.gainers)
+        heapq.heapify(self.losers)
+
+    def _top(self, heap: List, keep: Callable[[float], bool], now: float) -> List[Mover]:
+        movers, taken = [], []
+        while heap and len(movers) < self.size:
+            entry = heapq.heappop(heap)
+            _, seq, ticker = entry
+            current = self.latest.get(ticker)
+            if current is None or current[3] != seq:
+                continue                                # superseded by a newer quote
+            change, price, as_of, _ = current
+            if now - as_of > self.max_age:
+                del self.latest[ticker]                 # its other-heap entry is now stale too
+                continue
+            taken.append(entry)
+            if not keep(change):
+                break
+            movers.append((ticker, change, price))
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return movers
+
+    def top(self, now: float = None) -> Tuple[List[Mover], List[Mover]]:
+        """(biggest gainers, biggest losers), each at most `size` long"""
+        now = now if now is not None else time.time()
+        gainers = self._top(self.gainers, lambda change: change > 0, now)
+        losers = self._top(self.losers, lambda change: change < 0, now)
+        return gainers, losers
+
+
+class PinnedBoards:
+    """
+    One pinned, edited-in-place message per channel
+
+    The message is found again after a restart by scanning the channel's pins
+    for one of ours starting with the board title. Edits are skipped when the
+    content hasn't changed, and each one takes a token from `bucket` (the
+    dispatcher's global bucket) so dashboards share Discord's bot-wide limit.
+    """
+
+    def __init__(self, author_id: Callable[[], Optional[int]], bucket: TokenBucket = None):
+        self.author_id = author_id
+        self.bucket = bucket
+        self.messages: Dict[int, object] = {}
+        self.rendered: Dict[int, str] = {}
+
+    async def _find(self, channel, title: str):
+        author_id = self.author_id()
+        for message in await channel.pins():
+            if message.author.id == author_id and message.content.startswith(title):
+                return message
+        return None
+
+    async def publish(self, channel, title: str, content: str) -> bool:
+        """Show `content` in the channel's board message; returns whether Discord was called"""
+        if self.rendered.get(channel.id) == content:
+            return False
+
+        message = self.messages.get(channel.id)
+        if message is None:
+            message = await self._find(channel, title)
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+        if message is not None:
+            try:
+                await message.edit(content=content)
+            except Exception as e:
+                if getattr(e, 'status', None) != 404:
+                    raise
+                message = None                          # deleted; post a new one below
+        if message is None:
+            message = await channel.send(content=content)
+            try:
+                await message.pin()
+            except Exception as e:
+                logger.warning(f'Could not pin dashboard in #{getattr(channel, "name", channel.id)}: {e}')
+
+        self.messages[channel.id] = message
+        self.rendered[channel.id] = content
+        return True
@@ -3,12 +3,19 @@ Database layer for SWARM Intelligence
 PostgreSQL with SQLAlchemy ORM
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, JSON, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Boolean, JSON, Text, LargeBinary, UniqueConstraint, func, null
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, scoped_session, sessionmaker
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import os
+import json
 import logging
+import threading
+import time
+import zlib
+
+import metrics
 
 Base = declarative_base()
 
@@ -25,7 +32,9 @@ class Alert(Base):
     news_score = Column(Float)
     alert_type = Column(String(50))
     channel = Column(String(50))
-    score_data = Column(JSON)
+    # Full payload; only loaded when asked for, and moved to AlertArchive once the
+    # alert is older than ALERT_HOT_DAYS (NULL here means it's archived)
+    score_data = deferred(Column(JSON))
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     def to_dict(self):
@@ -99,6 +108,47 @@ class TradeLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class GuildChannel(Base):
+    """Per-guild channel routing (which channel gets which alert type)"""
+    __tablename__ = 'guild_channels'
+    __table_args__ = (UniqueConstraint('guild_id', 'channel_key'),)
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(String(50), index=True)
+    channel_key = Column(String(50))      # Key of CHANNEL_IDS, e.g. 'critical_setups'
+    channel_id = Column(String(50))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AlertArchive(Base):
+    """Compressed score_data for a run of older alerts (one segment per id range)"""
+    __tablename__ = 'alert_archive'
+    
+    id = Column(Integer, primary_key=True)
+    first_alert_id = Column(Integer, index=True)
+    last_alert_id = Column(Integer, index=True)
+    alert_count = Column(Integer)
+    payload = deferred(Column(LargeBinary))    # zlib-compressed JSON {alert_id: score_data}
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def pack_payloads(payloads):
+    """Compress {alert_id: score_data} into an archive segment"""
+    return zlib.compress(json.dumps(payloads, separators=(',', ':'), default=str).encode(), 9)
+
+
+def unpack_payloads(blob):
+    """Inverse of pack_payloads"""
+    return {int(alert_id): data for alert_id, data in json.loads(zlib.decompress(blob)).items()}
+
+
+def _normalize_url(database_url):
+    """Fix Railway PostgreSQL URL format"""
+    if database_url.startswith('postgres://'):
+        return database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
 class Database:
     """Database interface"""
     
@@ -111,20 +161,105 @@ class Database:
             database_url = 'sqlite:///swarm.db'
             logging.warning('Using SQLite database for development')
         
-        # Fix Railway PostgreSQL URL format
-        if database_url and database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
-        self.engine = create_engine(database_url, echo=False)
+        self.engine = create_engine(_normalize_url(database_url), echo=False)
         Base.metadata.create_all(self.engine)
         
+        # One Session per thread: the event loop and asyncio.to_thread workers
+        # never share one (call release() when a worker thread is done)
         Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        self.session = scoped_session(Session)
+        
+        # Optional read replica for read-only methods. A thread's reads go to the
+        # primary for DATABASE_READ_PIN_SECONDS after its session commits (or the
+        # measured lag, if longer) so it sees its own writes, and everyone's do
+        # while the replica is more than DATABASE_REPLICA_MAX_LAG_SECONDS behind.
+        read_url = os.getenv('DATABASE_READ_URL')
+        if read_url:
+            # Autocommit: replica reads never hold a transaction (or a snapshot) open
+            self.read_engine = create_engine(_normalize_url(read_url), echo=False, isolation_level='AUTOCOMMIT')
+            self.read_session = scoped_session(sessionmaker(bind=self.read_engine))
+            logging.info('Routing reads to DATABASE_READ_URL')
+        else:
+            self.read_engine = self.engine
+            self.read_session = None
+        self.read_pin_seconds = float(os.getenv('DATABASE_READ_PIN_SECONDS', '5'))
+        self.replica_max_lag = float(os.getenv('DATABASE_REPLICA_MAX_LAG_SECONDS', '30'))
+        self.replica_lag = None
+        self.read_pins = threading.local()  # Per thread, like the scoped sessions
+        event.listen(Session, 'after_commit', self._pin_reads)
+        
+        # Recently read archive segments (segment id -> payloads)
+        self.archive_cache = OrderedDict()
+        self.archive_lock = threading.Lock()
+        self.archive_cache_size = int(os.getenv('ALERT_ARCHIVE_CACHE_SEGMENTS', '8'))
         
         logging.info('Database initialized successfully')
     
+    @property
+    def reader(self):
+        """Session for read-only queries (the replica unless reads are pinned to the primary)"""
+        if self.read_session is None or time.monotonic() < self.pinned_until:
+            return self.session
+        if self.replica_lag is not None and self.replica_lag > self.replica_max_lag:
+            return self.session
+        # Start from an empty identity map so rows are never served from a previous
+        # read (scoped per thread, so this never touches another thread's read)
+        self.read_session.close()
+        return self.read_session
+    
+    def release(self):
+        """Close the calling thread's session (end of a unit of work in a worker thread)"""
+        self.session.remove()
+        if self.read_session is not None:
+            self.read_session.remove()
+        self.read_pins.until = 0.0  # Pooled threads go on to unrelated work
+    
+    @property
+    def pinned_until(self) -> float:
+        """Monotonic time until which the calling thread reads from the primary"""
+        return getattr(self.read_pins, 'until', 0.0)
+    
+    def pin_reads(self, until: float):
+        """Keep the calling thread's reads on the primary until `until` (e.g. a pin carried over from another thread)"""
+        self.read_pins.until = max(self.pinned_until, until)
+    
+    def _pin_reads(self, session):
+        self.pin_reads(time.monotonic() + max(self.read_pin_seconds, self.replica_lag or 0))
+    
+    def check_replica_lag(self):
+        """
+        Seconds the replica is behind on alerts (None without a replica)
+        
+        Measured as the age of the oldest alert the primary has and the replica
+        doesn't, so it works on any backend and is 0 when the replica is caught up.
+        Only missing inserts are seen: a replica that is behind on UPDATEs alone
+        (e.g. the archive clearing score_data) reports 0 until a new alert arrives.
+        Reads pinned to the primary after our own writes cover that case for this
+        process.
+        """
+        if self.read_session is None:
+            return None
+        try:
+            with self.read_engine.connect() as conn:
+                replica_last_id = conn.execute(func.max(Alert.id).select()).scalar() or 0
+            with self.engine.connect() as conn:
+                oldest_missing = conn.execute(
+                    func.min(Alert.created_at).select().where(Alert.id > replica_last_id)
+                ).scalar()
+            
+            lag = max((datetime.utcnow() - oldest_missing).total_seconds(), 0.0) if oldest_missing else 0.0
+            if lag > self.replica_max_lag:
+                logging.warning(f'Replica {lag:.0f}s behind; reading from the primary')
+            self.replica_lag = lag
+            metrics.set_gauge('swarm_db_replica_lag_seconds', lag)
+            return lag
+            
+        except Exception as e:
+            logging.error(f'Error checking replica lag: {e}')
+            return self.replica_lag
+    
     def save_alert(self, ticker, score, score_data, alert_type):
-        """Save new alert to database"""
+        """Save new alert to database (returns the new alert id)"""
         try:
             alert = Alert(
                 ticker=ticker,
@@ -144,16 +279,18 @@ class Database:
             self.update_ticker_metadata(ticker, score)
             
             logging.info(f'Saved alert for {ticker} (score: {score})')
+            return alert.id
             
         except Exception as e:
             self.session.rollback()
             logging.error(f'Error saving alert: {e}')
+            return None
     
     def get_recent_alerts(self, ticker, hours=4):
         """Get recent alerts for a ticker"""
         try:
             cutoff = datetime.utcnow() - timedelta(hours=hours)
-            alerts = self.session.query(Alert)\
+            alerts = self.reader.query(Alert)\
                 .filter(Alert.ticker == ticker)\
                 .filter(Alert.created_at >= cutoff)\
                 .order_by(Alert.created_at.desc())\
@@ -170,7 +307,7 @@ class Database:
         try:
             today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
             
-            alerts = self.session.query(Alert)\
+            alerts = self.reader.query(Alert)\
                 .filter(Alert.created_at >= today)\
                 .filter(Alert.score >= min_score)\
                 .order_by(Alert.score.desc())\
@@ -187,7 +324,7 @@ class Database:
         try:
             cutoff = datetime.utcnow() - timedelta(days=days)
             
-            alerts = self.session.query(Alert)\
+            alerts = self.reader.query(Alert)\
                 .filter(Alert.ticker == ticker)\
                 .filter(Alert.created_at >= cutoff)\
                 .order_by(Alert.created_at.desc())\
@@ -199,6 +336,127 @@ class Database:
             logging.error(f'Error getting ticker history: {e}')
             return []
     
+    def get_alerts_since(self, alert_id=0, include_score_data=False):
+        """Get alerts newer than alert_id (oldest first) for the backtester / neighbour index"""
+        try:
+            columns = [Alert.id, Alert.ticker, Alert.score, Alert.created_at]
+            if include_score_data:
+                columns.append(Alert.score_data)
+            
+            rows = self.reader.query(*columns)\
+                .filter(Alert.id > alert_id)\
+                .order_by(Alert.id)\
+                .all()
+            
+            alerts = [row._asdict() for row in rows]
+            
+            # Older payloads live in archive segments
+            archived = [a['id'] for a in alerts if include_score_data and a['score_data'] is None]
+            if archived:
+                payloads = self.get_archived_payloads(archived)
+                for alert in alerts:
+                    if alert['score_data'] is None:
+                        alert['score_data'] = payloads.get(alert['id'])
+            
+            return alerts
+            
+        except Exception as e:
+            logging.error(f'Error getting alerts since {alert_id}: {e}')
+            return []
+    
+    def get_alert_payload(self, alert_id):
+        """Full score_data for one alert, from the row or its archive segment"""
+        try:
+            row = self.reader.query(Alert.score_data).filter(Alert.id == alert_id).first()
+            if row is None:
+                return None
+            if row.score_data is not None:
+                return row.score_data
+            return self.get_archived_payloads([alert_id]).get(alert_id)
+            
+        except Exception as e:
+            logging.error(f'Error getting payload for alert {alert_id}: {e}')
+            return None
+    
+    def get_archived_payloads(self, alert_ids):
+        """{alert_id: score_data} for archived alerts (each segment is read once)"""
+        wanted = set(alert_ids)
+        if not wanted:
+            return {}
+        
+        segments = self.reader.query(AlertArchive.id)\
+            .filter(AlertArchive.last_alert_id >= min(wanted))\
+            .filter(AlertArchive.first_alert_id <= max(wanted))\
+            .order_by(AlertArchive.first_alert_id)\
+            .all()
+        
+        found = {}
+        for segment in segments:
+            payloads = self._load_segment(segment.id)
+            found.update((alert_id, payloads[alert_id]) for alert_id in wanted.intersection(payloads))
+        return found
+    
+    def _load_segment(self, segment_id):
+        with self.archive_lock:
+            payloads = self.archive_cache.get(segment_id)
+            if payloads is not None:
+                self.archive_cache.move_to_end(segment_id)
+                return payloads
+        
+        blob = self.reader.query(AlertArchive.payload).filter(AlertArchive.id == segment_id).scalar()
+        payloads = unpack_payloads(blob)
+        with self.archive_lock:
+            self.archive_cache[segment_id] = payloads
+            while len(self.archive_cache) > self.archive_cache_size:
+                self.archive_cache.popitem(last=False)
+        return payloads
+    
+    def archive_alert_payloads(self, days=None, segment_size=None):
+        """
+        Move score_data of alerts older than `days` (ALERT_HOT_DAYS) into
+        compressed archive segments; returns the number of alerts archived
+        
+        Each segment is written and the inline payloads cleared in one
+        transaction, so an interrupted run never loses a payload.
+        """
+        days = days if days is not None else int(os.getenv('ALERT_HOT_DAYS', '30'))
+        segment_size = segment_size or int(os.getenv('ALERT_ARCHIVE_SEGMENT_SIZE', '1000'))
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        archived = 0
+        
+        try:
+            while True:
+                rows = self.session.query(Alert.id, Alert.score_data)\
+                    .filter(Alert.created_at < cutoff)\
+                    .filter(Alert.score_data.isnot(None))\
+                    .order_by(Alert.id)\
+                    .limit(segment_size)\
+                    .all()
+                if not rows:
+                    break
+                
+                payloads = {row.id: row.score_data for row in rows}
+                self.session.add(AlertArchive(
+                    first_alert_id=rows[0].id,
+                    last_alert_id=rows[-1].id,
+                    alert_count=len(rows),
+                    payload=pack_payloads(payloads),
+                ))
+                self.session.query(Alert)\
+                    .filter(Alert.id.in_(list(payloads)))\
+                    .update({Alert.score_data: null()}, synchronize_session=False)
+                self.session.commit()
+                archived += len(rows)
+            
+            if archived:
+                logging.info(f'Archived payloads of {archived} alerts older than {days} days')
+            return archived
+            
+        except Exception as e:
+            self.session.rollback()
+            logging.error(f'Error archiving alert payloads: {e}')
+            return archived
+    
     def update_ticker_metadata(self, ticker, score):
         """Update ticker metadata after new alert"""
         try:
@@ -255,6 +513,43 @@ class Database:
             logging.error(f'Error adding to watchlist: {e}')
             raise
     
+    def get_watchlisted_tickers(self):
+        """Every ticker on at least one user's watchlist"""
+        try:
+            rows = self.reader.query(Watchlist.ticker).distinct().all()
+            return [row.ticker for row in rows]
+            
+        except Exception as e:
+            logging.error(f'Error getting watchlisted tickers: {e}')
+            return []
+    
+    def get_watchers(self):
+        """Every (user_id, ticker) watchlist entry, for the in-memory watcher index"""
+        try:
+            rows = self.reader.query(Watchlist.user_id, Watchlist.ticker).all()
+            return [(int(row.user_id), row.ticker) for row in rows]
+            
+        except Exception as e:
+            logging.error(f'Error getting watchers: {e}')
+            return []
+    
+    def get_alerted_tickers(self, days=5):
+        """Tickers alerted in the last `days` days, highest score first"""
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            
+            rows = self.reader.query(Alert.ticker, func.max(Alert.score).label('score'))\
+                .filter(Alert.created_at >= cutoff)\
+                .group_by(Alert.ticker)\
+                .order_by(func.max(Alert.score).desc())\
+                .all()
+            
+            return [row.ticker for row in rows]
+            
+        except Exception as e:
+            logging.error(f'Error getting alerted tickers: {e}')
+            return []
+    
     def increment_community_watch(self, ticker):
         """Increment community watch count (anonymous)"""
         try:
@@ -281,7 +576,7 @@ class Database:
             # Get tickers watched in last 7 days
             cutoff = datetime.utcnow() - timedelta(days=7)
             
-            trending = self.session.query(CommunityWatch)\
+            trending = self.reader.query(CommunityWatch)\
                 .filter(CommunityWatch.last_watched >= cutoff)\
                 .order_by(CommunityWatch.watch_count.desc())\
                 .limit(limit)\
@@ -339,10 +634,59 @@ class Database:
             logging.error(f'Error logging trade exit: {e}')
             raise
     
+    def get_guild_channels(self):
+        """All channel routes as (guild_id, channel_key, channel_id)"""
+        try:
+            rows = self.reader.query(GuildChannel).all()
+            return [(int(r.guild_id), r.channel_key, int(r.channel_id)) for r in rows]
+            
+        except Exception as e:
+            logging.error(f'Error getting guild channels: {e}')
+            return []
+    
+    def set_guild_channel(self, guild_id, channel_key, channel_id):
+        """Route one alert type to a channel in a guild"""
+        try:
+            route = self.session.query(GuildChannel)\
+                .filter(GuildChannel.guild_id == str(guild_id))\
+                .filter(GuildChannel.channel_key == channel_key)\
+                .first()
+            
+            if route:
+                route.channel_id = str(channel_id)
+            else:
+                route = GuildChannel(guild_id=str(guild_id), channel_key=channel_key, channel_id=str(channel_id))
+                self.session.add(route)
+            
+            self.session.commit()
+            logging.info(f'Routed {channel_key} to channel {channel_id} in guild {guild_id}')
+            
+        except Exception as e:
+            self.session.rollback()
+            logging.error(f'Error setting guild channel: {e}')
+            raise
+    
+    def remove_guild_channels(self, guild_id, channel_key=None):
+        """Drop a guild's routes (all of them, or one alert type)"""
+        try:
+            query = self.session.query(GuildChannel)\
+                .filter(GuildChannel.guild_id == str(guild_id))
+            if channel_key:
+                query = query.filter(GuildChannel.channel_key == channel_key)
+            
+            removed = query.delete()
+            self.session.commit()
+            return removed
+            
+        except Exception as e:
+            self.session.rollback()
+            logging.error(f'Error removing guild channels: {e}')
+            return 0
+    
     def get_user_stats(self, user_id):
         """Get user's trading statistics"""
         try:
-            trades = self.session.query(TradeLog)\
+            trades = self.reader.query(TradeLog)\
                 .filter(TradeLog.user_id == str(user_id))\
                 .filter(TradeLog.exit_price.isnot(None))\
                 .all()
@@ -0,0 +1,237 @@
+"""
+Outbound Discord dispatcher
+Per-channel priority queues with rate limiting and watchlist coalescing
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Lower sends first; critical setups jump ahead of anything already queued
+TIER_PRIORITY = {
+    'critical': 0,
+    'active': 1,
+    'watchlist': 2,
+}
+
+MAX_MESSAGE_LENGTH = 2000  # Discord hard limit
+
+
+class OutboundMessage:
+    """A message waiting for its channel's next send slot"""
+
+    __slots__ = ('content', 'embed', 'tier', 'ticker', 'summary', 'enqueued_at')
+
+    def __init__(self, content: str, tier: str, ticker: str = None,
+                 summary: str = None, embed=None, enqueued_at: float = None):
+        self.content = content
+        self.embed = embed
+        self.tier = tier
+        self.ticker = ticker
+        self.summary = summary
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.monotonic()
+
+
+def default_merge(messages: List[OutboundMessage]) -> str:
+    """Fallback digest: one line per coalesced alert"""
+    lines = [f"📋 {len(messages)} alerts"]
+    for msg in messages:
+        lines.append(msg.summary or msg.content.splitlines()[0])
+    return '\n'.join(lines)
+
+
+class ChannelQueue:
+    """Send queue, coalescing buffer and rate-limit bucket for one channel"""
+
+    def __init__(self, channel, bucket: TokenBucket):
+        self.channel = channel
+        self.name = str(getattr(channel, 'name', None) or getattr(channel, 'id', 'unknown'))
+        self.bucket = bucket
+        self.heap = []
+        self.pending: List[OutboundMessage] = []
+        self.flush_handle = None
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.sending = False
+        self.last_wait = 0.0
+
+    def depth(self) -> int:
+        return len(self.heap) + len(self.pending)
+
+    def oldest_age(self, now: float) -> float:
+        """Seconds the oldest waiting message has been queued"""
+        queued = [item[2].enqueued_at for item in self.heap] + [m.enqueued_at for m in self.pending]
+        return now - min(queued) if queued else 0.0
+
+
+class AlertDispatcher:
+    """
+    Delivers alerts without blocking the scan loop
+
+    Each channel gets its own worker that drains a priority queue at the rate
+    Discord allows for a single channel (5 messages / 5 s by default).
+    Messages in `coalesce_tiers` are held for `coalesce_window` seconds and
+    merged into one digest via `merge`. `global_rate` / `global_per` cap sends
+    across all channels (Discord's bot-wide limit is 50 requests/s).
+    """
+
+    def __init__(self, rate: float = 5, per: float = 5.0,
+                 coalesce_window: float = 10.0, coalesce_tiers=('watchlist',),
+                 max_batch: int = 10, merge: Callable[[List[OutboundMessage]], str] = None,
+                 lag_warning: float = 30.0, global_rate: float = None, global_per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self.coalesce_window = coalesce_window
+        self.coalesce_tiers = set(coalesce_tiers)
+        self.max_batch = max_batch
+        self.merge = merge or default_merge
+        self.lag_warning = lag_warning
+        self.global_bucket = TokenBucket(global_rate, global_per) if global_rate else None
+        self.queues: Dict[int, ChannelQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue_for(self, channel) -> ChannelQueue:
+        cq = self.queues.get(channel.id)
+        if cq is None:
+            cq = self.queues[channel.id] = ChannelQueue(channel, TokenBucket(self.rate, self.per))
+        if cq.worker is None or cq.worker.done():
+            cq.worker = asyncio.get_running_loop().create_task(self._worker(cq))
+        return cq
+
+    def enqueue(self, channel, content: str, tier: str = 'active', ticker: str = None,
+                summary: str = None, embed=None):
+        """Queue a message for `channel`; returns immediately"""
+        cq = self._queue_for(channel)
+        msg = OutboundMessage(content, tier, ticker=ticker, summary=summary, embed=embed)
+
+        if tier in self.coalesce_tiers and self.coalesce_window > 0:
+            cq.pending.append(msg)
+            if len(cq.pending) >= self.max_batch:
+                self._flush_pending(cq)
+            elif cq.flush_handle is None:
+                cq.flush_handle = asyncio.get_running_loop().call_later(
+                    self.coalesce_window, self._flush_pending, cq
+                )
+        else:
+            self._push(cq, msg)
+
+        self._report(cq)
+
+    def _push(self, cq: ChannelQueue, msg: OutboundMessage):
+        heapq.heappush(cq.heap, (TIER_PRIORITY.get(msg.tier, 1), next(self._seq), msg))
+        cq.wakeup.set()
+
+    def _flush_pending(self, cq: ChannelQueue):
+        """Move the coalescing buffer onto the send queue as one message"""
+        if cq.flush_handle is not None:
+            cq.flush_handle.cancel()
+            cq.flush_handle = None
+        batch, cq.pending = cq.pending, []
+        if not batch:
+            return
+
+        if len(batch) == 1:
+            self._push(cq, batch[0])
+            return
+
+        try:
+            content = self.merge(batch)
+        except Exception as e:
+            logger.error(f'Error merging {len(batch)} alerts for #{cq.name}: {e}')
+            for msg in batch:
+                self._push(cq, msg)
+            return
+
+        if len(content) > MAX_MESSAGE_LENGTH:
+            content = content[:MAX_MESSAGE_LENGTH - 1] + '…'
+        merged = OutboundMessage(
+            content, batch[0].tier,
+            ticker=','.join(m.ticker for m in batch if m.ticker),
+            enqueued_at=min(m.enqueued_at for m in batch),
+        )
+        logger.info(f'Coalesced {len(batch)} {merged.tier} alerts for #{cq.name}')
+        self._push(cq, merged)
+
+    async def _worker(self, cq: ChannelQueue):
+        """Drain one channel's queue within its rate limit"""
+        while True:
+            while not cq.heap:
+                cq.wakeup.clear()
+                await cq.wakeup.wait()
+
+            await cq.bucket.acquire()
+            if self.global_bucket is not None:
+                await self.global_bucket.acquire()
+            priority, seq, msg = heapq.heappop(cq.heap)
+
+            cq.sending = True
+            try:
+                with metrics.timed('discord_send', tier=msg.tier):
+                    await cq.channel.send(content=msg.content, embed=msg.embed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if getattr(e, 'status', None) == 429:
+                    retry_after = float(getattr(e, 'retry_after', None) or self.per)
+                    logger.warning(f'Rate limited on #{cq.name}, retrying in {retry_after:.1f}s')
+                    cq.bucket.penalize(retry_after)
+                    heapq.heappush(cq.heap, (priority, seq, msg))
+                    continue
+                logger.error(f'Error sending {msg.tier} alert for {msg.ticker} to #{cq.name}: {e}')
+            else:
+                cq.sent += 1
+                cq.last_wait = time.monotonic() - msg.enqueued_at
+                metrics.observe_stage('discord_queue_wait', cq.last_wait, tier=msg.tier)
+                if cq.last_wait > self.lag_warning:
+                    logger.warning(f'#{cq.name} is {cq.last_wait:.0f}s behind ({cq.depth()} queued)')
+            finally:
+                cq.sending = False
+
+            self._report(cq)
+
+    def _report(self, cq: ChannelQueue):
+        metrics.set_gauge('swarm_queue_depth', cq.depth(), queue=f'discord:{cq.name}')
+        metrics.set_gauge('swarm_channel_lag_seconds', cq.oldest_age(time.monotonic()), channel=cq.name)
+
+    def lag_report(self) -> Dict[str, Dict]:
+        """How far each channel has fallen behind"""
+        now = time.monotonic()
+        return {
+            cq.name: {
+                'queued': len(cq.heap),
+                'coalescing': len(cq.pending),
+                'oldest_age_s': round(cq.oldest_age(now), 2),
+                'last_wait_s': round(cq.last_wait, 2),
+                'sent': cq.sent,
+            }
+            for cq in self.queues.values()
+        }
+
+    async def drain(self, timeout: float = None):
+        """Flush coalescing buffers and wait until every queue is empty"""
+        for cq in self.queues.values():
+            self._flush_pending(cq)
+
+        async def wait_empty():
+            while any(cq.heap or cq.sending for cq in self.queues.values()):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(wait_empty(), timeout)
+
+    async def close(self):
+        """Stop all channel workers"""
+        for cq in self.queues.values():
+            if cq.flush_handle is not None:
+                cq.flush_handle.cancel()
+            if cq.worker is not None:
+                cq.worker.cancel()
+        await asyncio.gather(*(cq.worker for cq in self.queues.values() if cq.worker), return_exceptions=True)
@@ -0,0 +1,301 @@
+"""
+SWARM History Export
+Streams alerts and trade logs into compressed columnar files for research
+
+    python export.py alerts trade_logs --out ~/exports            # since last run
+    python export.py alerts --format arrow --full                  # everything
+
+Rows are read with a server-side cursor in fixed-size batches and written one
+batch at a time, so memory use doesn't grow with the table. Each table keeps a
+watermark in EXPORT_STATE_PATH; later runs export only newer rows.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+
+from database import Alert, Database, TradeLog
+from log_config import setup_logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional; exports fall back to gzipped CSV
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'export_state.json'
+DEFAULT_BATCH_SIZE = 5000
+
+# score_data keys exported as their own columns (anything else is dropped)
+SCORE_DATA_COLUMNS = (
+    ('confidence', 'str'),
+    ('strategy', 'str'),
+    ('partial', 'str'),
+    ('win_rate', 'float'),
+    ('sample_size', 'int'),
+    ('avg_gain', 'float'),
+    ('avg_hold_time', 'float'),
+)
+FEATURE_COLUMNS = ('change_percent', 'volume_ratio', 'pct_from_high', 'pct_vs_sma20',
+                   'pct_vs_sma50', 'pct_vs_sma200', 'rsi')
+
+ALERT_COLUMNS = [
+    ('id', 'int'), ('ticker', 'str'), ('score', 'int'), ('sec_score', 'float'),
+    ('technical_score', 'float'), ('financial_score', 'float'), ('news_score', 'float'),
+    ('alert_type', 'str'), ('channel', 'str'), ('created_at', 'time'),
+] + list(SCORE_DATA_COLUMNS) + [(f'feature_{name}', 'float') for name in FEATURE_COLUMNS]
+
+TRADE_COLUMNS = [
+    ('id', 'int'), ('user_id', 'str'), ('ticker', 'str'), ('entry_date', 'time'),
+    ('entry_price', 'float'), ('shares', 'int'), ('exit_date', 'time'), ('exit_price', 'float'),
+    ('pnl', 'float'), ('notes', 'str'), ('created_at', 'time'),
+]
+
+
+def _as(kind: str, value):
+    """Coerce a JSON value to a column type (None if it doesn't fit)"""
+    if value is None:
+        return None
+    try:
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    if kind == 'str':
+        return ','.join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+    return value
+
+
+def flatten_alert(row: Dict) -> Dict:
+    """An alerts row with score_data spread into columns"""
+    score_data = row.pop('score_data', None) or {}
+    features = score_data.get('features') or {}
+    for name, kind in SCORE_DATA_COLUMNS:
+        row[name] = _as(kind, score_data.get(name))
+    for name in FEATURE_COLUMNS:
+        row[f'feature_{name}'] = _as('float', score_data.get(name, features.get(name)))
+    return row
+
+
+# table -> model, output columns, keyset watermark columns, row filter, row transform
+EXPORTS = {
+    'alerts': {
+        'model': Alert,
+        'columns': ALERT_COLUMNS,
+        'watermark': ('id',),
+        'where': None,
+        'flatten': flatten_alert,
+    },
+    # Trades change when they're closed, so incremental runs export closed trades
+    # in the order they closed; --full also includes open ones
+    'trade_logs': {
+        'model': TradeLog,
+        'columns': TRADE_COLUMNS,
+        'watermark': ('exit_date', 'id'),
+        'where': TradeLog.exit_date.isnot(None),
+        'flatten': None,
+    },
+}
+
+
+class _BatchWriter:
+    """Writes column batches as Parquet, Arrow IPC or gzipped CSV"""
+
+    EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv.gz'}
+
+    def __init__(self, path: Path, columns: List[Tuple[str, str]], fmt: str):
+        self.path = path
+        self.columns = columns
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.file = gzip.open(path, 'wt', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow([name for name, _ in columns])
+            return
+
+        if pa is None:
+            raise RuntimeError(f'{fmt} export needs pyarrow (pip install pyarrow)')
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'time': pa.timestamp('us')}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(str(path), self.schema, compression='zstd')
+        else:
+            self.file = pa.OSFile(str(path), 'wb')
+            self.writer = pa.ipc.new_file(self.file, self.schema,
+                                          options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def write(self, rows: List[Dict]):
+        if self.fmt == 'csv':
+            for row in rows:
+                self.writer.writerow(['' if row.get(name) is None else row[name] for name, _ in self.columns])
+            return
+        data = {name: [row.get(name) for row in rows] for name, _ in self.columns}
+        self.writer.write_batch(pa.RecordBatch.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self.writer.close()
+        elif self.fmt == 'arrow':
+            self.writer.close()
+            self.file.close()
+        else:
+            self.file.close()
+
+
+def load_watermarks(path: Path) -> Dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(path: Path, watermarks: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(watermarks, f, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+def _after(columns, watermark: List):
+    """Keyset condition: (col1, col2, ...) > watermark"""
+    first, rest = columns[0], columns[1:]
+    if not rest:
+        return first > watermark[0]
+    return or_(first > watermark[0], and_(first == watermark[0], _after(rest, watermark[1:])))
+
+
+def stream_rows(engine, table: str, watermark: Optional[List] = None, full: bool = False,
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                archived: Optional[Callable[[List[int]], Dict]] = None) -> Iterable[List[Dict]]:
+    """
+    Batches of flattened rows, oldest first, after `watermark`
+
+    `archived` (e.g. Database.get_archived_payloads) fills in alert payloads
+    that have been moved to the archive.
+    """
+    spec = EXPORTS[table]
+    model = spec['model']
+    key_columns = [getattr(model, name) for name in spec['watermark']]
+
+    query = select(model.__table__).order_by(*key_columns)
+    if not full:
+        if spec['where'] is not None:
+            query = query.where(spec['where'])
+        if watermark:
+            query = query.where(_after(key_columns, _parse_watermark(model, spec['watermark'], watermark)))
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for partition in result.mappings().partitions(batch_size):
+            rows = [dict(row) for row in partition]
+            missing = [row['id'] for row in rows if 'score_data' in row and row['score_data'] is None]
+            if archived and missing:
+                payloads = archived(missing)
+                for row in rows:
+                    if row['score_data'] is None:
+                        row['score_data'] = payloads.get(row['id'])
+            if spec['flatten']:
+                rows = [spec['flatten'](row) for row in rows]
+            yield rows
+
+
+def _parse_watermark(model, names, watermark: List) -> List:
+    """Watermark values from JSON (datetimes are stored as ISO strings)"""
+    values = []
+    for name, value in zip(names, watermark):
+        if isinstance(value, str) and getattr(model, name).type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        values.append(value)
+    return values
+
+
+def export_table(engine, table: str, out_dir: Path, fmt: str = 'parquet', full: bool = False,
+                 batch_size: int = DEFAULT_BATCH_SIZE, watermark: Optional[List] = None,
+                 archived: Optional[Callable[[List[int]], Dict]] = None) -> Tuple[int, Optional[Path], Optional[List]]:
+    """
+    Export one table; returns (rows written, file or None, new watermark)
+
+    The file is written under a temporary name and renamed once complete, so a
+    failed run leaves no partial export and doesn't advance the watermark.
+    """
+    spec = EXPORTS[table]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    path = out_dir / f"{table}_{'full_' if full else ''}{stamp}.{_BatchWriter.EXTENSIONS[fmt]}"
+    tmp = path.with_name(path.name + '.part')
+
+    writer = None
+    rows_written = 0
+    last_row = None
+    try:
+        for rows in stream_rows(engine, table, watermark, full, batch_size, archived):
+            if writer is None:
+                writer = _BatchWriter(tmp, spec['columns'], fmt)
+            writer.write(rows)
+            rows_written += len(rows)
+            last_row = rows[-1]
+        if writer is not None:
+            writer.close()
+    except Exception:
+        if writer is not None:
+            tmp.unlink(missing_ok=True)
+        raise
+
+    if not rows_written:
+        return 0, None, watermark
+    os.replace(tmp, path)
+    # --full includes open trades, which can't be a keyset position
+    new_watermark = None if full and spec['where'] is not None else [last_row[name] for name in spec['watermark']]
+    return rows_written, path, new_watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export SWARM history to columnar files')
+    parser.add_argument('tables', nargs='*', help=f"Tables to export: {', '.join(EXPORTS)} (default: all)")
+    parser.add_argument('--out', default=os.getenv('EXPORT_DIR', 'exports'), help='Output directory')
+    parser.add_argument('--format', choices=sorted(_BatchWriter.EXTENSIONS),
+                        default='parquet' if pa is not None else 'csv')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--full', action='store_true', help='Export every row and ignore the watermark')
+    args = parser.parse_args()
+    unknown = set(args.tables) - set(EXPORTS)
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(sorted(unknown))}")
+
+    setup_logging()
+    state_path = Path(os.getenv('EXPORT_STATE_PATH', DEFAULT_STATE_PATH))
+    watermarks = load_watermarks(state_path)
+    db = Database()
+
+    for table in args.tables or sorted(EXPORTS):
+        rows, path, watermark = export_table(
+            db.engine, table, Path(args.out).expanduser(), args.format, args.full,
+            args.batch_size, None if args.full else watermarks.get(table), db.get_archived_payloads,
+        )
+        if path is None:
+            logger.info(f'{table}: nothing new to export')
+            continue
+        logger.info(f'{table}: exported {rows} rows to {path}')
+        if watermark is not None:
+            watermarks[table] = watermark
+            save_watermarks(state_path, watermarks)
+
+    db.session.close()
+    db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
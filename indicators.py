@@ -0,0 +1,442 @@
+"""
+SWARM Indicators
+Per-symbol streaming indicator state, updated once per new daily bar
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'indicator_state.json'
+
+WEEK_52_BARS = 252  # Trading days in a year
+MA_PERIODS = (20, 50, 200)
+RSI_PERIOD = 14
+VOLUME_PERIOD = 20
+SEED_RETRY_SECONDS = 600          # First backoff after a failed full-history fetch (doubles)
+SEED_RETRY_MAX_SECONDS = 86400
+
+
+class RollingRange:
+    """
+    High/low over the last `window` bars
+
+    Monotonic deques hold only bars that can still become the max (or min), so
+    each update is amortized O(1) and the extremes are read from the front.
+    """
+
+    def __init__(self, window: int = WEEK_52_BARS):
+        self.window = window
+        self.count = 0              # Bars seen in total
+        self.highs = deque()        # (bar index, high), decreasing
+        self.lows = deque()         # (bar index, low), increasing
+
+    def update(self, high: float, low: float):
+        index = self.count
+        self.count += 1
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((index, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((index, low))
+
+        expired = index - self.window
+        while self.highs[0][0] <= expired:
+            self.highs.popleft()
+        while self.lows[0][0] <= expired:
+            self.lows.popleft()
+
+    @property
+    def high(self) -> Optional[float]:
+        return self.highs[0][1] if self.highs else None
+
+    @property
+    def low(self) -> Optional[float]:
+        return self.lows[0][1] if self.lows else None
+
+    @property
+    def bars(self) -> int:
+        """Bars currently covered (== window once warmed up)"""
+        return min(self.count, self.window)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.window
+
+    def snapshot(self) -> Dict:
+        return {'window': self.window, 'count': self.count,
+                'highs': list(self.highs), 'lows': list(self.lows)}
+
+    @classmethod
+    def restore(cls, data: Dict) -> 'RollingRange':
+        obj = cls(data['window'])
+        obj.count = data['count']
+        obj.highs = deque(tuple(item) for item in data['highs'])
+        obj.lows = deque(tuple(item) for item in data['lows'])
+        return obj
+
+
+class RollingMean:
+    """Simple moving average with a running sum"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def update(self, value: float):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.window if len(self.values) == self.window else None
+
+    def snapshot(self) -> Dict:
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def restore(cls, data: Dict) -> 'RollingMean':
+        obj = cls(data['window'])
+        obj.values = deque(data['values'])
+        obj.total = sum(obj.values)
+        return obj
+
+
+class ExponentialMean:
+    """EMA seeded with the simple mean of its first `period` values"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.count = 0
+        self.value: Optional[float] = None
+        self.seed_total = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += value
+        elif self.count == self.period:
+            self.value = (self.seed_total + value) / self.period
+        else:
+            self.value += self.alpha * (value - self.value)
+
+    def snapshot(self) -> Dict:
+        return {'period': self.period, 'count': self.count,
+                'value': self.value, 'seed_total': self.seed_total}
+
+    @classmethod
+    def restore(cls, data: Dict) -> 'ExponentialMean':
+        obj = cls(data['period'])
+        obj.count, obj.value, obj.seed_total = data['count'], data['value'], data['seed_total']
+        return obj
+
+
+class WilderRSI:
+    """
+    RSI with Wilder's smoothing
+
+    The first `period` changes seed simple averages; after that each bar
+    updates the averages as avg = (avg * (period - 1) + x) / period.
+    """
+
+    def __init__(self, period: int = RSI_PERIOD):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.count = 0              # Changes seen
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def _next(self, close: float):
+        change = close - self.prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.count < self.period:
+            # Still seeding: accumulate a simple mean
+            n = self.count + 1
+            return (self.avg_gain * self.count + gain) / n, (self.avg_loss * self.count + loss) / n
+        p = self.period
+        return (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+
+    def update(self, close: float):
+        if self.prev_close is not None:
+            self.avg_gain, self.avg_loss = self._next(close)
+            self.count += 1
+        self.prev_close = close
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._rsi(self.avg_gain, self.avg_loss) if self.count >= self.period else None
+
+    def peek(self, close: float) -> Optional[float]:
+        """RSI if `close` were the next bar (e.g. the live quote), without applying it"""
+        if self.prev_close is None or self.count + 1 < self.period:
+            return None
+        return self._rsi(*self._next(close))
+
+    def snapshot(self) -> Dict:
+        return {'period': self.period, 'prev_close': self.prev_close, 'count': self.count,
+                'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss}
+
+    @classmethod
+    def restore(cls, data: Dict) -> 'WilderRSI':
+        obj = cls(data['period'])
+        obj.prev_close, obj.count = data['prev_close'], data['count']
+        obj.avg_gain, obj.avg_loss = data['avg_gain'], data['avg_loss']
+        return obj
+
+
+class SymbolIndicators:
+    """
+    Indicator state for one symbol
+
+    Only completed bars are applied: the newest bar of a series may still be
+    trading, so it is held back until a later bar shows up. The live quote
+    stands in for today (see `WilderRSI.peek`).
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.last_date: Optional[str] = None   # 'YYYY-MM-DD' of the newest bar applied
+        self.last_close: Optional[float] = None
+        self.seeded = False                    # Built from the full history
+        self.range = RollingRange()
+        self.sma = {period: RollingMean(period) for period in MA_PERIODS}
+        self.ema = {period: ExponentialMean(period) for period in MA_PERIODS}
+        self.rsi = WilderRSI()
+        self.volume = RollingMean(VOLUME_PERIOD)
+
+    def apply(self, date: str, bar: Dict) -> bool:
+        """Apply one daily bar; older or repeated bars are ignored"""
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        try:
+            high = float(bar['2. high'])
+            low = float(bar['3. low'])
+            close = float(bar['4. close'])
+            volume = float(bar.get('5. volume', 0))
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.range.update(high, low)
+        for period in MA_PERIODS:
+            self.sma[period].update(close)
+            self.ema[period].update(close)
+        self.rsi.update(close)
+        self.volume.update(volume)
+        self.last_date = date
+        self.last_close = close
+        return True
+
+    def update(self, time_series: Dict) -> int:
+        """Apply the completed bars of an Alpha Vantage daily series newer than the last one seen"""
+        dates = sorted(d for d in time_series if self.last_date is None or d > self.last_date)
+        if dates and dates[-1] == max(time_series):
+            dates.pop()  # Newest bar may still be forming
+        return sum(1 for d in dates if self.apply(d, time_series[d]))
+
+    def snapshot(self) -> Dict:
+        return {
+            'last_date': self.last_date,
+            'last_close': self.last_close,
+            'seeded': self.seeded,
+            'range': self.range.snapshot(),
+            'sma': [m.snapshot() for m in self.sma.values()],
+            'ema': [m.snapshot() for m in self.ema.values()],
+            'rsi': self.rsi.snapshot(),
+            'volume': self.volume.snapshot(),
+        }
+
+    @classmethod
+    def restore(cls, symbol: str, data: Dict) -> 'SymbolIndicators':
+        obj = cls(symbol)
+        obj.last_date, obj.last_close, obj.seeded = data['last_date'], data['last_close'], data['seeded']
+        obj.range = RollingRange.restore(data['range'])
+        for item in data['sma']:
+            obj.sma[item['window']] = RollingMean.restore(item)
+        for item in data['ema']:
+            obj.ema[item['period']] = ExponentialMean.restore(item)
+        obj.rsi = WilderRSI.restore(data['rsi'])
+        obj.volume = RollingMean.restore(data['volume'])
+        return obj
+
+
+class IndicatorStore:
+    """
+    Indicator state for every scored symbol
+
+    The scan path only ever feeds the compact series it already fetched, so a
+    symbol starts with ~100 bars. Symbols short of a full 52-week window are
+    queued and `seed_pending` backfills them from the full series off the hot
+    path. A symbol whose full fetch fails is retried with exponential backoff
+    instead of holding the head of the queue.
+    """
+
+    def __init__(self):
+        self.symbols: Dict[str, SymbolIndicators] = {}
+        self.pending_seed: Dict[str, None] = {}   # Insertion-ordered set
+        self.seed_failures: Dict[str, Tuple[int, float]] = {}   # symbol -> (failures, retry at)
+        self.loaded_mtime: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def update(self, symbol: str, time_series: Dict) -> SymbolIndicators:
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is None:
+                state = self.symbols[symbol] = SymbolIndicators(symbol)
+            state.update(time_series)
+            if not state.range.full and not state.seeded and symbol not in self.pending_seed:
+                self.pending_seed[symbol] = None
+            return state
+
+    def get(self, symbol: str) -> Optional[SymbolIndicators]:
+        return self.symbols.get(symbol)
+
+    def seed(self, symbol: str, time_series: Dict) -> SymbolIndicators:
+        """Rebuild a symbol's state from a long history"""
+        state = SymbolIndicators(symbol)
+        state.update(time_series)
+        state.seeded = True  # Even if the listing is younger than a year
+        with self.lock:
+            self.symbols[symbol] = state
+            self.pending_seed.pop(symbol, None)
+            self.seed_failures.pop(symbol, None)
+        return state
+
+    def save(self, path: str = None):
+        """Write every symbol's state as JSON (atomic replace)"""
+        path = Path(path or os.getenv('INDICATOR_STATE_PATH', DEFAULT_STATE_PATH))
+        try:
+            with self.lock:
+                data = {
+                    'symbols': {symbol: state.snapshot() for symbol, state in self.symbols.items()},
+                    'pending_seed': list(self.pending_seed),
+                }
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f'Error saving indicator state: {e}')
+
+    def load(self, path: str = None) -> int:
+        """
+        Merge in state written by `save`; returns the number of symbols taken
+
+        A symbol's saved state replaces the in-memory one when it's seeded and
+        ours isn't, or when it has newer bars, so reloading another process's
+        file never throws away a backfill.
+        """
+        path = Path(path or os.getenv('INDICATOR_STATE_PATH', DEFAULT_STATE_PATH))
+        if not path.exists():
+            return 0
+        try:
+            mtime = path.stat().st_mtime
+            with open(path) as f:
+                data = json.load(f)
+            symbols = {symbol: SymbolIndicators.restore(symbol, state)
+                       for symbol, state in data.get('symbols', {}).items()}
+            taken = 0
+            with self.lock:
+                for symbol, state in symbols.items():
+                    current = self.symbols.get(symbol)
+                    if current is None or (state.seeded, state.last_date or '') > \
+                            (current.seeded, current.last_date or ''):
+                        self.symbols[symbol] = state
+                        taken += 1
+                        if state.seeded:
+                            self.pending_seed.pop(symbol, None)
+                for symbol in data.get('pending_seed', []):
+                    state = self.symbols.get(symbol)
+                    if state is None or not state.seeded:
+                        self.pending_seed[symbol] = None
+                self.loaded_mtime = mtime
+            logger.info(f'Restored indicator state for {taken} symbols')
+            return taken
+        except Exception as e:
+            logger.error(f'Error loading indicator state: {e}')
+            return 0
+
+    def load_if_changed(self, path: str = None) -> int:
+        """`load` again if the file was rewritten since we last read it"""
+        path = Path(path or os.getenv('INDICATOR_STATE_PATH', DEFAULT_STATE_PATH))
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return 0
+        return self.load(path) if mtime != self.loaded_mtime else 0
+
+    def backing_off(self, symbol: str, now: float = None) -> bool:
+        """Whether a failed backfill of `symbol` is still waiting out its retry delay"""
+        now = now if now is not None else time.time()
+        return self.seed_failures.get(symbol, (0, 0.0))[1] > now
+
+    def due_for_seed(self, limit: int = 5, now: float = None) -> List[str]:
+        """Queued symbols that aren't backing off after a failed fetch (oldest first)"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            due = []
+            for symbol in self.pending_seed:
+                if not self.backing_off(symbol, now):
+                    due.append(symbol)
+                    if len(due) >= limit:
+                        break
+            return due
+
+    def take_pending(self, limit: int = 5) -> List[str]:
+        """Remove and return due symbols, for handing the backfill to another process"""
+        symbols = self.due_for_seed(limit)
+        with self.lock:
+            for symbol in symbols:
+                self.pending_seed.pop(symbol, None)
+        return symbols
+
+    def backfill(self, symbol: str, fetch_daily: Callable[[str, str], Optional[Dict]]) -> bool:
+        """Seed one symbol from `fetch_daily(symbol, 'full')`; a failure backs the symbol off"""
+        series = fetch_daily(symbol, 'full')
+        if not series:
+            with self.lock:
+                self.pending_seed.setdefault(symbol, None)
+                failures = self.seed_failures.get(symbol, (0, 0.0))[0] + 1
+                delay = min(SEED_RETRY_MAX_SECONDS, SEED_RETRY_SECONDS * 2 ** (failures - 1))
+                self.seed_failures[symbol] = (failures, time.time() + delay)
+            logger.warning(f'Could not fetch full history for {symbol} (attempt {failures}); '
+                           f'retrying in {delay / 60:.0f}m')
+            return False
+        state = self.seed(symbol, series)
+        logger.info(f'Seeded indicators for {symbol} ({state.range.count} bars)')
+        return True
+
+    def seed_pending(self, fetch_daily: Callable[[str, str], Optional[Dict]], limit: int = 5) -> List[str]:
+        """Backfill up to `limit` queued symbols with `fetch_daily(symbol, 'full')`"""
+        return [symbol for symbol in self.due_for_seed(limit) if self.backfill(symbol, fetch_daily)]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> IndicatorStore:
+    """Process-wide store so state survives across SwarmScore instances"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IndicatorStore()
+        return _store
@@ -0,0 +1,205 @@
+"""
+SWARM Job Queue
+Durable SQLite-backed queue between the bot and the scoring worker processes
+"""
+
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'swarm_jobs.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_deliver ON jobs (delivered, status);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+"""
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class JobQueue:
+    """
+    Jobs move queued -> running -> done/failed
+
+    Claims run inside BEGIN IMMEDIATE so concurrent workers never take the same
+    job. Jobs whose worker died are requeued after `claim_timeout` seconds (failed
+    once out of attempts), only the claiming worker can finish a job, and
+    finished jobs stay until the bot has delivered their results.
+    """
+
+    def __init__(self, path: str = None, max_attempts: int = 3, claim_timeout: float = 300):
+        self.path = Path(path or os.getenv('JOB_QUEUE_PATH', DEFAULT_QUEUE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()  # One connection shared by the bot's threads
+
+    @_locked
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, dedupe_key: str = None) -> Optional[int]:
+        """Add a job; returns None if an identical job is already queued or running"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if dedupe_key is not None:
+                exists = self.conn.execute(
+                    "SELECT 1 FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                    (dedupe_key,),
+                ).fetchone()
+                if exists:
+                    self.conn.execute('COMMIT')
+                    return None
+            cursor = self.conn.execute(
+                'INSERT INTO jobs (kind, dedupe_key, payload, priority, created_at) VALUES (?, ?, ?, ?, ?)',
+                (kind, dedupe_key, json.dumps(payload), priority, time.time()),
+            )
+            self.conn.execute('COMMIT')
+            return cursor.lastrowid
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    @_locked
+    def claim(self, worker: str, kinds: Iterable[str] = None) -> Optional[Dict]:
+        """Take the highest-priority queued job (lowest number first), optionally only of `kinds`"""
+        kind_filter, args = '', ()
+        if kinds is not None:
+            args = tuple(kinds)
+            kind_filter = f" AND kind IN ({', '.join('?' * len(args))})"
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued'{kind_filter} ORDER BY priority, id LIMIT 1",
+                args,
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, time.time(), row['id']),
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['attempts'] += 1
+        return job
+
+    @_locked
+    def complete(self, job_id: int, result: Dict, worker: str) -> bool:
+        """Store the result; False if the job was requeued and now belongs to someone else"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(result), time.time(), job_id, worker),
+        )
+        return cursor.rowcount > 0
+
+    @_locked
+    def fail(self, job_id: int, error: str, attempts: int, worker: str) -> bool:
+        """Requeue the job, or mark it failed once it has used up its attempts"""
+        status = 'failed' if attempts >= self.max_attempts else 'queued'
+        cursor = self.conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker = NULL '
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, error[:1000], time.time(), job_id, worker),
+        )
+        return cursor.rowcount > 0
+
+    @_locked
+    def requeue_stale(self) -> int:
+        """Return jobs claimed by workers that stopped responding (or fail them if out of attempts)"""
+        cutoff = time.time() - self.claim_timeout
+        failed = self.conn.execute(
+            "UPDATE jobs SET status = 'failed', worker = NULL, error = 'worker stopped responding', "
+            "finished_at = ? WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+            (time.time(), cutoff, self.max_attempts),
+        ).rowcount
+        requeued = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL "
+            "WHERE status = 'running' AND claimed_at < ?",
+            (cutoff,),
+        ).rowcount
+        if failed or requeued:
+            logger.warning(f'Requeued {requeued} stale jobs, failed {failed} out of attempts')
+        return requeued + failed
+
+    @_locked
+    def results(self, limit: int = 100) -> List[Dict]:
+        """Finished jobs whose results haven't been delivered yet (oldest first)"""
+        rows = self.conn.execute(
+            "SELECT id, kind, payload, status, result, error FROM jobs "
+            "WHERE delivered = 0 AND status IN ('done', 'failed') ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'])
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            jobs.append(job)
+        return jobs
+
+    @_locked
+    def mark_delivered(self, job_ids: List[int]):
+        if job_ids:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany('UPDATE jobs SET delivered = 1 WHERE id = ?', [(i,) for i in job_ids])
+            self.conn.execute('COMMIT')
+
+    @_locked
+    def purge(self, older_than: float = 86400) -> int:
+        """Drop delivered jobs older than `older_than` seconds"""
+        cursor = self.conn.execute(
+            'DELETE FROM jobs WHERE delivered = 1 AND finished_at < ?', (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    @_locked
+    def depth(self) -> Dict[str, int]:
+        """Job counts by status"""
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    @_locked
+    def close(self):
+        self.conn.close()
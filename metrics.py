@@ -0,0 +1,213 @@
+"""
+SWARM Metrics
+Per-stage latency histograms and counters, exposed in Prometheus text format
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond parsing up to slow Discord backoffs
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'swarm_stage_duration_seconds': ('histogram', 'Time spent per pipeline stage'),
+    'swarm_rate_limit_hits_total': ('counter', 'Alpha Vantage Note/Information throttling responses'),
+    'swarm_provider_errors_total': ('counter', 'Failed market data requests'),
+    'swarm_cache_hits_total': ('counter', 'Cache lookups served from cache'),
+    'swarm_cache_misses_total': ('counter', 'Cache lookups that fell through'),
+    'swarm_stale_fallbacks_total': ('counter', 'Failed provider requests answered with the last good payload'),
+    'swarm_circuit_open': ('gauge', 'Whether a provider circuit breaker is open (1) or closed (0)'),
+    'swarm_alerts_total': ('counter', 'Alerts handled by post_alert'),
+    'swarm_dms_total': ('counter', 'Watchlist DMs by outcome'),
+    'swarm_admissions_total': ('counter', 'Slash command requests by admission outcome'),
+    'swarm_queue_depth': ('gauge', 'Items waiting in a work queue'),
+    'swarm_channel_lag_seconds': ('gauge', 'Age of the oldest message waiting for a Discord channel'),
+    'swarm_db_replica_lag_seconds': ('gauge', 'How far the read replica is behind the primary on alerts'),
+    'swarm_log_records_dropped_total': ('counter', 'Log records dropped because the log queue was full'),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    rendered = []
+    for k, v in pairs:
+        v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        rendered.append(f'{k}="{v}"')
+    return '{' + ','.join(rendered) + '}'
+
+
+class _Histogram:
+    """Cumulative-bucket histogram for one label set"""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, buckets, value: float):
+        index = bisect_left(buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        key = _label_key(labels)
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram observation"""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(self.buckets, value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self.lock:
+            for kind, store in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted(store):
+                    self._header(lines, name, kind)
+                    for key, value in sorted(store[name].items()):
+                        lines.append(f'{name}{_format_labels(key)} {value:g}')
+
+            for name in sorted(self.histograms):
+                self._header(lines, name, 'histogram')
+                for key, hist in sorted(self.histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key, ("le", f"{bound:g}"))} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(key, ("le", "+Inf"))} {hist.count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {hist.total:.6f}')
+                    lines.append(f'{name}_count{_format_labels(key)} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _header(lines, name, kind):
+        help_text = METRIC_HELP.get(name, (kind, name))[1]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+REGISTRY = MetricsRegistry()
+
+
+def inc(name: str, amount: float = 1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    REGISTRY.set_gauge(name, value, **labels)
+
+
+def observe_stage(stage: str, seconds: float, **labels):
+    """Record how long a pipeline stage took"""
+    REGISTRY.observe('swarm_stage_duration_seconds', seconds, stage=stage, **labels)
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Time the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, **labels)
+
+
+def cache_hit(cache: str):
+    inc('swarm_cache_hits_total', cache=cache)
+
+
+def cache_miss(cache: str):
+    inc('swarm_cache_misses_total', cache=cache)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics from the registry"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None,
+                         registry: MetricsRegistry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics on a background thread
+
+    Configured by METRICS_PORT (default 9108, 0 disables) and METRICS_HOST
+    (default 127.0.0.1, so the endpoint stays local unless opted in).
+    """
+    if port is None:
+        port = int(os.getenv('METRICS_PORT', '9108'))
+    if not port:
+        logger.info('Metrics endpoint disabled')
+        return None
+    host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f'Could not start metrics endpoint on {host}:{port}: {e}')
+        return None
+
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f'Metrics endpoint listening on http://{host}:{port}/metrics')
+    return server
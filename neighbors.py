@@ -0,0 +1,188 @@
+"""
+Setup Neighbours
+KD-tree over past alert feature vectors for "similar setups" statistics
+"""
+
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Feature -> scale that maps its typical range onto roughly [0, 1]
+FEATURES = (
+    ('sec_score', 40),
+    ('technical_score', 35),
+    ('financial_score', 15),
+    ('news_score', 10),
+    ('volume_ratio', 5),       # Clipped at 5x average
+    ('change_percent', 10),
+    ('pct_from_high', 50),
+)
+
+LEAF_SIZE = 32
+MIN_REBUILD = 64
+
+
+def feature_vector(score_data: Dict) -> np.ndarray:
+    """Scaled feature vector for an alert's score_data (missing values count as 0)"""
+    features = dict(score_data.get('features') or {})
+    for component, entry in (score_data.get('breakdown') or {}).items():
+        features.setdefault(f'{component}_score', entry.get('score'))
+    values = []
+    for name, scale in FEATURES:
+        value = score_data.get(name, features.get(name))
+        try:
+            value = float(value) if value is not None else 0.0
+        except (TypeError, ValueError):
+            value = 0.0
+        if name == 'volume_ratio':
+            value = min(value, scale)
+        values.append(value / scale)
+    return np.asarray(values, dtype=np.float64)
+
+
+class KDTree:
+    """
+    Static KD-tree with leaf buckets
+
+    Points are reordered so every leaf is a contiguous slice with a bounding
+    box. A query ranks all leaf boxes by their lower-bound distance in one
+    numpy call, scores the nearest leaves to get a k-th distance, then scans
+    only the leaves whose box can still beat it.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self.leaves: List[Tuple[int, int]] = []
+        if len(points):
+            self._build(points, 0, len(points))
+        self.points = points[self.order]
+
+        dims = points.shape[1] if points.ndim == 2 else len(FEATURES)
+        self.box_min = np.array([self.points[a:b].min(axis=0) for a, b in self.leaves]).reshape(-1, dims)
+        self.box_max = np.array([self.points[a:b].max(axis=0) for a, b in self.leaves]).reshape(-1, dims)
+        self.sizes = np.array([b - a for a, b in self.leaves], dtype=np.int64)
+        self.leaf_of = np.repeat(np.arange(len(self.leaves)), self.sizes)
+
+    def _build(self, points: np.ndarray, start: int, end: int):
+        if end - start <= self.leaf_size:
+            self.leaves.append((start, end))
+            return
+
+        subset = points[self.order[start:end]]
+        dim = int(np.argmax(subset.max(axis=0) - subset.min(axis=0)))
+        middle = (end - start) // 2
+        part = np.argpartition(subset[:, dim], middle)
+        self.order[start:end] = self.order[start:end][part]
+        self._build(points, start, start + middle)
+        self._build(points, start + middle, end)
+
+    def __len__(self):
+        return len(self.order)
+
+    def query(self, point: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """k nearest (squared distance, original row) pairs, closest first"""
+        if not len(self.order):
+            return []
+        k = min(k, len(self.order))
+
+        gap = np.maximum(self.box_min - point, 0) + np.maximum(point - self.box_max, 0)
+        bound = np.einsum('ij,ij->i', gap, gap)
+
+        # Seed with the closest boxes until they hold k points
+        ranked = np.argsort(bound)
+        seed = ranked[:int(np.searchsorted(np.cumsum(self.sizes[ranked]), k)) + 1]
+        rows = np.concatenate([np.arange(*self.leaves[leaf]) for leaf in seed.tolist()])
+        diff = self.points[rows] - point
+        kth = np.partition(np.einsum('ij,ij->i', diff, diff), k - 1)[k - 1]
+
+        # Every leaf whose box is within the seed's k-th distance
+        rows = np.flatnonzero((bound <= kth)[self.leaf_of])
+        diff = self.points[rows] - point
+        distances = np.einsum('ij,ij->i', diff, diff)
+        nearest = np.argpartition(distances, k - 1)[:k] if len(distances) > k else np.arange(len(distances))
+        nearest = nearest[np.argsort(distances[nearest])]
+        return list(zip(distances[nearest].tolist(), self.order[rows[nearest]].tolist()))
+
+
+class NeighborIndex:
+    """
+    Alert feature vectors with incremental inserts
+
+    New alerts go into a small buffer that is scanned linearly; once it grows
+    past sqrt(n) (min 64) the tree is rebuilt over everything, so inserts stay
+    cheap and queries stay logarithmic.
+    """
+
+    def __init__(self, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.ids: List[int] = []
+        self.vectors: List[np.ndarray] = []
+        self.tree = KDTree(np.empty((0, len(FEATURES))), leaf_size)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, alert_id: int, score_data: Dict):
+        """Index one saved alert"""
+        if alert_id is None:
+            return
+        with self.lock:
+            self.ids.append(alert_id)
+            self.vectors.append(feature_vector(score_data))
+            buffered = len(self.ids) - len(self.tree)
+            if buffered >= max(MIN_REBUILD, int(math.sqrt(len(self.ids)))):
+                self._rebuild()
+
+    def load(self, alerts: List[Dict]) -> int:
+        """Bulk-index alerts ({'id', 'score_data', ...}) and rebuild the tree once"""
+        with self.lock:
+            for alert in alerts:
+                self.ids.append(alert['id'])
+                self.vectors.append(feature_vector(alert.get('score_data') or alert))
+            self._rebuild()
+        logger.info(f'Indexed {len(alerts)} alerts for similar-setup lookups')
+        return len(alerts)
+
+    def _rebuild(self):
+        points = np.vstack(self.vectors) if self.vectors else np.empty((0, len(FEATURES)))
+        self.tree = KDTree(points, self.leaf_size)
+
+    def query(self, score_data: Dict, k: int = 20, exclude: int = None) -> List[Tuple[int, float]]:
+        """The k most similar past alerts as (alert_id, distance), closest first"""
+        point = feature_vector(score_data)
+        with self.lock:
+            candidates = self.tree.query(point, k + 1)
+            built = len(self.tree)
+            if built < len(self.ids):
+                buffered = np.vstack(self.vectors[built:]) - point
+                distances = np.einsum('ij,ij->i', buffered, buffered)
+                candidates.extend((float(d), built + row) for row, d in enumerate(distances.tolist()))
+                candidates.sort()
+            ids = self.ids
+
+            result = []
+            for distance, row in candidates:
+                if ids[row] == exclude:
+                    continue
+                result.append((ids[row], math.sqrt(distance)))
+                if len(result) == k:
+                    break
+            return result
+
+
+def similar_setup_stats(index: NeighborIndex, backtester, score_data: Dict,
+                        k: int = 20, exclude: int = None) -> Optional[Dict]:
+    """Backtest statistics over the k nearest past setups (None if the index is empty)"""
+    neighbours = index.query(score_data, k, exclude=exclude)
+    if not neighbours:
+        return None
+    stats = backtester.stats_for_ids([alert_id for alert_id, _ in neighbours])
+    stats['neighbours'] = len(neighbours)
+    return stats
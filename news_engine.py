@@ -0,0 +1,365 @@
+"""
+News Engine
+Bulk headline ingestion and lexicon-based sentiment for the news component
+"""
+
+import csv
+import importlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEWS_FEED_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'news'
+
+# Finance-tuned polarity lexicon (a compact Loughran-McDonald style list)
+SENTIMENT_LEXICON = {
+    # Positive
+    'beat': 1.0, 'beats': 1.0, 'surge': 1.0, 'surges': 1.0, 'soar': 1.0, 'soars': 1.0,
+    'jump': 0.8, 'jumps': 0.8, 'rally': 0.8, 'rallies': 0.8, 'gain': 0.6, 'gains': 0.6,
+    'record': 0.6, 'upgrade': 1.0, 'upgrades': 1.0, 'upgraded': 1.0, 'outperform': 0.8,
+    'approval': 1.0, 'approved': 1.0, 'approves': 1.0, 'breakthrough': 1.0, 'wins': 0.8,
+    'win': 0.6, 'awarded': 0.8, 'contract': 0.4, 'partnership': 0.6, 'acquire': 0.5,
+    'acquires': 0.5, 'buyout': 0.8, 'raises': 0.6, 'raised': 0.6, 'boost': 0.6, 'boosts': 0.6,
+    'strong': 0.6, 'growth': 0.5, 'profit': 0.5, 'profitable': 0.6, 'bullish': 0.8,
+    'expands': 0.4, 'launch': 0.3, 'launches': 0.3, 'positive': 0.6, 'tops': 0.8, 'exceeds': 0.8,
+    # Negative
+    'miss': -1.0, 'misses': -1.0, 'plunge': -1.0, 'plunges': -1.0, 'plummet': -1.0,
+    'plummets': -1.0, 'tumble': -0.8, 'tumbles': -0.8, 'fall': -0.6, 'falls': -0.6,
+    'drop': -0.6, 'drops': -0.6, 'slump': -0.8, 'downgrade': -1.0, 'downgrades': -1.0,
+    'downgraded': -1.0, 'underperform': -0.8, 'lawsuit': -0.8, 'sued': -0.8, 'probe': -0.8,
+    'investigation': -0.8, 'recall': -0.8, 'fraud': -1.0, 'bankruptcy': -1.0, 'default': -0.8,
+    'delisted': -1.0, 'delisting': -1.0, 'dilution': -0.8, 'offering': -0.4, 'layoffs': -0.6,
+    'loss': -0.6, 'losses': -0.6, 'weak': -0.6, 'cuts': -0.5, 'cut': -0.5, 'halt': -0.8,
+    'halted': -0.8, 'rejects': -0.8, 'rejected': -0.8, 'warning': -0.6, 'bearish': -0.8,
+    'negative': -0.6, 'concern': -0.4, 'crash': -1.0, 'fails': -0.8, 'failed': -0.8,
+}
+NEGATORS = {'not', 'no', 'never', 'without', 'fails', 'failed'}
+
+WINDOW_HOURS = 24           # Current mention/sentiment window
+BASELINE_HOURS = 24 * 7     # Mention volume baseline
+MAX_SCORE = 10
+MIN_TREND_MENTIONS = 3      # Fewer mentions than this never count as a spike, whatever the baseline
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_CASHTAG = re.compile(r'\$([A-Z]{1,5})\b')
+
+
+class LexiconModel:
+    """Lexicon compiled into token ids and a weight vector for batch scoring"""
+
+    def __init__(self, lexicon: Dict[str, float] = None, negators: Iterable[str] = NEGATORS):
+        lexicon = lexicon or SENTIMENT_LEXICON
+        self.vocab = {word: i + 1 for i, word in enumerate(lexicon)}   # 0 = not in lexicon
+        self.weights = np.zeros(len(self.vocab) + 1, dtype=np.float32)
+        for word, index in self.vocab.items():
+            self.weights[index] = lexicon[word]
+        self.negators = set(negators)
+
+    def score_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sentiment per text in [-1, 1] and the number of lexicon hits
+
+        Tokens are flattened into one array for the whole batch so weighting,
+        negation and per-headline sums are single numpy operations.
+        """
+        token_ids = []
+        negated = []
+        owners = []
+        vocab, negators = self.vocab, self.negators
+        for position, text in enumerate(texts):
+            previous = ''
+            for token in _TOKEN.findall(text.lower()):
+                token_ids.append(vocab.get(token, 0))
+                negated.append(previous in negators)
+                owners.append(position)
+                previous = token
+
+        count = len(texts)
+        if not token_ids:
+            return np.zeros(count, dtype=np.float32), np.zeros(count, dtype=np.int32)
+
+        ids = np.fromiter(token_ids, dtype=np.int32, count=len(token_ids))
+        owner = np.fromiter(owners, dtype=np.int32, count=len(owners))
+        flip = np.where(np.fromiter(negated, dtype=bool, count=len(negated)), -1.0, 1.0)
+
+        weights = self.weights[ids] * flip
+        hits = np.bincount(owner, weights=(ids > 0), minlength=count)
+        totals = np.bincount(owner, weights=weights, minlength=count)
+        sentiment = np.divide(totals, np.maximum(hits, 1))
+        return np.clip(sentiment, -1, 1).astype(np.float32), hits.astype(np.int32)
+
+
+class NewsProvider:
+    """Source of headlines; subclasses return dicts with title, tickers, published"""
+
+    def fetch(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class FileFeedProvider(NewsProvider):
+    """
+    Reads headline files dropped into NEWS_FEED_PATH
+
+    Accepts JSON lines ({"title", "tickers", "published", "source"}) and CSV
+    with the same columns. Only bytes appended since the last fetch are read.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or os.getenv('NEWS_FEED_PATH', DEFAULT_NEWS_FEED_PATH))
+        self.offsets: Dict[Path, int] = {}
+
+    def fetch(self) -> List[Dict]:
+        if not self.path.is_dir():
+            return []
+        items = []
+        for path in sorted(self.path.iterdir()):
+            if path.suffix.lower() not in ('.jsonl', '.json', '.csv'):
+                continue
+            try:
+                size = path.stat().st_size
+                offset = self.offsets.get(path, 0)
+                if size < offset:
+                    offset = 0  # File was rotated/truncated
+                if size == offset:
+                    continue
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    f.seek(offset)
+                    if path.suffix.lower() == '.csv':
+                        if offset == 0:
+                            rows = csv.DictReader(f)
+                        else:
+                            rows = csv.DictReader(f, fieldnames=self._csv_header(path))
+                        items.extend(dict(row) for row in rows)
+                    else:
+                        for line in f:
+                            line = line.strip()
+                            if line:
+                                try:
+                                    items.append(json.loads(line))
+                                except json.JSONDecodeError:
+                                    continue
+                    self.offsets[path] = f.tell()
+            except OSError as e:
+                logger.error(f'Could not read news feed {path}: {e}')
+        return items
+
+    @staticmethod
+    def _csv_header(path: Path) -> List[str]:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return next(csv.reader(f))
+
+
+def load_provider(spec: str = None) -> NewsProvider:
+    """NEWS_PROVIDER is 'file' (default) or 'package.module:ClassName'"""
+    spec = spec or os.getenv('NEWS_PROVIDER', 'file')
+    if spec == 'file':
+        return FileFeedProvider()
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class _TickerWindow:
+    """
+    Hourly buckets of mention count and sentiment sum for one ticker
+
+    Feeds don't arrive in time order (many list newest first), so buckets are
+    keyed by hour with the hours kept sorted alongside.
+    """
+
+    __slots__ = ('buckets', 'hours', 'count', 'sentiment', 'baseline_count', 'headlines')
+
+    def __init__(self):
+        self.buckets: Dict[int, List] = {}   # hour -> [count, sentiment_sum]
+        self.hours: List[int] = []           # Sorted keys of buckets
+        self.count = 0               # Within WINDOW_HOURS
+        self.sentiment = 0.0
+        self.baseline_count = 0      # Within BASELINE_HOURS
+        self.headlines: List[Tuple[int, str]] = []   # Newest three (hour, title), oldest first
+
+    def add(self, hour: int, count: int, sentiment: float):
+        bucket = self.buckets.get(hour)
+        if bucket is None:
+            self.buckets[hour] = [count, sentiment]
+            insort(self.hours, hour)
+        else:
+            bucket[0] += count
+            bucket[1] += sentiment
+        self.baseline_count += count
+
+    def add_headline(self, hour: int, title: str):
+        insort(self.headlines, (hour, title))
+        del self.headlines[:-3]
+
+    def roll(self, now_hour: int):
+        """Drop expired buckets and recompute the current window totals"""
+        expired = bisect_right(self.hours, now_hour - BASELINE_HOURS)
+        for hour in self.hours[:expired]:
+            self.baseline_count -= self.buckets.pop(hour)[0]
+        del self.hours[:expired]
+        self.count = 0
+        self.sentiment = 0.0
+        for hour in self.hours[bisect_right(self.hours, now_hour - WINDOW_HOURS):]:
+            count, sentiment = self.buckets[hour]
+            self.count += count
+            self.sentiment += sentiment
+
+
+class NewsEngine:
+    """Per-ticker rolling mention volume and sentiment, scored without network calls"""
+
+    def __init__(self, provider: NewsProvider = None, model: LexiconModel = None,
+                 refresh_seconds: float = None):
+        self.provider = provider or load_provider()
+        self.model = model or LexiconModel()
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else \
+            float(os.getenv('NEWS_REFRESH_SECONDS', '60'))
+        self.tickers: Dict[str, _TickerWindow] = {}
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # One fetch at a time; providers track their own offsets
+        self.last_refresh = None
+
+    @staticmethod
+    def _hour(published) -> int:
+        if isinstance(published, (int, float)):
+            return int(published // 3600)
+        if isinstance(published, str) and published:
+            try:
+                dt = datetime.fromisoformat(published.replace('Z', '+00:00'))
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                return int(dt.timestamp() // 3600)
+            except ValueError:
+                pass
+        return int(time.time() // 3600)
+
+    @staticmethod
+    def _tickers(item: Dict) -> List[str]:
+        tickers = item.get('tickers') or item.get('ticker') or []
+        if isinstance(tickers, str):
+            tickers = [t for t in re.split(r'[,\s;|]+', tickers) if t]
+        tickers = [t.upper().lstrip('$') for t in tickers]
+        return tickers or _CASHTAG.findall(item.get('title', ''))
+
+    def ingest(self, items: List[Dict]) -> int:
+        """Score a batch of headlines and fold them into the rolling aggregates"""
+        items = [i for i in items if i.get('title')]
+        if not items:
+            return 0
+
+        sentiment, _ = self.model.score_batch([i['title'] for i in items])
+        with self.lock:
+            for item, polarity in zip(items, sentiment.tolist()):
+                hour = self._hour(item.get('published'))
+                for ticker in self._tickers(item):
+                    window = self.tickers.get(ticker)
+                    if window is None:
+                        window = self.tickers[ticker] = _TickerWindow()
+                    window.add(hour, 1, polarity)
+                    window.add_headline(hour, item['title'])
+        return len(items)
+
+    def refresh(self, force: bool = False) -> int:
+        """Pull new headlines from the provider (at most every refresh_seconds)"""
+        with self.refresh_lock:
+            if not force and self.last_refresh is not None and \
+                    time.monotonic() - self.last_refresh < self.refresh_seconds:
+                return 0
+            self.last_refresh = time.monotonic()
+            try:
+                return self.ingest(self.provider.fetch())
+            except Exception as e:
+                logger.error(f'Error refreshing news feed: {e}')
+                return 0
+
+    def snapshot(self, symbol: str) -> Optional[Dict]:
+        """Current window stats for a ticker"""
+        with self.lock:
+            window = self.tickers.get(symbol.upper())
+            if window is None:
+                return None
+            window.roll(int(time.time() // 3600))
+            baseline_per_window = max(0, window.baseline_count - window.count) / \
+                ((BASELINE_HOURS - WINDOW_HOURS) / WINDOW_HOURS)
+            return {
+                'mentions': window.count,
+                'sentiment': window.sentiment / window.count if window.count else 0.0,
+                'baseline': baseline_per_window,
+                'headlines': [title for _, title in window.headlines],
+            }
+
+    def score(self, symbol: str) -> Tuple[int, str]:
+        """News component (0-10): mention volume (0-5) + sentiment (0-5)"""
+        self.refresh()
+        stats = self.snapshot(symbol)
+        if not stats or not stats['mentions']:
+            return 0, "No recent news"
+
+        mentions, sentiment, baseline = stats['mentions'], stats['sentiment'], stats['baseline']
+        ratio = mentions / baseline if baseline else float(mentions)
+        details = []
+
+        if mentions < MIN_TREND_MENTIONS:
+            # A ratio over a near-empty baseline says nothing about one or two headlines
+            volume = 1
+            details.append(f"{mentions} mention{'s' if mentions != 1 else ''}")
+        elif ratio >= 5 or (not baseline and mentions >= 5):
+            volume = 5
+            details.append(f"News spike ({mentions} mentions, {ratio:.1f}x normal)")
+        elif ratio >= 3:
+            volume = 4
+            details.append(f"Trending ({mentions} mentions, {ratio:.1f}x normal)")
+        elif ratio >= 1.5:
+            volume = 3
+            details.append(f"Elevated coverage ({mentions} mentions)")
+        else:
+            volume = 1
+            details.append(f"{mentions} mention{'s' if mentions != 1 else ''}")
+
+        if sentiment >= 0.5:
+            tone = 5
+            details.append(f"Very positive sentiment ({sentiment:+.2f})")
+        elif sentiment >= 0.2:
+            tone = 3
+            details.append(f"Positive sentiment ({sentiment:+.2f})")
+        elif sentiment > -0.2:
+            tone = 1
+            details.append(f"Neutral sentiment ({sentiment:+.2f})")
+        else:
+            tone = 0
+            details.append(f"Negative sentiment ({sentiment:+.2f})")
+
+        return min(MAX_SCORE, volume + tone), " | ".join(details)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> NewsEngine:
+    """Process-wide engine so rolling aggregates survive across SwarmScore instances"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = NewsEngine()
+        return _engine
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    engine = get_engine()
+    print(f"Ingested {engine.refresh(force=True)} headlines from {getattr(engine.provider, 'path', engine.provider)}")
+    for ticker in sys.argv[1:]:
+        print(ticker, *engine.score(ticker))
@@ -0,0 +1,128 @@
+"""
+Rate limiting primitives shared by the Discord delivery and market data paths
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens every `per` seconds, bursting up to `burst`"""
+
+    def __init__(self, rate: float, per: float, burst: float = None):
+        self.capacity = burst if burst is not None else rate
+        self.fill_rate = rate / per
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available right now"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1) -> float:
+        """Seconds until `tokens` will be available"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.fill_rate + max(0.0, self.updated - time.monotonic())
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available, then take them"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+    def penalize(self, seconds: float):
+        """Empty the bucket and hold refills for `seconds` (e.g. a 429 retry_after)"""
+        self.tokens = 0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+class BlockingTokenBucket(TokenBucket):
+    """TokenBucket shared between threads; `wait` blocks the calling thread"""
+
+    def __init__(self, rate: float, per: float, burst: float = None):
+        super().__init__(rate, per, burst)
+        self.lock = threading.Lock()
+
+    def wait(self, tokens: float = 1):
+        """Block until tokens are available, then take them"""
+        while True:
+            with self.lock:
+                if self.try_acquire(tokens):
+                    return
+                delay = self.delay(tokens)
+            time.sleep(delay)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in a SQLite file, so every process using the file draws
+    from one budget (e.g. the scoring workers and the bot sharing an API quota)
+
+    Same interface as BlockingTokenBucket. State is (tokens, wall-clock time of
+    the last refill) per `name`, updated inside BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path: str, name: str, rate: float, per: float, burst: float = None):
+        self.name = name
+        self.capacity = burst if burst is not None else rate
+        self.fill_rate = rate / per
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS token_buckets '
+                          '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+        self.lock = threading.Lock()  # One connection shared by this process's threads
+
+    def _update(self, take: float = 0, hold: float = 0) -> float:
+        """Refill, then take `take` tokens if they're all there; returns seconds until they would be"""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = self.conn.execute('SELECT tokens, updated FROM token_buckets WHERE name = ?',
+                                        (self.name,)).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                if now > updated:
+                    tokens = min(self.capacity, tokens + (now - updated) * self.fill_rate)
+                    updated = now
+                if hold:
+                    tokens, updated = 0.0, max(updated, now + hold)
+                if tokens >= take:
+                    tokens -= take
+                    delay = 0.0
+                else:
+                    delay = (take - tokens) / self.fill_rate + max(0.0, updated - now)
+                self.conn.execute('INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                                  (self.name, tokens, updated))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return delay
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        return self._update(take=tokens) == 0
+
+    def wait(self, tokens: float = 1):
+        """Block until tokens are available, then take them"""
+        while True:
+            delay = self._update(take=tokens)
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def penalize(self, seconds: float):
+        """Empty the bucket and hold refills for `seconds`, for every process"""
+        self._update(hold=seconds)
@@ -0,0 +1,70 @@
+"""
+Channel Routing
+In-memory map of alert type -> subscribed channels across every guild
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelRouter:
+    """
+    Per-guild channel mappings with a precomputed fan-out list per alert type
+
+    The database is the source of truth; this cache is loaded once at startup
+    and updated on every change so `channels_for` is a dict lookup on the hot
+    path. `defaults` (the static CHANNEL_IDS) are always included, which keeps
+    single-server deployments working without any /setup.
+    """
+
+    def __init__(self, defaults: Dict[str, Optional[int]] = None):
+        self.defaults = {key: channel for key, channel in (defaults or {}).items() if channel}
+        self.guilds: Dict[int, Dict[str, int]] = {}
+        self.routes: Dict[str, Tuple[int, ...]] = {}
+        self.lock = threading.Lock()
+        self._rebuild()
+
+    def load(self, rows: Iterable[Tuple[int, str, int]]):
+        """Replace the cache with (guild_id, channel_key, channel_id) rows"""
+        with self.lock:
+            self.guilds = {}
+            for guild_id, key, channel_id in rows:
+                self.guilds.setdefault(guild_id, {})[key] = channel_id
+            self._rebuild()
+        logger.info(f'Loaded channel routes for {len(self.guilds)} guild(s)')
+
+    def set(self, guild_id: int, key: str, channel_id: int):
+        with self.lock:
+            self.guilds.setdefault(guild_id, {})[key] = channel_id
+            self._rebuild()
+
+    def remove(self, guild_id: int, key: str = None):
+        with self.lock:
+            routes = self.guilds.get(guild_id)
+            if routes is None:
+                return
+            if key is None:
+                del self.guilds[guild_id]
+            else:
+                routes.pop(key, None)
+            self._rebuild()
+
+    def _rebuild(self):
+        routes: Dict[str, list] = {}
+        for key, channel_id in self.defaults.items():
+            routes.setdefault(key, []).append(channel_id)
+        for guild_routes in self.guilds.values():
+            for key, channel_id in guild_routes.items():
+                if channel_id not in routes.setdefault(key, []):
+                    routes[key].append(channel_id)
+        self.routes = {key: tuple(channels) for key, channels in routes.items()}
+
+    def channels_for(self, key: str) -> Tuple[int, ...]:
+        """Every channel subscribed to an alert type"""
+        return self.routes.get(key, ())
+
+    def guild_routes(self, guild_id: int) -> Dict[str, int]:
+        return dict(self.guilds.get(guild_id, {}))
@@ -0,0 +1,107 @@
+"""
+Score Cache
+Shared per-ticker SWARM SCORE results with stale-while-revalidate refreshes
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+Scorer = Callable[[str], Awaitable[Dict]]
+
+
+class ScoreCache:
+    """
+    Ticker -> latest score_data and when it was computed
+
+    Entries younger than `fresh_seconds` are served as-is. Older ones, up to
+    `max_stale_seconds`, are served marked stale while a background refresh
+    runs; beyond that the caller waits for a new score. Concurrent requests
+    for the same ticker share one computation. All methods run on the event
+    loop, so no locking is needed. `on_put(ticker, score_data)` sees every
+    new score (e.g. to feed the live dashboard).
+    """
+
+    def __init__(self, fresh_seconds: float = None, max_stale_seconds: float = None,
+                 max_entries: int = None, on_put: Callable[[str, Dict], None] = None):
+        self.fresh_seconds = fresh_seconds if fresh_seconds is not None else \
+            float(os.getenv('SCORE_CACHE_FRESH_SECONDS', '300'))
+        self.max_stale_seconds = max_stale_seconds if max_stale_seconds is not None else \
+            float(os.getenv('SCORE_CACHE_MAX_STALE_SECONDS', '1800'))
+        self.max_entries = max_entries or int(os.getenv('SCORE_CACHE_SIZE', '2000'))
+        self.entries: 'OrderedDict[str, Tuple[Dict, float]]' = OrderedDict()
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.on_put = on_put
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, ticker: str, score_data: Dict):
+        """Store a freshly computed score (scanner passes and /score both write here)"""
+        self.entries[ticker] = (dict(score_data), time.monotonic())
+        self.entries.move_to_end(ticker)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        if self.on_put is not None:
+            try:
+                self.on_put(ticker, score_data)
+            except Exception as e:
+                logger.error(f'Error handling new score for {ticker}: {e}')
+
+    def peek(self, ticker: str) -> Optional[Tuple[Dict, float]]:
+        """(score_data copy, age in seconds) without refreshing, or None"""
+        entry = self.entries.get(ticker)
+        if entry is None:
+            return None
+        score_data, stored_at = entry
+        return dict(score_data), time.monotonic() - stored_at
+
+    async def get(self, ticker: str, scorer: Scorer) -> Tuple[Dict, float, bool]:
+        """
+        (score_data, age in seconds, stale) for a ticker
+
+        Stale entries trigger a refresh in the background; missing or expired
+        ones are computed before returning.
+        """
+        cached = self.peek(ticker)
+        if cached is not None:
+            score_data, age = cached
+            if age <= self.fresh_seconds:
+                metrics.cache_hit('score')
+                return score_data, age, False
+            if age <= self.max_stale_seconds:
+                metrics.cache_hit('score')
+                self.refresh(ticker, scorer)
+                return score_data, age, True
+
+        metrics.cache_miss('score')
+        score_data = await asyncio.shield(self.refresh(ticker, scorer))
+        return dict(score_data), 0.0, False
+
+    def refresh(self, ticker: str, scorer: Scorer) -> asyncio.Task:
+        """Start (or join) the computation for a ticker"""
+        task = self.inflight.get(ticker)
+        if task is None:
+            task = asyncio.create_task(self._compute(ticker, scorer))
+            # Background refreshes have no awaiter; consume their errors (already logged)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.inflight[ticker] = task
+        return task
+
+    async def _compute(self, ticker: str, scorer: Scorer) -> Dict:
+        try:
+            score_data = await scorer(ticker)
+            self.put(ticker, score_data)
+            return score_data
+        except Exception as e:
+            logger.error(f'Error refreshing score for {ticker}: {e}')
+            raise
+        finally:
+            self.inflight.pop(ticker, None)
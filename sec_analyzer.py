@@ -0,0 +1,376 @@
+"""
+SEC Filing Analyzer
+Streams CHIRP filings from disk and matches the whole keyword dictionary in
+one pass with an Aho-Corasick automaton
+"""
+
+import logging
+import math
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick: C automaton, hundreds of MB/s
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEC_FILINGS_PATH = Path.home() / 'SEC' / 'Swarm' / 'Nest' / 'sec_filings' / 'sec-edgar-filings'
+
+# Phrase → weight. Negative weights are red flags that pull the score down.
+SEC_KEYWORDS = {
+    # M&A / strategic
+    'definitive agreement': 12,
+    'merger agreement': 12,
+    'agreement and plan of merger': 12,
+    'tender offer': 10,
+    'strategic alternatives': 9,
+    'letter of intent': 7,
+    'acquisition': 5,
+    'business combination': 6,
+    # Regulatory / clinical
+    'fda approval': 12,
+    'approved by the fda': 12,
+    'breakthrough therapy': 9,
+    'fast track designation': 7,
+    'topline results': 7,
+    'primary endpoint': 6,
+    # Commercial
+    'contract award': 8,
+    'awarded a contract': 8,
+    'purchase order': 4,
+    'collaboration agreement': 6,
+    'license agreement': 5,
+    'strategic partnership': 6,
+    'record revenue': 6,
+    'raises guidance': 7,
+    'increased guidance': 7,
+    # Capital return / insiders
+    'share repurchase': 5,
+    'stock repurchase program': 5,
+    'special dividend': 5,
+    'beneficial ownership': 3,
+    # Red flags
+    'going concern': -10,
+    'substantial doubt': -8,
+    'chapter 11': -12,
+    'bankruptcy': -8,
+    'delisting': -8,
+    'deficiency notice': -6,
+    'reverse stock split': -6,
+    'at the market offering': -6,
+    'registered direct offering': -6,
+    'material weakness': -5,
+    'restatement': -6,
+}
+
+# Filing types that carry event-driven news
+FORM_WEIGHTS = {
+    '8-K': 4,
+    'SC 13D': 4,
+    'SC 13G': 2,
+    '4': 2,
+    '6-K': 2,
+    '10-Q': 1,
+    '10-K': 1,
+    'S-1': 0,
+    'S-3': -2,
+    '424B5': -3,
+}
+
+MAX_SCORE = 40
+CHUNK_SIZE = 1 << 20         # Read 1 MB at a time regardless of filing size
+HALF_LIFE_DAYS = 3.0         # SEC edge decays quickly once the market has read it
+MAX_FILING_AGE_DAYS = 30
+MAX_HITS_PER_KEYWORD = 3     # Boilerplate repeats shouldn't dominate
+
+# Lowercase letters and digits survive; every other byte becomes a space
+_NORMALIZE_TABLE = bytes(
+    c + 32 if 65 <= c <= 90 else c if (48 <= c <= 57 or 97 <= c <= 122) else 32
+    for c in range(256)
+)
+_SPACE_RUN = re.compile(rb' {2,}')
+_DATE_IN_NAME = re.compile(r'(20\d{2})-?(\d{2})-?(\d{2})')
+_FILED_AS_OF = re.compile(rb'FILED AS OF DATE:\s*(\d{8})')
+_FORM_TYPE = re.compile(rb'CONFORMED SUBMISSION TYPE:\s*([^\r\n]+)')
+
+
+def normalize(data: bytes) -> bytes:
+    """Lowercase and collapse non-alphanumeric runs to one space"""
+    # translate() runs at memory speed; the regex only touches the space runs
+    return _SPACE_RUN.sub(b' ', data.translate(_NORMALIZE_TABLE))
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over space-padded, normalized phrases
+
+    Padding each phrase with spaces turns substring matches into whole-word
+    matches, so 'acquisition' does not fire inside 'reacquisition'.
+    """
+
+    def __init__(self, keywords: Dict[str, float]):
+        self.keywords = list(keywords)
+        self.patterns = [b' ' + normalize(k.encode()).strip() + b' ' for k in self.keywords]
+        self.max_len = max(len(p) for p in self.patterns)
+
+        if ahocorasick is not None:
+            self._native = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+            for index, pattern in enumerate(self.patterns):
+                self._native.add_word(pattern.decode('ascii'), index)
+            self._native.make_automaton()
+        else:
+            self._native = None
+            self._build()
+
+    def _build(self):
+        """Goto/fail/output tables for the pure-Python fallback"""
+        self.goto: List[Dict[int, int]] = [{}]
+        self.output: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                nxt = self.goto[state].get(byte)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][byte] = nxt
+                    self.goto.append({})
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(index)
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for byte, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and byte not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(byte, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def iter_matches(self, text: bytes, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """Yield (end_index, keyword_index) for matches ending at or after `start`"""
+        if self._native is not None:
+            # Normalized text is pure ASCII, so the decode is a cheap copy
+            for end, index in self._native.iter(text.decode('ascii')):
+                if end >= start:
+                    yield end, index
+            return
+
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, byte in enumerate(text):
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            if output[state] and position >= start:
+                for index in output[state]:
+                    yield position, index
+
+    def scan_stream(self, stream, chunk_size: int = CHUNK_SIZE) -> Dict[int, int]:
+        """Count keyword hits in a binary stream using bounded memory"""
+        counts: Dict[int, int] = {}
+        carry = b' '
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            text = carry + normalize(chunk)
+            # Adjacent separators across a chunk boundary would leave a double space
+            if carry.endswith(b' ') and text[len(carry):len(carry) + 1] == b' ':
+                text = carry + text[len(carry) + 1:]
+            # Matches that ended inside the carried-over tail were already counted
+            for _, index in self.iter_matches(text, start=len(carry)):
+                counts[index] = counts.get(index, 0) + 1
+            carry = text[-(self.max_len - 1):]
+
+        # The final phrase may need the trailing boundary padding
+        for _, index in self.iter_matches(carry + b' ', start=len(carry)):
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+
+
+class FilingHit:
+    """Keyword evidence from one filing"""
+
+    def __init__(self, path: Path, form: str, filed: datetime, counts: Dict[str, int]):
+        self.path = path
+        self.form = form
+        self.filed = filed
+        self.counts = counts
+
+    def age_days(self, now: datetime) -> float:
+        return max(0.0, (now - self.filed).total_seconds() / 86400)
+
+    def to_dict(self) -> Dict:
+        return {
+            'file': str(self.path),
+            'form': self.form,
+            'filed': self.filed.isoformat(),
+            'keywords': self.counts,
+        }
+
+
+class SecSignal:
+    """SEC component result: 0-40 score plus the evidence behind it"""
+
+    def __init__(self, symbol: str, score: int, evidence: List[Dict], scanned: int = 0, bytes_read: int = 0):
+        self.symbol = symbol
+        self.score = score
+        self.evidence = evidence
+        self.scanned = scanned
+        self.bytes_read = bytes_read
+
+    def details(self) -> str:
+        if not self.evidence:
+            return f"No SEC signals ({self.scanned} filings scanned)" if self.scanned else "No recent SEC filings"
+        parts = []
+        for item in self.evidence[:3]:
+            keywords = ', '.join(f'"{k}"' for k in list(item['keywords'])[:3])
+            parts.append(f"{item['form']} {item['age_days']:.0f}d ago: {keywords}")
+        return " | ".join(parts)
+
+
+class SecAnalyzer:
+    """Scores a ticker from the filings CHIRP has written to disk"""
+
+    def __init__(self, filings_path: str = None, keywords: Dict[str, float] = None,
+                 half_life_days: float = HALF_LIFE_DAYS, max_age_days: float = MAX_FILING_AGE_DAYS):
+        self.filings_path = Path(filings_path or os.getenv('SEC_FILINGS_PATH', DEFAULT_SEC_FILINGS_PATH))
+        self.keywords = keywords or SEC_KEYWORDS
+        self.automaton = KeywordAutomaton(self.keywords)
+        self.half_life_days = half_life_days
+        self.max_age_days = max_age_days
+        self.index = None  # Optional SecIndex; turns analyze() into a lookup
+
+    def filings_for(self, symbol: str, root: Path = None) -> Iterator[Path]:
+        """
+        Filings for a ticker in either CHIRP layout:
+            <root>/<TICKER>/<FORM>/<ACCESSION>/full-submission.txt  (sec-edgar-downloader)
+            <root>/<TICKER>_<FORM>_<YYYYMMDD>*.txt                   (flat)
+        """
+        root = Path(root or self.filings_path)
+        ticker_dir = root / symbol.upper()
+        if ticker_dir.is_dir():
+            for path in ticker_dir.rglob('*'):
+                if path.is_file() and path.suffix.lower() in ('.txt', '.htm', '.html', '.xml'):
+                    yield path
+        if root.is_dir():
+            yield from (p for p in root.glob(f'{symbol.upper()}_*') if p.is_file())
+
+    def filing_metadata(self, path: Path) -> Tuple[str, datetime]:
+        """Form type and filing date from the EDGAR header, path, or mtime"""
+        form, filed = None, None
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(4096)
+            match = _FORM_TYPE.search(header)
+            if match:
+                form = match.group(1).decode(errors='ignore').strip()
+            match = _FILED_AS_OF.search(header)
+            if match:
+                filed = datetime.strptime(match.group(1).decode(), '%Y%m%d')
+        except (OSError, ValueError):
+            pass
+
+        if form is None:
+            # sec-edgar-downloader puts the form in the parent of the accession dir
+            parts = path.parts
+            form = next((p for p in parts if p.upper() in FORM_WEIGHTS), None)
+            if form is None:
+                pieces = path.stem.split('_')
+                form = pieces[1] if len(pieces) > 2 else 'UNKNOWN'
+        if filed is None:
+            match = _DATE_IN_NAME.search(str(path))
+            if match:
+                try:
+                    filed = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+                except ValueError:
+                    filed = None
+        if filed is None:
+            filed = datetime.fromtimestamp(path.stat().st_mtime)
+        return form.upper(), filed
+
+    def scan_file(self, path: Path) -> Dict[str, int]:
+        """Keyword hit counts for one filing"""
+        with open(path, 'rb') as f:
+            counts = self.automaton.scan_stream(f)
+        return {self.automaton.keywords[i]: n for i, n in counts.items()}
+
+    def score_hits(self, hits: List[FilingHit], now: datetime = None) -> Tuple[int, List[Dict]]:
+        """Recency-weighted 0-40 score and evidence ordered by contribution"""
+        now = now or datetime.now()
+        total = 0.0
+        evidence = []
+        for hit in hits:
+            age = hit.age_days(now)
+            if age > self.max_age_days:
+                continue
+            decay = math.pow(0.5, age / self.half_life_days)
+            raw = FORM_WEIGHTS.get(hit.form, 0) if hit.counts else 0
+            for keyword, count in hit.counts.items():
+                weight = self.keywords.get(keyword, 0)
+                # Diminishing returns for repeated mentions within one filing
+                raw += weight * (1 + 0.25 * (min(count, MAX_HITS_PER_KEYWORD) - 1))
+            contribution = raw * decay
+            total += contribution
+            if hit.counts:
+                item = hit.to_dict()
+                item['age_days'] = round(age, 1)
+                item['contribution'] = round(contribution, 2)
+                evidence.append(item)
+
+        evidence.sort(key=lambda e: abs(e['contribution']), reverse=True)
+        return max(0, min(MAX_SCORE, int(round(total)))), evidence
+
+    def analyze(self, symbol: str, filings_path: str = None, now: datetime = None) -> SecSignal:
+        """Scan every recent filing for a ticker and score it"""
+        now = now or datetime.now()
+        
+        if filings_path is None and self.index is not None and self.index.exists():
+            hits = self.index.query(symbol, since=now - timedelta(days=self.max_age_days), until=now)
+            score, evidence = self.score_hits(hits, now)
+            return SecSignal(symbol, score, evidence, scanned=len(hits))
+        
+        start = time.perf_counter()
+        hits = []
+        scanned = 0
+        bytes_read = 0
+
+        for path in self.filings_for(symbol, filings_path):
+            try:
+                form, filed = self.filing_metadata(path)
+                if (now - filed).days > self.max_age_days:
+                    continue
+                counts = self.scan_file(path)
+                scanned += 1
+                bytes_read += path.stat().st_size
+                hits.append(FilingHit(path, form, filed, counts))
+            except OSError as e:
+                logger.error(f"Could not read SEC filing {path}: {e}")
+
+        score, evidence = self.score_hits(hits, now)
+        elapsed = time.perf_counter() - start
+        if bytes_read:
+            logger.info(f"Scanned {scanned} filings for {symbol} "
+                        f"({bytes_read / 1e6:.1f} MB at {bytes_read / 1e6 / max(elapsed, 1e-9):.0f} MB/s)")
+        return SecSignal(symbol, score, evidence, scanned=scanned, bytes_read=bytes_read)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    analyzer = SecAnalyzer()
+    for ticker in sys.argv[1:] or ['AAPL']:
+        signal = analyzer.analyze(ticker)
+        print(f"{ticker}: {signal.score}/40 - {signal.details()}")
@@ -0,0 +1,394 @@
+"""
+SEC Filing Index
+Incremental, memory-mapped inverted index of keyword hits per ticker/CIK
+
+Layout under SEC_INDEX_PATH:
+    manifest.json     dictionaries (tickers, CIKs, keywords, forms, filings) and segment list
+    seg-NNNNNN.bin    fixed-width hit records sorted by (ticker_id, filed_ts)
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sec_analyzer import DEFAULT_SEC_FILINGS_PATH, FilingHit, SecAnalyzer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEC_INDEX_PATH = DEFAULT_SEC_FILINGS_PATH.parent / 'sec_index'
+
+# ticker_id u32 | filed_ts i64 | filing_id u32 | keyword_id u16 | count u16
+RECORD = struct.Struct('<IqIHH')
+_TS = struct.Struct('<q')    # filed_ts alone, at offset 4 within a record
+NO_KEYWORD = 0xFFFF          # Marks a filing that was scanned but had no hits
+MAX_SEGMENTS = 8             # Compact once this many segments have accumulated
+FILING_SUFFIXES = ('.txt', '.htm', '.html', '.xml')
+
+_CIK = re.compile(rb'CENTRAL INDEX KEY:\s*(\d+)')
+
+
+class _Segment:
+    """One immutable, memory-mapped run of sorted records"""
+
+    def __init__(self, path: Path, offsets: Dict[str, List[int]]):
+        self.path = path
+        self.offsets = {int(k): v for k, v in offsets.items()}
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _ts(self, index: int) -> int:
+        return _TS.unpack_from(self.map, index * RECORD.size + 4)[0]
+
+    def records(self, ticker_id: int, since_ts: int, until_ts: int) -> Iterator[Tuple]:
+        """Records for a ticker within [since_ts, until_ts]"""
+        if self.map is None or ticker_id not in self.offsets:
+            return
+        lo, hi = self.offsets[ticker_id]
+        # Binary search on filed_ts within the ticker's contiguous block
+        left, right = lo, hi
+        while left < right:
+            mid = (left + right) // 2
+            if self._ts(mid) < since_ts:
+                left = mid + 1
+            else:
+                right = mid
+        for index in range(left, hi):
+            record = RECORD.unpack_from(self.map, index * RECORD.size)
+            if record[1] > until_ts:
+                break
+            yield record
+
+    def iter_all(self) -> Iterator[Tuple]:
+        if self.map is None:
+            return
+        yield from RECORD.iter_unpack(self.map)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class SecIndex:
+    """Ticker/CIK → filings and keyword hits, built incrementally from CHIRP output"""
+
+    def __init__(self, index_path: str = None, filings_path: str = None, analyzer: SecAnalyzer = None):
+        self.index_path = Path(index_path or os.getenv('SEC_INDEX_PATH', DEFAULT_SEC_INDEX_PATH))
+        self.analyzer = analyzer or SecAnalyzer(filings_path)
+        self.filings_path = Path(filings_path or self.analyzer.filings_path)
+        self.manifest_path = self.index_path / 'manifest.json'
+        # `lock` guards the in-memory index (queries, reloads, applying updates);
+        # `update_lock` serializes update() so scanning can happen outside `lock`
+        self.lock = threading.RLock()
+        self.update_lock = threading.Lock()
+        self._manifest_mtime = None
+        self._segments: Dict[str, _Segment] = {}
+        self._reset()
+
+    def _reset(self):
+        self.files: Dict[str, List] = {}         # relpath → [mtime_ns, size, filing_id]
+        self.tickers: List[str] = []
+        self.ciks: Dict[str, int] = {}           # CIK → ticker_id
+        self.keywords: List[str] = []
+        self.forms: List[str] = []
+        self.filings: List[List] = []            # filing_id → [relpath, form_id, filed_ts, live]
+        self.segments: Dict[str, Dict] = {}      # segment name → {ticker_id: [lo, hi]}
+        self._ticker_ids: Dict[str, int] = {}
+        self._keyword_ids: Dict[str, int] = {}
+        self._form_ids: Dict[str, int] = {}
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    # ---- manifest -------------------------------------------------------
+
+    def load(self):
+        """(Re)load the manifest if it changed on disk"""
+        with self.lock:
+            self._load()
+
+    def _load(self):
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+
+        with open(self.manifest_path) as f:
+            data = json.load(f)
+
+        self._reset()
+        self.files = data['files']
+        self.tickers = data['tickers']
+        self.ciks = data['ciks']
+        self.keywords = data['keywords']
+        self.forms = data['forms']
+        self.filings = data['filings']
+        self.segments = data['segments']
+        self._ticker_ids = {t: i for i, t in enumerate(self.tickers)}
+        self._keyword_ids = {k: i for i, k in enumerate(self.keywords)}
+        self._form_ids = {f: i for i, f in enumerate(self.forms)}
+
+        for name in list(self._segments):
+            if name not in self.segments:
+                self._segments.pop(name).close()
+        self._manifest_mtime = mtime
+
+    def _save(self):
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        data = {
+            'version': 1,
+            'files': self.files,
+            'tickers': self.tickers,
+            'ciks': self.ciks,
+            'keywords': self.keywords,
+            'forms': self.forms,
+            'filings': self.filings,
+            'segments': self.segments,
+        }
+        tmp = self.manifest_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, self.manifest_path)
+        self._manifest_mtime = self.manifest_path.stat().st_mtime_ns
+
+    def _segment(self, name: str) -> _Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = self._segments[name] = _Segment(self.index_path / name, self.segments[name])
+        return segment
+
+    def _intern(self, table: Dict[str, int], values: List[str], value: str) -> int:
+        index = table.get(value)
+        if index is None:
+            index = table[value] = len(values)
+            values.append(value)
+        return index
+
+    # ---- building -------------------------------------------------------
+
+    def _discover(self) -> Iterator[Tuple[str, Path]]:
+        """(ticker, path) for every filing under the CHIRP directory"""
+        root = self.filings_path
+        if not root.is_dir():
+            return
+        for entry in root.iterdir():
+            if entry.is_dir():
+                for path in entry.rglob('*'):
+                    if path.is_file() and path.suffix.lower() in FILING_SUFFIXES:
+                        yield entry.name.upper(), path
+            elif entry.is_file() and '_' in entry.name:
+                yield entry.name.split('_', 1)[0].upper(), entry
+
+    def update(self) -> int:
+        """Index new or changed filings into a fresh segment; returns filings added"""
+        with self.update_lock:
+            with self.lock:
+                self.load()
+                known_files = dict(self.files)
+
+            # Scanning is the slow part; queries keep running against the current index
+            scanned = []
+            for ticker, path in self._discover():
+                relpath = str(path.relative_to(self.filings_path))
+                try:
+                    stat = path.stat()
+                    known = known_files.get(relpath)
+                    if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+                        continue
+
+                    form, filed = self.analyzer.filing_metadata(path)
+                    counts = self.analyzer.scan_file(path)
+                    with open(path, 'rb') as f:
+                        cik_match = _CIK.search(f.read(4096))
+                except OSError as e:
+                    logger.error(f'Could not index SEC filing {path}: {e}')
+                    continue
+                scanned.append((ticker, relpath, stat, form, filed, counts, cik_match))
+
+            with self.lock:
+                records = []
+                for ticker, relpath, stat, form, filed, counts, cik_match in scanned:
+                    known = self.files.get(relpath)
+                    if known:
+                        self.filings[known[2]][3] = 0  # Superseded by the rescan below
+
+                    ticker_id = self._intern(self._ticker_ids, self.tickers, ticker)
+                    if cik_match:
+                        self.ciks[cik_match.group(1).decode().lstrip('0')] = ticker_id
+                    filing_id = len(self.filings)
+                    filed_ts = int(filed.timestamp())
+                    self.filings.append([relpath, self._intern(self._form_ids, self.forms, form), filed_ts, 1])
+                    self.files[relpath] = [stat.st_mtime_ns, stat.st_size, filing_id]
+
+                    if counts:
+                        for keyword, count in counts.items():
+                            keyword_id = self._intern(self._keyword_ids, self.keywords, keyword)
+                            records.append((ticker_id, filed_ts, filing_id, keyword_id, min(count, 0xFFFF)))
+                    else:
+                        records.append((ticker_id, filed_ts, filing_id, NO_KEYWORD, 0))
+                added = len(scanned)
+
+                retired = []
+                if records:
+                    self._write_segment(records)
+                if len(self.segments) > MAX_SEGMENTS:
+                    retired = self._compact()
+                if added or not self.exists():
+                    self._save()
+                # Only once the manifest no longer lists them, so other processes
+                # that reload after a failed open find the compacted segment
+                for name in retired:
+                    try:
+                        (self.index_path / name).unlink()
+                    except FileNotFoundError:
+                        pass
+
+            if added:
+                logger.info(f'Indexed {added} SEC filings ({len(self.filings)} total, {len(self.segments)} segments)')
+            return added
+
+    def _next_segment_name(self) -> str:
+        existing = [int(n[4:10]) for n in self.segments] or [0]
+        return f'seg-{max(existing) + 1:06d}.bin'
+
+    def _write_segment(self, records: List[Tuple], name: str = None):
+        """Sort records and write them as a new segment"""
+        records.sort(key=lambda r: (r[0], r[1], r[2]))
+        offsets: Dict[int, List[int]] = {}
+        for position, record in enumerate(records):
+            span = offsets.setdefault(record[0], [position, position])
+            span[1] = position + 1
+
+        name = name or self._next_segment_name()
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path / (name + '.tmp')
+        with open(tmp, 'wb') as f:
+            buffer = bytearray(RECORD.size * len(records))
+            for position, record in enumerate(records):
+                RECORD.pack_into(buffer, position * RECORD.size, *record)
+            f.write(buffer)
+        os.replace(tmp, self.index_path / name)
+        self.segments[name] = {str(k): v for k, v in offsets.items()}
+
+    def _compact(self) -> List[str]:
+        """
+        Merge all segments into one, dropping superseded filings from the
+        segments and the manifest (live filings are renumbered)
+
+        Returns the replaced segments, for the caller to delete after saving.
+        """
+        live_ids = [i for i, filing in enumerate(self.filings) if filing[3]]
+        new_ids = {old_id: new_id for new_id, old_id in enumerate(live_ids)}
+        live = [(ticker_id, filed_ts, new_ids[filing_id], keyword_id, count)
+                for name in sorted(self.segments)
+                for ticker_id, filed_ts, filing_id, keyword_id, count in self._segment(name).iter_all()
+                if filing_id in new_ids]
+        self.filings = [self.filings[i] for i in live_ids]
+        for entry in self.files.values():
+            entry[2] = new_ids[entry[2]]
+
+        old = list(self.segments)
+        name = self._next_segment_name()
+        self.segments = {}
+        self._write_segment(live, name)
+        for name in old:
+            segment = self._segments.pop(name, None)
+            if segment:
+                segment.close()
+        logger.info(f'Compacted SEC index into {len(live)} records ({len(self.filings)} filings)')
+        return old
+
+    # ---- querying -------------------------------------------------------
+
+    def resolve(self, ticker_or_cik: str) -> Optional[int]:
+        """Ticker id for a ticker symbol or numeric CIK"""
+        key = str(ticker_or_cik).upper()
+        if key.isdigit():
+            return self.ciks.get(key.lstrip('0'))
+        return self._ticker_ids.get(key)
+
+    def query(self, ticker_or_cik: str, since: datetime = None, until: datetime = None) -> List[FilingHit]:
+        """Filings and keyword hits for a ticker/CIK within a time window"""
+        with self.lock:
+            self._load()
+            try:
+                return self._query(ticker_or_cik, since, until)
+            except FileNotFoundError:
+                # Another process compacted the index since our last load and
+                # deleted a segment we hadn't opened yet: reload and retry
+                self._manifest_mtime = None
+                self._load()
+                return self._query(ticker_or_cik, since, until)
+
+    def _query(self, ticker_or_cik: str, since: datetime = None, until: datetime = None) -> List[FilingHit]:
+        ticker_id = self.resolve(ticker_or_cik)
+        if ticker_id is None:
+            return []
+
+        since_ts = int(since.timestamp()) if since else -(1 << 62)
+        until_ts = int(until.timestamp()) if until else (1 << 62)
+        by_filing: Dict[int, Dict[str, int]] = {}
+        for name in self.segments:
+            for _, _, filing_id, keyword_id, count in self._segment(name).records(ticker_id, since_ts, until_ts):
+                if not self.filings[filing_id][3]:
+                    continue
+                counts = by_filing.setdefault(filing_id, {})
+                if keyword_id != NO_KEYWORD:
+                    counts[self.keywords[keyword_id]] = count
+
+        hits = []
+        for filing_id, counts in by_filing.items():
+            relpath, form_id, filed_ts, _ = self.filings[filing_id]
+            hits.append(FilingHit(self.filings_path / relpath, self.forms[form_id],
+                                  datetime.fromtimestamp(filed_ts), counts))
+        hits.sort(key=lambda h: h.filed, reverse=True)
+        return hits
+
+    def close(self):
+        with self.lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SecIndex:
+    """Process-wide index (and its analyzer), so scorers don't rebuild the automaton or re-read the manifest"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SecIndex()
+            _index.analyzer.index = _index
+        return _index
+
+
+if __name__ == "__main__":
+    import sys
+    from datetime import timedelta
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    index = SecIndex()
+    start = time.perf_counter()
+    added = index.update()
+    print(f"✅ Indexed {added} new filings in {time.perf_counter() - start:.2f}s ({index.index_path})")
+
+    for ticker in sys.argv[1:]:
+        start = time.perf_counter()
+        hits = index.query(ticker, since=datetime.now() - timedelta(days=30))
+        elapsed = (time.perf_counter() - start) * 1000
+        score, _ = index.analyzer.score_hits(hits)
+        print(f"{ticker}: {len(hits)} filings, SEC {score}/40 ({elapsed:.3f} ms)")
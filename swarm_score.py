@@ -1,136 +1,104 @@
 """
 SWARM Intelligence Score Calculator
-Uses Alpha Vantage API for market data
+Uses Alpha Vantage API for market data (or another backend, see market_data.py)
 """
 
 import os
-import json
-import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
 from typing import Dict, Optional, Tuple
 import logging
 import time
 
+import indicators
+import market_data
+import metrics
+import news_engine
+from sec_index import get_index
+
 logger = logging.getLogger(__name__)
 
+# Score component -> the inputs it reads. Every input is fetched once per score
+# and all of them are fetched concurrently, so a score takes about as long as
+# its slowest input rather than the sum of them.
+COMPONENT_INPUTS = {
+    'sec': ('filings',),
+    'technical': ('quote', 'daily'),
+    'financial': ('overview',),
+    'news': ('news',),
+}
+
+_fetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv('SCORE_FETCH_THREADS', '16')),
+                                 thread_name_prefix='swarm-fetch')
+
 class SwarmScore:
     """Calculate SWARM SCORE using Alpha Vantage API"""
     
-    def __init__(self):
+    # Average seconds between Alpha Vantage requests, shared by every scorer in
+    # the process (short bursts allowed, see ALPHA_VANTAGE_BURST); 0 disables
+    request_delay = float(os.getenv('ALPHA_VANTAGE_REQUEST_INTERVAL', '1.2'))
+    cache_ttls = market_data.CACHE_TTLS
+    # Oldest last-good payload served when the provider is failing (seconds)
+    stale_fallback_seconds = float(os.getenv('STALE_FALLBACK_SECONDS', '86400'))
+    # Seconds each component may wait for its inputs before it scores 0
+    component_timeouts = {
+        'sec': float(os.getenv('SCORE_SEC_TIMEOUT', '15')),
+        'technical': float(os.getenv('SCORE_TECHNICAL_TIMEOUT', '25')),
+        'financial': float(os.getenv('SCORE_FINANCIAL_TIMEOUT', '25')),
+        'news': float(os.getenv('SCORE_NEWS_TIMEOUT', '5')),
+    }
+    
+    def __init__(self, base_url: str = None, provider: market_data.MarketDataProvider = None):
         self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         if not self.api_key:
             logger.warning("ALPHA_VANTAGE_API_KEY not set")
         else:
             logger.info(f"Alpha Vantage API key loaded: {self.api_key[:10]}...")
-        self.base_url = "https://www.alphavantage.co/query"
-    
-    def _make_request(self, params: dict) -> Optional[dict]:
-        """Make API request to Alpha Vantage"""
-        try:
-            params['apikey'] = self.api_key
-            logger.info(f"Making Alpha Vantage request: {params.get('function')} for {params.get('symbol', 'N/A')}")
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            
-            logger.info(f"Alpha Vantage response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Log first few keys to see what we got
-                logger.info(f"Response keys: {list(data.keys())[:5]}")
-                
-                # Check for rate limit
-                if 'Note' in data:
-                    logger.warning(f"Alpha Vantage rate limit: {data['Note']}")
-                    return None
-                
-                # Check for information message (also rate limit)
-                if 'Information' in data:
-                    logger.warning(f"Alpha Vantage info: {data['Information']}")
-                    return None
-                
-                # Check for error message
-                if 'Error Message' in data:
-                    logger.error(f"Alpha Vantage error: {data['Error Message']}")
-                    return None
-
-                time.sleep(1.2)  # Rate limit: 1 req/sec
-                return data
-                    
-            else:
-                logger.error(f"Alpha Vantage request failed: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Alpha Vantage request exception: {e}")
-            return None
+        # ALPHA_VANTAGE_BASE_URL points scoring at a stand-in (see benchmarks/av_standin.py)
+        self.base_url = base_url or os.getenv('ALPHA_VANTAGE_BASE_URL', market_data.DEFAULT_BASE_URL)
+        # MARKET_DATA_PROVIDER picks the backend; Alpha Vantage takes this
+        # scorer's settings (its cache, limiter and breakers are process-wide)
+        if provider is None and os.getenv('MARKET_DATA_PROVIDER', 'alpha_vantage') == 'alpha_vantage':
+            provider = market_data.AlphaVantageProvider(
+                self.api_key, self.base_url, self.request_delay,
+                self.cache_ttls, self.stale_fallback_seconds,
+            )
+        self.provider = provider or market_data.get_provider()
+        self.sec_analyzer = None  # Process-wide analyzer + index, fetched on first use
     
     def get_quote(self, symbol: str) -> Optional[dict]:
         """Get real-time quote data"""
-        params = {
-            'function': 'GLOBAL_QUOTE',
-            'symbol': symbol
-        }
-        
-        data = self._make_request(params)
-        if data and 'Global Quote' in data:
-            logger.info(f"Got quote data for {symbol}")
-            return data['Global Quote']
-        
-        logger.error(f"No quote data for {symbol}")
-        return None
+        return self.provider.get_quote(symbol)
     
-    def get_daily_data(self, symbol: str) -> Optional[dict]:
-        """Get daily time series data"""
-        params = {
-            'function': 'TIME_SERIES_DAILY',
-            'symbol': symbol,
-            'outputsize': 'compact'
-        }
-        
-        data = self._make_request(params)
-        
-        if data:
-            if 'Time Series (Daily)' in data:
-                logger.info(f"Got daily data for {symbol} - {len(data['Time Series (Daily)'])} days")
-                return data['Time Series (Daily)']
-            else:
-                logger.error(f"Response for {symbol} missing 'Time Series (Daily)'. Keys: {list(data.keys())}")
-        else:
-            logger.error(f"No response data for {symbol}")
-        
-        return None
+    def get_daily_data(self, symbol: str, outputsize: str = 'compact') -> Optional[dict]:
+        """Get daily time series data (compact = last 100 days, full = 20+ years)"""
+        return self.provider.get_daily_data(symbol, outputsize)
     
     def get_company_overview(self, symbol: str) -> Optional[dict]:
         """Get company fundamental data"""
-        params = {
-            'function': 'OVERVIEW',
-            'symbol': symbol
-        }
-        
-        data = self._make_request(params)
-        if data and 'Symbol' in data:
-            logger.info(f"Got company overview for {symbol}")
-            return data
-        
-        logger.error(f"No company overview for {symbol}")
-        return None
+        return self.provider.get_company_overview(symbol)
+    
+    def prefetch(self, symbols) -> int:
+        """Bulk-load market data for a scan universe where the provider supports it"""
+        return self.provider.prefetch(list(symbols))
     
     def calculate_technical_score(self, symbol: str) -> Tuple[int, str]:
         """Calculate technical analysis score (0-35)"""
+        return self.technical_score_from(symbol, self.get_quote(symbol), self.get_daily_data(symbol))
+    
+    def technical_score_from(self, symbol: str, quote: Optional[dict], daily_data: Optional[dict],
+                             features: Dict[str, float] = None) -> Tuple[int, str]:
+        """Technical score (0-35) from an already fetched quote and daily series (raw inputs go in `features`)"""
         score = 0
         details = []
+        features = features if features is not None else {}
         
         try:
-            # Get quote data
-            quote = self.get_quote(symbol)
             if not quote:
                 logger.error(f"No quote data for {symbol}")
                 return 0, "No market data available"
             
-            # Get daily data for volume analysis
-            daily_data = self.get_daily_data(symbol)
+            # Daily data for volume analysis
             if not daily_data:
                 logger.error(f"No daily data for {symbol}")
                 return 0, "No historical data available"
@@ -144,71 +112,100 @@ class SwarmScore:
                 logger.error(f"Failed to parse quote data for {symbol}: {e}")
                 return 0, "Invalid market data"
             
-            # Calculate average volume (last 20 days)
-            volumes = []
-            for date_str, day_data in list(daily_data.items())[:20]:
-                try:
-                    volumes.append(int(day_data.get('5. volume', 0)))
-                except (ValueError, TypeError):
-                    continue
+            # Streaming indicators: only bars completed since the last scan are
+            # applied (symbols still short of a year are backfilled off the hot path)
+            state = indicators.get_store().update(symbol, daily_data)
+            avg_volume = state.volume.value or 0
+            features.update(change_percent=change_percent, price=current_price)
             
-            avg_volume = sum(volumes) / len(volumes) if volumes else 0
-            
-            # Volume Score (0-15)
+            # Volume Score (0-10)
             if avg_volume > 0:
                 volume_ratio = volume / avg_volume
+                features['volume_ratio'] = volume_ratio
                 if volume_ratio >= 3.0:
-                    score += 15
+                    score += 10
                     details.append(f"Volume 3x+ average ({volume_ratio:.1f}x)")
                 elif volume_ratio >= 2.0:
-                    score += 12
+                    score += 8
                     details.append(f"Volume 2x average ({volume_ratio:.1f}x)")
                 elif volume_ratio >= 1.5:
-                    score += 8
+                    score += 5
                     details.append(f"Volume 1.5x average ({volume_ratio:.1f}x)")
                 elif volume_ratio >= 1.0:
-                    score += 5
+                    score += 3
                     details.append(f"Above average volume ({volume_ratio:.1f}x)")
             
-            # Price Action Score (0-10)
+            # Price Action Score (0-7)
             if change_percent > 5:
-                score += 10
+                score += 7
                 details.append(f"Strong rally (+{change_percent:.1f}%)")
             elif change_percent > 3:
-                score += 8
+                score += 5
                 details.append(f"Good momentum (+{change_percent:.1f}%)")
             elif change_percent > 1:
-                score += 5
+                score += 3
                 details.append(f"Positive movement (+{change_percent:.1f}%)")
             elif change_percent > 0:
-                score += 3
+                score += 2
                 details.append(f"Slight gain (+{change_percent:.1f}%)")
             
-            # Price Level Score (0-10)
-            prices = []
-            for date_str, day_data in list(daily_data.items())[:252]:
-                try:
-                    prices.append(float(day_data.get('2. high', 0)))
-                    prices.append(float(day_data.get('3. low', 0)))
-                except (ValueError, TypeError):
-                    continue
+            # Trend Score (0-8): price above each SMA, 20 EMA above 50 EMA
+            above = [period for period, sma in state.sma.items()
+                     if sma.value is not None and current_price > sma.value]
+            score += 2 * len(above)
+            for period, sma in state.sma.items():
+                if sma.value is not None:
+                    features[f'pct_vs_sma{period}'] = (current_price / sma.value - 1) * 100
+            ema_fast, ema_slow = state.ema[20].value, state.ema[50].value
+            if ema_fast is not None and ema_slow is not None and ema_fast > ema_slow:
+                score += 2
+                above.append('ema')
+            if len(above) == 4:
+                details.append("Above 20/50/200-day MAs, 20 EMA > 50 EMA")
+            elif above:
+                smas = '/'.join(str(p) for p in above if p != 'ema')
+                details.append((f"Above {smas}-day MA" if smas else "Below MAs") +
+                               (", 20 EMA > 50 EMA" if 'ema' in above else ""))
             
-            if prices:
-                week_52_high = max(prices)
-                week_52_low = min(prices)
+            # RSI Score (0-4), today's quote as the provisional close
+            rsi = state.rsi.peek(current_price) if state.last_close is not None else None
+            if rsi is not None:
+                features['rsi'] = rsi
+                if 50 <= rsi < 70:
+                    score += 4
+                    details.append(f"RSI {rsi:.0f} (momentum)")
+                elif 70 <= rsi < 80:
+                    score += 2
+                    details.append(f"RSI {rsi:.0f} (extended)")
+                elif 40 <= rsi < 50:
+                    score += 1
+                    details.append(f"RSI {rsi:.0f} (neutral)")
+                elif rsi >= 80:
+                    details.append(f"RSI {rsi:.0f} (overbought)")
+                elif rsi < 30:
+                    details.append(f"RSI {rsi:.0f} (oversold)")
+            
+            # Price Level Score (0-6), rolling 252-bar range
+            levels = state.range
+            
+            if levels.count:
+                week_52_high = max(levels.high, current_price)
+                week_52_low = min(levels.low, current_price)
+                period = "52-week" if levels.full else f"{levels.bars}-day"
                 
                 if week_52_high > week_52_low:
                     pct_from_high = ((week_52_high - current_price) / week_52_high) * 100
+                    features['pct_from_high'] = pct_from_high
                     
                     if pct_from_high < 5:
-                        score += 10
-                        details.append(f"Near 52-week high (-{pct_from_high:.1f}%)")
+                        score += 6
+                        details.append(f"Near {period} high (-{pct_from_high:.1f}%)")
                     elif pct_from_high < 10:
-                        score += 7
-                        details.append(f"Strong price level (-{pct_from_high:.1f}% from high)")
+                        score += 4
+                        details.append(f"Strong price level (-{pct_from_high:.1f}% from {period} high)")
                     elif pct_from_high < 20:
-                        score += 5
-                        details.append(f"Decent price level (-{pct_from_high:.1f}% from high)")
+                        score += 3
+                        details.append(f"Decent price level (-{pct_from_high:.1f}% from {period} high)")
             
             details_str = " | ".join(details) if details else "Limited data"
             logger.info(f"Technical score for {symbol}: {score}/35 - {details_str}")
@@ -221,11 +218,14 @@ class SwarmScore:
     
     def calculate_financial_score(self, symbol: str) -> Tuple[int, str]:
         """Calculate financial health score (0-15)"""
+        return self.financial_score_from(symbol, self.get_company_overview(symbol))
+    
+    def financial_score_from(self, symbol: str, overview: Optional[dict]) -> Tuple[int, str]:
+        """Financial health score (0-15) from an already fetched company overview"""
         score = 0
         details = []
         
         try:
-            overview = self.get_company_overview(symbol)
             if not overview:
                 logger.error(f"No company overview for {symbol}")
                 return 0, "No financial data available"
@@ -292,15 +292,86 @@ class SwarmScore:
     
     def calculate_sec_score(self, symbol: str, sec_filings_path: str = None) -> Tuple[int, str]:
         """Calculate SEC filing score (0-40)"""
-        # For now, return 0 since we don't have SEC filing integration yet
-        logger.info(f"SEC score for {symbol}: 0/40 - No SEC filings analyzed yet")
-        return 0, "SEC analysis not yet integrated"
+        try:
+            if self.sec_analyzer is None:
+                self.sec_analyzer = get_index().analyzer
+            
+            signal = self.sec_analyzer.analyze(symbol, sec_filings_path)
+            details_str = signal.details()
+            logger.info(f"SEC score for {symbol}: {signal.score}/40 - {details_str}")
+            
+            return signal.score, details_str
+            
+        except Exception as e:
+            logger.error(f"Error calculating SEC score for {symbol}: {e}", exc_info=True)
+            return 0, f"Error: {str(e)}"
     
     def calculate_news_score(self, symbol: str) -> Tuple[int, str]:
-        """Calculate news/sentiment score (0-10)"""
-        # Simplified - just return 0 for now to avoid extra API calls
-        logger.info(f"News score for {symbol}: 0/10")
-        return 0, "News analysis temporarily disabled"
+        """Calculate news/sentiment score (0-10) from locally ingested headlines"""
+        try:
+            score, details = news_engine.get_engine().score(symbol)
+            logger.info(f"News score for {symbol}: {score}/10")
+            return score, details
+        except Exception as e:
+            logger.error(f"Error calculating news score for {symbol}: {e}")
+            return 0, "News analysis unavailable"
+    
+    def run_components(self, symbol: str, sec_filings_path: str = None,
+                       features: Dict[str, float] = None) -> Tuple[Dict[str, Tuple[int, str]], list, Dict[str, float]]:
+        """
+        Score every component, fetching each input once and all of them concurrently
+        
+        A component whose inputs time out, or that the provider couldn't serve
+        even from stale data, scores 0 so the rest of the result still stands.
+        Returns ({component: (score, details)}, [partial components],
+        {input: age in seconds of stale data used}); the technical inputs are
+        written to `features`.
+        """
+        loaders = {
+            'quote': lambda: market_data.fetch_tracked(self.get_quote, symbol),
+            'daily': lambda: market_data.fetch_tracked(self.get_daily_data, symbol),
+            'overview': lambda: market_data.fetch_tracked(self.get_company_overview, symbol),
+            # Local reads, already scored where they're loaded
+            'filings': lambda: (self.calculate_sec_score(symbol, sec_filings_path), None, False),
+            'news': lambda: (self.calculate_news_score(symbol), None, False),
+        }
+        scorers = {
+            'sec': lambda filings: filings,
+            'technical': lambda quote, daily: self.technical_score_from(symbol, quote, daily, features),
+            'financial': lambda overview: self.financial_score_from(symbol, overview),
+            'news': lambda news: news,
+        }
+        
+        started = time.monotonic()
+        needed = dict.fromkeys(name for inputs in COMPONENT_INPUTS.values() for name in inputs)
+        pending = {name: _fetch_pool.submit(loaders[name]) for name in needed}
+        
+        components, partial, stale = {}, [], {}
+        for component, inputs in COMPONENT_INPUTS.items():
+            deadline = started + self.component_timeouts[component]
+            try:
+                with metrics.timed(f'score_{component}'):
+                    loaded = [pending[name].result(timeout=max(0.0, deadline - time.monotonic()))
+                              for name in inputs]
+                    score, details = scorers[component](*(payload for payload, _, _ in loaded))
+                
+                ages = {name: age for name, (_, age, _) in zip(inputs, loaded) if age is not None}
+                stale.update(ages)
+                if ages:
+                    details = f"[data {max(ages.values()) / 60:.0f}m old] {details}"
+                if any(unavailable for _, _, unavailable in loaded):
+                    partial.append(component)
+                components[component] = (score, details)
+            except FutureTimeout:
+                # The fetch keeps running and still fills the response cache
+                logger.warning(f"{component} score for {symbol} timed out after "
+                               f"{self.component_timeouts[component]:g}s")
+                components[component] = (0, "Timed out waiting for data")
+                partial.append(component)
+            except Exception as e:
+                logger.error(f"Error calculating {component} score for {symbol}: {e}", exc_info=True)
+                components[component] = (0, f"Error: {str(e)}")
+        return components, partial, stale
     
     def calculate_swarm_score(self, symbol: str, sec_filings_path: str = None) -> Dict:
         """
@@ -310,14 +381,12 @@ class SwarmScore:
         """
         logger.info(f"Calculating SWARM SCORE for {symbol}")
         
-        # Calculate component scores
-        sec_score, sec_details = self.calculate_sec_score(symbol, sec_filings_path)
-        time.sleep(1.5)  # Rate limit: 1 req/sec
-        technical_score, technical_details = self.calculate_technical_score(symbol)
-        time.sleep(1.5)  # Rate limit: 1 req/sec
-        financial_score, financial_details = self.calculate_financial_score(symbol)
-        time.sleep(1.5)  # Rate limit: 1 req/sec
-        news_score, news_details = self.calculate_news_score(symbol)
+        features: Dict[str, float] = {}
+        components, partial, stale = self.run_components(symbol, sec_filings_path, features)
+        sec_score, sec_details = components['sec']
+        technical_score, technical_details = components['technical']
+        financial_score, financial_details = components['financial']
+        news_score, news_details = components['news']
         
         # Calculate weighted total
         total_score = int(
@@ -345,6 +414,9 @@ class SwarmScore:
                 'financial': {'score': financial_score, 'max': 15, 'details': financial_details},
                 'news': {'score': news_score, 'max': 10, 'details': news_details}
             },
+            'features': features,
+            'partial': partial,
+            'stale': {name: round(age) for name, age in stale.items()},
             'timestamp': datetime.now().isoformat()
         }
         
@@ -352,3 +424,21 @@ class SwarmScore:
         logger.info(f"Breakdown - SEC: {sec_score}/40, Tech: {technical_score}/35, Fin: {financial_score}/15, News: {news_score}/10")
         
         return result
+
+
+def flatten_score(result: Dict) -> Dict:
+    """calculate_swarm_score result in the flat score_data shape alerts are stored with"""
+    breakdown = result.get('breakdown', {})
+    return {
+        'score': result['total_score'],
+        'sec_score': breakdown.get('sec', {}).get('score', 0),
+        'technical_score': breakdown.get('technical', {}).get('score', 0),
+        'financial_score': breakdown.get('financial', {}).get('score', 0),
+        'news_score': breakdown.get('news', {}).get('score', 0),
+        'confidence': result.get('confidence'),
+        'breakdown': breakdown,
+        'features': result.get('features', {}),
+        'partial': result.get('partial', []),
+        'stale': result.get('stale', {}),
+        'timestamp': result.get('timestamp'),
+    }
@@ -68,11 +68,11 @@ except Exception as e:
 # Test 3: SWARM SCORE Algorithm
 print("\n3️⃣ Testing SWARM SCORE Algorithm...")
 try:
-    from swarm_score import calculate_swarm_score
+    from swarm_score import SwarmScore, flatten_score
     
     async def test_swarm_score():
-        result = await calculate_swarm_score('AAPL')
-        return result
+        result = await asyncio.to_thread(SwarmScore().calculate_swarm_score, 'AAPL')
+        return flatten_score(result)
     
     result = asyncio.run(test_swarm_score())
     
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_round_robin_across_users():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=1, user_rate=10)
+        first = controller.admit(1)
+        tickets = [controller.admit(1), controller.admit(1), controller.admit(2), controller.admit(3)]
+        assert first.granted.done()
+        served = []
+        current = first
+        for _ in tickets:
+            controller.release(current)
+            current = next(t for t in tickets if t.granted.done() and not t.released)
+            served.append(current)
+        return tickets, served
+
+    tickets, served = run(scenario())
+    a1, a2, b, c = tickets
+    assert served == [a1, b, c, a2]
+
+
+def test_pro_lane_served_first():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=1)
+        running = controller.admit(1)
+        free = controller.admit(2)
+        pro = controller.admit(3, pro=True)
+        assert controller.position(pro) == 0
+        assert controller.position(free) == 1
+        controller.release(running)
+        return pro.granted.done(), free.granted.done()
+
+    assert run(scenario()) == (True, False)
+
+
+def test_position_counts_requests_served_first():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=1, user_rate=10)
+        controller.admit(9)
+        a1, a2, a3 = controller.admit(1), controller.admit(1), controller.admit(1)
+        b1 = controller.admit(2)
+        return [controller.position(t) for t in (a1, b1, a2, a3)]
+
+    assert run(scenario()) == [0, 1, 2, 3]
+
+
+def test_release_while_waiting_removes_from_queue():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=1)
+        controller.admit(1)
+        waiting = controller.admit(2)
+        controller.release(waiting)
+        return controller.depth(), waiting.granted.cancelled()
+
+    assert run(scenario()) == (0, True)
+
+
+def test_rate_limits_reject_with_retry_after():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=5, user_rate=1, guild_rate=2, per=60)
+        controller.admit(1, guild_id=7)
+        with pytest.raises(Rejected) as user_limited:
+            controller.admit(1, guild_id=7)
+        controller.admit(2, guild_id=7)
+        with pytest.raises(Rejected) as guild_limited:
+            controller.admit(3, guild_id=7)
+        return user_limited.value, guild_limited.value
+
+    user_limited, guild_limited = run(scenario())
+    assert user_limited.reason == 'user rate limit' and user_limited.retry_after > 0
+    assert guild_limited.reason == 'guild rate limit' and guild_limited.retry_after > 0
+
+
+def test_queue_cap_per_user():
+    async def scenario():
+        controller = AdmissionController('test', concurrency=1, user_rate=10, max_queued_per_user=2)
+        controller.admit(9)
+        controller.admit(1)
+        controller.admit(1)
+        with pytest.raises(Rejected) as full:
+            controller.admit(1)
+        return full.value
+
+    assert run(scenario()).retry_after is None
@@ -0,0 +1,15 @@
+import json
+
+from benchmarks.av_standin import StandinConfig, StandinState
+
+
+def test_full_daily_series_extends_compact():
+    state = StandinState(StandinConfig(synthetic=True))
+    compact = json.loads(state.payload('AAPL', 'TIME_SERIES_DAILY', 'compact'))['Time Series (Daily)']
+    full = json.loads(state.payload('AAPL', 'TIME_SERIES_DAILY', 'full'))
+    series = full['Time Series (Daily)']
+    assert len(compact) == 100 and len(series) > 252
+    assert {day: series[day] for day in compact} == compact
+    assert list(series) == sorted(series, reverse=True)
+    assert full['Meta Data']['4. Output Size'] == 'Full size'
+    assert state.payload('AAPL', 'TIME_SERIES_DAILY', 'full') is state.payload('AAPL', 'TIME_SERIES_DAILY', 'full')
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from backtest import Backtester, PriceHistory, evaluate
+
+
+def bars(*rows):
+    """('YYYY-MM-DD', close, high, low) rows as an Alpha Vantage daily series"""
+    return {day: {'4. close': str(close), '2. high': str(high), '3. low': str(low)}
+            for day, close, high, low in rows}
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def history(*rows):
+    prices = PriceHistory()
+    prices.merge(bars(*rows))
+    return prices
+
+
+def test_entry_waits_for_the_next_session_after_the_close():
+    prices = history(('2024-01-08', 10, 10, 10), ('2024-01-09', 12, 12, 12), ('2024-01-10', 13.2, 13.2, 13.2))
+    alerts = np.array([
+        utc(2024, 1, 8, 15),    # 10:00 ET: enters at Monday's close
+        utc(2024, 1, 8, 22),    # 17:00 ET: Monday's close already printed
+        utc(2024, 1, 9, 2),     # 21:00 ET Monday, though Tuesday in UTC
+    ])
+    result = evaluate(prices, alerts, horizons=(1,), max_hold=1)
+    assert result['returns'][:, 0] == pytest.approx([0.2, 0.1, 0.1])
+
+
+def test_target_stop_and_timeout_exits():
+    prices = history(
+        ('2024-01-08', 100, 100, 100),
+        ('2024-01-09', 101, 106, 99),      # Target touched
+        ('2024-01-10', 101, 101, 96),      # Stop touched
+        ('2024-01-11', 102, 102, 100),
+        ('2024-01-12', 102, 102, 101),
+    )
+    alerts = np.array([utc(2024, 1, 8, 15), utc(2024, 1, 9, 15), utc(2024, 1, 10, 15)])
+    result = evaluate(prices, alerts, horizons=(1, 2), target_pct=5, stop_pct=3, max_hold=2)
+    assert result['resolved'].tolist() == [True, True, True]
+    assert result['exit_return'] == pytest.approx([0.05, -0.03, 102 / 101 - 1])
+    assert result['win'].tolist() == [True, False, True]
+    assert result['settled'].tolist() == [True, True, True]
+
+
+def test_unsettled_alerts_wait_for_bars():
+    prices = history(('2024-01-08', 100, 100, 100), ('2024-01-09', 101, 101, 100))
+    result = evaluate(prices, np.array([utc(2024, 1, 8, 15)]), horizons=(1, 5), max_hold=5)
+    assert result['returns'][0, 0] == pytest.approx(0.01)
+    assert np.isnan(result['returns'][0, 1])
+    assert not result['resolved'][0] and not result['settled'][0]
+
+
+def test_backtester_stats_by_tier(tmp_path):
+    backtester = Backtester(horizons=(1,), target_pct=5, stop_pct=3, max_hold=1,
+                            cache_path=str(tmp_path / 'prices.npz'))
+    backtester.add_alerts([
+        {'id': 1, 'ticker': 'AAPL', 'score': 92, 'created_at': datetime(2024, 1, 8, 15)},
+        {'id': 2, 'ticker': 'TSLA', 'score': 80, 'created_at': datetime(2024, 1, 8, 15)},
+    ])
+    assert backtester.symbols_needing_bars(today=19733) == {'AAPL': 'compact', 'TSLA': 'compact'}
+    backtester.add_bars('AAPL', bars(('2024-01-08', 100, 100, 100), ('2024-01-09', 106, 106, 100)))
+    backtester.add_bars('TSLA', bars(('2024-01-08', 100, 100, 100), ('2024-01-09', 96, 100, 96)))
+
+    assert backtester.stats('critical')['win_rate'] == 100
+    assert backtester.stats('active')['wins'] == 0
+    assert backtester.stats()['sample_size'] == 2
+    assert backtester.stats_for_ids([1])['avg_gain'] == pytest.approx(5.0)
+
+    backtester.save()
+    restored = Backtester(cache_path=str(tmp_path / 'prices.npz'))
+    assert restored.load() == 2
+    assert restored.prices['AAPL'].close.tolist() == [100.0, 106.0]
@@ -0,0 +1,46 @@
+import time
+
+from circuit_breaker import CircuitBreaker, SharedCircuitBreaker
+
+
+def test_opens_after_threshold_and_half_opens_after_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_threshold=2, cooldown=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    now[0] += 10
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()     # One trial at a time
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_shared_circuit_opens_for_every_process(tmp_path):
+    path = tmp_path / 'limits.db'
+    worker = SharedCircuitBreaker(path, 'alpha_vantage:GLOBAL_QUOTE', failure_threshold=1, cooldown=60)
+    bot = SharedCircuitBreaker(path, 'alpha_vantage:GLOBAL_QUOTE', failure_threshold=1, cooldown=60)
+    other = SharedCircuitBreaker(path, 'alpha_vantage:OVERVIEW', failure_threshold=1, cooldown=60)
+    worker.record_failure()
+    assert not bot.allow()
+    assert other.allow()
+
+
+def test_shared_circuit_closes_when_trial_succeeds(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    path = tmp_path / 'limits.db'
+    worker = SharedCircuitBreaker(path, 'av', failure_threshold=1, cooldown=60)
+    bot = SharedCircuitBreaker(path, 'av', failure_threshold=1, cooldown=60)
+    other = SharedCircuitBreaker(path, 'av', failure_threshold=1, cooldown=60)
+    worker.record_failure()
+    now[0] += 30
+    bot.record_failure()        # Pushes the shared opening out to 1090
+    now[0] += 30
+    assert not other.allow()
+    assert worker.allow() and worker.state == 'half_open'
+    worker.record_success()
+    assert other.allow()
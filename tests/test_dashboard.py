@@ -0,0 +1,39 @@
+from dashboard import MoversBoard
+
+
+def test_top_orders_and_splits_by_sign():
+    board = MoversBoard(size=2)
+    for ticker, change in [('A', 5.0), ('B', -3.0), ('C', 9.0), ('D', 1.0), ('E', -7.0)]:
+        board.update(ticker, change, 10.0, as_of=1000)
+    gainers, losers = board.top(now=1000)
+    assert [t for t, _, _ in gainers] == ['C', 'A']
+    assert [t for t, _, _ in losers] == ['E', 'B']
+
+
+def test_update_replaces_previous_quote():
+    board = MoversBoard(size=3)
+    board.update('A', 5.0, 10.0, as_of=1000)
+    board.update('B', 2.0, 10.0, as_of=1000)
+    board.update('A', -4.0, 9.0, as_of=1000)
+    gainers, losers = board.top(now=1000)
+    assert gainers == [('B', 2.0, 10.0)]
+    assert losers == [('A', -4.0, 9.0)]
+
+
+def test_stale_quotes_expire():
+    board = MoversBoard(size=3, max_age=60)
+    board.update('OLD', 8.0, 1.0, as_of=0)
+    board.update('NEW', 3.0, 1.0, as_of=100)
+    gainers, _ = board.top(now=100)
+    assert [t for t, _, _ in gainers] == ['NEW']
+    assert len(board) == 1
+
+
+def test_top_is_repeatable_and_survives_compaction():
+    board = MoversBoard(size=5)
+    for i in range(500):
+        board.update(f'T{i % 20}', float(i % 37 - 18), 1.0, as_of=1000)
+    expected = sorted(((t, c) for t, (c, _, _, _) in board.latest.items() if c > 0), key=lambda m: -m[1])[:5]
+    for _ in range(3):
+        gainers, _ = board.top(now=1000)
+        assert [(t, c) for t, c, _ in gainers] == expected
@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Alert, AlertArchive, Base, Database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_READ_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('DATABASE_READ_PIN_SECONDS', '60')
+    database = Database()
+    Base.metadata.create_all(database.read_engine)   # An empty replica that never catches up
+    yield database
+    database.release()
+
+
+def in_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_writer_reads_its_own_writes_from_primary(db):
+    db.save_alert('AAPL', 80, {'score': 80}, 'momentum')
+    assert db.reader is db.session
+    assert [alert['ticker'] for alert in db.get_recent_alerts('AAPL')] == ['AAPL']
+
+
+def test_pin_does_not_leak_to_other_threads(db):
+    db.save_alert('AAPL', 80, {'score': 80}, 'momentum')
+    assert in_thread(lambda: db.reader is db.read_session)
+    assert in_thread(lambda: db.get_recent_alerts('AAPL')) == []
+
+
+def test_pin_can_be_carried_to_another_thread(db):
+    db.save_alert('AAPL', 80, {'score': 80}, 'momentum')
+    pinned_until = db.pinned_until
+
+    def read():
+        db.pin_reads(pinned_until)
+        try:
+            return len(db.get_recent_alerts('AAPL'))
+        finally:
+            db.release()
+    assert in_thread(read) == 1
+
+
+def test_release_drops_the_pin(db):
+    db.save_alert('AAPL', 80, {'score': 80}, 'momentum')
+    db.release()
+    assert db.pinned_until == 0.0
+    assert db.reader is db.read_session
+
+
+@pytest.fixture
+def primary(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.delenv('DATABASE_READ_URL', raising=False)
+    database = Database()
+    yield database
+    database.release()
+
+
+def test_archive_round_trip(primary):
+    ids = [primary.save_alert(f'T{i}', 70 + i, {'score': 70 + i, 'features': {'rsi': i}}, 'momentum')
+           for i in range(5)]
+    old = datetime.utcnow() - timedelta(days=40)
+    primary.session.query(Alert).filter(Alert.id.in_(ids[:4])).update({Alert.created_at: old})
+    primary.session.commit()
+
+    assert primary.archive_alert_payloads(days=30, segment_size=3) == 4
+    assert primary.session.query(AlertArchive).count() == 2
+    assert primary.session.query(Alert).filter(Alert.score_data.is_(None)).count() == 4
+    assert primary.archive_alert_payloads(days=30) == 0
+
+    assert primary.get_alert_payload(ids[1]) == {'score': 71, 'features': {'rsi': 1}}
+    assert primary.get_alert_payload(ids[4]) == {'score': 74, 'features': {'rsi': 4}}
+    assert primary.get_archived_payloads(ids) == {
+        alert_id: {'score': 70 + i, 'features': {'rsi': i}} for i, alert_id in enumerate(ids[:4])}
+    alerts = primary.get_alerts_since(0, include_score_data=True)
+    assert [alert['score_data']['score'] for alert in alerts] == [70, 71, 72, 73, 74]
+    assert len(primary.archive_cache) == 2
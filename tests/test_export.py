@@ -0,0 +1,85 @@
+import csv
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+import export
+from database import Alert, Database, TradeLog
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'swarm.db'}")
+    monkeypatch.delenv('DATABASE_READ_URL', raising=False)
+    database = Database()
+    yield database
+    database.release()
+
+
+def save_alerts(db, count, start=0):
+    return [db.save_alert(f'T{i}', 60 + i, {'score': 60 + i, 'confidence': 'HIGH', 'partial': ['news'],
+                                            'features': {'rsi': 40 + i}}, 'momentum')
+            for i in range(start, start + count)]
+
+
+def read_csv(path):
+    with gzip.open(path, 'rt', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_incremental_csv_export_with_archived_payloads(db, tmp_path):
+    ids = save_alerts(db, 5)
+    db.session.query(Alert).filter(Alert.id.in_(ids[:2])).update(
+        {Alert.created_at: datetime.utcnow() - timedelta(days=60)})
+    db.session.commit()
+    db.archive_alert_payloads(days=30)
+
+    out = tmp_path / 'out'
+    rows, path, watermark = export.export_table(db.engine, 'alerts', out, 'csv', batch_size=2,
+                                                archived=db.get_archived_payloads)
+    assert rows == 5 and watermark == [ids[-1]]
+    exported = read_csv(path)
+    assert [row['ticker'] for row in exported] == ['T0', 'T1', 'T2', 'T3', 'T4']
+    assert exported[0]['feature_rsi'] == '40.0'         # From the archive
+    assert exported[0]['partial'] == 'news' and exported[4]['confidence'] == 'HIGH'
+    assert not list(out.glob('*.part'))
+
+    assert export.export_table(db.engine, 'alerts', out, 'csv', watermark=watermark)[:2] == (0, None)
+    save_alerts(db, 2, start=5)
+    rows, path, watermark = export.export_table(db.engine, 'alerts', out, 'csv', watermark=watermark)
+    assert rows == 2 and [row['ticker'] for row in read_csv(path)] == ['T5', 'T6']
+
+
+def test_trade_logs_export_closed_trades_in_close_order(db, tmp_path):
+    day = datetime(2024, 1, 2)
+    db.session.add_all([
+        TradeLog(user_id='1', ticker='AAPL', entry_date=day, entry_price=10, shares=1,
+                 exit_date=day + timedelta(days=3), exit_price=11, pnl=1),
+        TradeLog(user_id='1', ticker='TSLA', entry_date=day, entry_price=10, shares=1,
+                 exit_date=day + timedelta(days=1), exit_price=9, pnl=-1),
+        TradeLog(user_id='2', ticker='SOFI', entry_date=day, entry_price=10, shares=1),
+    ])
+    db.session.commit()
+
+    rows, path, watermark = export.export_table(db.engine, 'trade_logs', tmp_path, 'csv')
+    assert [row['ticker'] for row in read_csv(path)] == ['TSLA', 'AAPL']
+    assert watermark[0] == day + timedelta(days=3)
+
+    watermarks = tmp_path / 'state.json'
+    export.save_watermarks(watermarks, {'trade_logs': watermark})
+    restored = export.load_watermarks(watermarks)['trade_logs']
+    assert export.export_table(db.engine, 'trade_logs', tmp_path, 'csv', watermark=restored)[0] == 0
+
+    rows, _, watermark = export.export_table(db.engine, 'trade_logs', tmp_path, 'csv', full=True)
+    assert rows == 3 and watermark is None      # Open trades can't be a keyset position
+
+
+def test_parquet_export_matches_schema(db, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    save_alerts(db, 3)
+    rows, path, _ = export.export_table(db.engine, 'alerts', tmp_path, 'parquet')
+    table = pq.read_table(path)
+    assert table.num_rows == 3
+    assert table.column_names == [name for name, _ in export.ALERT_COLUMNS]
+    assert table.column('feature_rsi').to_pylist() == [40.0, 41.0, 42.0]
@@ -0,0 +1,119 @@
+import json
+import random
+import time
+
+import indicators
+from indicators import IndicatorStore, RollingRange, SymbolIndicators
+
+
+def daily_series(days: int, start_close: float = 100.0):
+    """Alpha Vantage-shaped daily bars, oldest first by date"""
+    series = {}
+    day = time.mktime((2023, 1, 2, 12, 0, 0, 0, 0, -1))
+    close = start_close
+    for i in range(days):
+        date = time.strftime('%Y-%m-%d', time.localtime(day + i * 86400))
+        close += (i % 7) - 3
+        series[date] = {'1. open': str(close), '2. high': str(close + 2), '3. low': str(close - 2),
+                        '4. close': str(close), '5. volume': str(1000 + i)}
+    return series
+
+
+def test_failed_backfill_backs_off_without_blocking_others():
+    store = IndicatorStore()
+    store.update('BAD', daily_series(30))
+    store.update('GOOD', daily_series(30))
+    calls = []
+
+    def fetch(symbol, outputsize):
+        calls.append(symbol)
+        return None if symbol == 'BAD' else daily_series(300)
+
+    assert store.seed_pending(fetch, 1) == []
+    assert store.backing_off('BAD')
+    # BAD keeps its place in the queue but GOOD is next
+    assert store.seed_pending(fetch, 1) == ['GOOD']
+    assert store.seed_pending(fetch, 5) == []
+    assert calls == ['BAD', 'GOOD']
+    assert 'BAD' in store.pending_seed
+
+    later = time.time() + indicators.SEED_RETRY_SECONDS + 1
+    assert store.due_for_seed(now=later) == ['BAD']
+    store.backfill('BAD', fetch)
+    failures, retry_at = store.seed_failures['BAD']
+    assert failures == 2 and retry_at - time.time() > indicators.SEED_RETRY_SECONDS * 1.5
+
+
+def test_take_pending_hands_symbols_off():
+    store = IndicatorStore()
+    store.update('A', daily_series(30))
+    store.update('B', daily_series(30))
+    assert store.take_pending(1) == ['A']
+    assert list(store.pending_seed) == ['B']
+
+
+def test_load_keeps_seeded_and_newer_state(tmp_path):
+    path = tmp_path / 'state.json'
+    owner = IndicatorStore()
+    owner.seed('SEEDED', daily_series(300))
+    owner.update('SHORT', daily_series(40))
+    owner.save(path)
+
+    other = IndicatorStore()
+    other.update('SEEDED', daily_series(50))
+    other.update('SHORT', daily_series(60))
+    assert other.load(path) == 1
+    assert other.get('SEEDED').seeded
+    assert 'SEEDED' not in other.pending_seed
+    assert other.get('SHORT').last_date == max(daily_series(59))    # ours had newer bars
+
+    assert other.load_if_changed(path) == 0
+
+
+def test_rolling_range_matches_brute_force_across_snapshots():
+    rng = random.Random(7)
+    bars = [(rng.uniform(90, 110), rng.uniform(80, 95)) for _ in range(400)]
+    window = 30
+    rolling = RollingRange(window)
+    for i, (high, low) in enumerate(bars):
+        rolling.update(high, low)
+        if i % 50 == 0:     # Survives a JSON round-trip mid-stream
+            rolling = RollingRange.restore(json.loads(json.dumps(rolling.snapshot())))
+        recent = bars[max(0, i + 1 - window):i + 1]
+        assert rolling.high == max(h for h, _ in recent)
+        assert rolling.low == min(low for _, low in recent)
+        assert rolling.bars == len(recent)
+    assert rolling.full and len(rolling.highs) <= window
+
+
+def wilder_rsi(closes, period=14):
+    changes = [b - a for a, b in zip(closes, closes[1:])]
+    gain = sum(max(c, 0) for c in changes[:period]) / period
+    loss = sum(max(-c, 0) for c in changes[:period]) / period
+    for change in changes[period:]:
+        gain = (gain * (period - 1) + max(change, 0)) / period
+        loss = (loss * (period - 1) + max(-change, 0)) / period
+    return 100 - 100 / (1 + gain / loss)
+
+
+def test_symbol_indicators_resume_from_snapshot():
+    series = daily_series(260)
+    dates = sorted(series)
+    closes = [float(series[d]['4. close']) for d in dates[:-1]]    # Newest bar is held back
+
+    whole = SymbolIndicators('AAPL')
+    assert whole.update(series) == len(dates) - 1
+    assert whole.last_date == dates[-2]
+
+    part = SymbolIndicators('AAPL')
+    part.update({d: series[d] for d in dates[:121]})
+    part = SymbolIndicators.restore('AAPL', json.loads(json.dumps(part.snapshot())))
+    part.update(series)
+    assert part.snapshot() == whole.snapshot()
+
+    assert part.sma[20].value == sum(closes[-20:]) / 20
+    assert part.sma[200].value == sum(closes[-200:]) / 200
+    assert abs(part.rsi.value - wilder_rsi(closes)) < 1e-9
+    assert abs(part.rsi.peek(closes[-1] + 5) - wilder_rsi(closes + [closes[-1] + 5])) < 1e-9
+    assert part.volume.value == sum(1000 + i for i in range(239, 259)) / 20
+    assert part.update(series) == 0      # Nothing new
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2, claim_timeout=60)
+    yield queue
+    queue.close()
+
+
+def test_claim_by_priority_then_age(queue):
+    low = queue.enqueue('score', {'ticker': 'A'}, priority=5)
+    high = queue.enqueue('score', {'ticker': 'B'}, priority=1)
+    assert queue.claim('w1')['id'] == high
+    job = queue.claim('w1')
+    assert job['id'] == low and job['attempts'] == 1 and job['payload'] == {'ticker': 'A'}
+    assert queue.claim('w1') is None
+
+
+def test_dedupe_while_pending(queue):
+    assert queue.enqueue('score', {}, dedupe_key='k') is not None
+    assert queue.enqueue('score', {}, dedupe_key='k') is None
+
+
+def test_complete_delivers_result(queue):
+    job_id = queue.enqueue('score', {'ticker': 'A'})
+    queue.claim('w1')
+    assert queue.complete(job_id, {'score': 70}, 'w1')
+    [result] = queue.results()
+    assert result['status'] == 'done' and result['result'] == {'score': 70}
+    queue.mark_delivered([job_id])
+    assert queue.results() == []
+
+
+def test_fail_requeues_until_out_of_attempts(queue):
+    job_id = queue.enqueue('score', {})
+    job = queue.claim('w1')
+    assert queue.fail(job_id, 'boom', job['attempts'], 'w1')
+    job = queue.claim('w1')
+    assert job['attempts'] == 2
+    assert queue.fail(job_id, 'boom again', job['attempts'], 'w1')
+    assert queue.claim('w1') is None
+    [result] = queue.results()
+    assert result['status'] == 'failed' and result['error'] == 'boom again'
+
+
+def test_requeue_stale_then_fail(queue):
+    job_id = queue.enqueue('score', {})
+    queue.claim('w1')
+    queue.conn.execute('UPDATE jobs SET claimed_at = ?', (time.time() - 120,))
+    assert queue.requeue_stale() == 1
+    assert queue.claim('w2')['id'] == job_id
+
+    # The first worker's late result no longer counts
+    assert not queue.complete(job_id, {'score': 1}, 'w1')
+    assert not queue.fail(job_id, 'late', 1, 'w1')
+
+    queue.conn.execute('UPDATE jobs SET claimed_at = ?', (time.time() - 120,))
+    assert queue.requeue_stale() == 1
+    assert queue.claim('w3') is None
+    [result] = queue.results()
+    assert result['status'] == 'failed'
+
+
+def test_claim_only_given_kinds(queue):
+    queue.enqueue('seed_indicators', {'ticker': 'A'}, priority=0)
+    score = queue.enqueue('score', {'ticker': 'B'}, priority=5)
+    assert queue.claim('w1', kinds=['score'])['id'] == score
+    assert queue.claim('w1', kinds=['score']) is None
+    assert queue.claim('w2')['kind'] == 'seed_indicators'
@@ -0,0 +1,69 @@
+import pytest
+
+import market_data
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setattr(market_data, '_breakers', {})
+    monkeypatch.setattr(market_data, '_response_cache', market_data.OrderedDict())
+    return market_data.AlphaVantageProvider(api_key='test', request_delay=0, cache_ttls={})
+
+
+def serve(monkeypatch, responses):
+    calls = []
+
+    def get(url, params, timeout):
+        calls.append(params['symbol'])
+        return FakeResponse(responses.pop(0))
+    monkeypatch.setattr(market_data.requests, 'get', get)
+    return calls
+
+
+QUOTE = {'Global Quote': {'05. price': '10.0'}}
+NOTE = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute'}
+
+
+def test_single_throttle_keeps_circuit_closed(monkeypatch, provider):
+    calls = serve(monkeypatch, [NOTE, QUOTE])
+    assert provider.get_quote('AAPL') is None
+    assert provider.get_quote('MSFT') == QUOTE['Global Quote']
+    assert calls == ['AAPL', 'MSFT']
+    assert market_data.breaker_for('GLOBAL_QUOTE').state == 'closed'
+
+
+def test_repeated_throttles_open_circuit(monkeypatch, provider):
+    monkeypatch.setenv('CIRCUIT_FAILURES', '3')
+    calls = serve(monkeypatch, [NOTE, {'Information': 'rate limit'}, NOTE, QUOTE])
+    for symbol in ('A', 'B', 'C', 'D'):
+        provider.get_quote(symbol)
+    assert calls == ['A', 'B', 'C']
+    assert market_data.breaker_for('GLOBAL_QUOTE').state == 'open'
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        market_data.MarketDataProvider()
+
+
+def test_full_history_failures_leave_compact_circuit_closed(monkeypatch, provider):
+    premium = {'Information': 'This is a premium endpoint'}
+    daily = {'Meta Data': {}, 'Time Series (Daily)': {'2024-01-02': {'4. close': '1.0'}}}
+    calls = serve(monkeypatch, [premium, premium, premium, daily])
+    for symbol in ('A', 'B', 'C'):
+        assert provider.get_daily_data(symbol, 'full') is None
+    assert market_data.breaker_for('TIME_SERIES_DAILY', 'full').state == 'open'
+    assert provider.get_daily_data('D', 'full') is None     # circuit open, nothing sent
+    assert provider.get_daily_data('D') is not None
+    assert calls == ['A', 'B', 'C', 'D']
+    assert market_data.breaker_for('TIME_SERIES_DAILY', 'compact').state == 'closed'
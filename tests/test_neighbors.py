@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from neighbors import FEATURES, KDTree, NeighborIndex, feature_vector
+
+
+def brute_force(points, point, k):
+    distances = ((points - point) ** 2).sum(axis=1)
+    return sorted(distances.tolist())[:k]
+
+
+@pytest.mark.parametrize('count, leaf_size', [(1, 4), (50, 4), (1000, 16), (3000, 32)])
+def test_kdtree_matches_brute_force(count, leaf_size):
+    rng = np.random.default_rng(count)
+    points = rng.random((count, len(FEATURES)))
+    tree = KDTree(points, leaf_size)
+    for point in rng.random((20, len(FEATURES))):
+        for k in (1, 5, 40):
+            found = tree.query(point, k)
+            assert [d for d, _ in found] == pytest.approx(brute_force(points, point, k))
+            for distance, row in found:
+                assert ((points[row] - point) ** 2).sum() == pytest.approx(distance)
+
+
+def test_kdtree_handles_duplicates_and_empty():
+    assert KDTree(np.empty((0, len(FEATURES)))).query(np.zeros(len(FEATURES)), 3) == []
+    points = np.zeros((100, len(FEATURES)))
+    found = KDTree(points, 8).query(np.zeros(len(FEATURES)), 10)
+    assert len(found) == 10 and len({row for _, row in found}) == 10
+
+
+def setup(sec, technical, change=0.0):
+    return {'breakdown': {'sec': {'score': sec}, 'technical': {'score': technical}},
+            'features': {'change_percent': change}}
+
+
+def test_neighbor_index_covers_tree_and_buffer():
+    index = NeighborIndex(leaf_size=4)
+    index.load([{'id': i, 'score_data': setup(i % 40, i % 35)} for i in range(200)])
+    index.add(1000, setup(20, 20, 3.0))     # Buffered until the next rebuild
+    assert len(index.tree) == 200 and len(index) == 201
+
+    nearest = index.query(setup(20, 20, 3.0), k=3)
+    assert nearest[0] == (1000, 0.0)
+    assert all(alert_id != 1000 for alert_id, _ in index.query(setup(20, 20, 3.0), k=3, exclude=1000))
+
+    for i in range(63):     # 64 buffered with the one above
+        index.add(2000 + i, setup(0, 0))
+    assert len(index.tree) == len(index)     # Buffer folded into the tree
+
+
+def test_feature_vector_prefers_flat_fields_and_clips_volume():
+    vector = feature_vector({'sec_score': 20, 'breakdown': {'sec': {'score': 40}},
+                             'features': {'volume_ratio': 50}})
+    assert vector[0] == pytest.approx(0.5)
+    assert vector[4] == pytest.approx(1.0)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from news_engine import NewsEngine, NewsProvider
+
+
+class ListProvider(NewsProvider):
+    def __init__(self, items=None):
+        self.items = list(items or [])
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        time.sleep(0.01)
+        items, self.items = self.items, []
+        return items
+
+
+def headline(title, hours_ago, ticker='NVDA'):
+    return {'title': title, 'tickers': [ticker], 'published': time.time() - hours_ago * 3600}
+
+
+def engine(items=()):
+    return NewsEngine(provider=ListProvider(items), refresh_seconds=3600)
+
+
+def test_ingest_order_does_not_matter():
+    fresh = headline('NVDA beats estimates', 1)
+    old = headline('NVDA launches new chip', 48)
+    newest_first, oldest_first = engine(), engine()
+    newest_first.ingest([fresh, old])
+    oldest_first.ingest([old, fresh])
+    assert newest_first.snapshot('NVDA') == oldest_first.snapshot('NVDA')
+    assert newest_first.snapshot('NVDA')['mentions'] == 1
+    assert newest_first.score('NVDA') == oldest_first.score('NVDA')
+
+
+def test_window_and_baseline_expiry():
+    news = engine()
+    news.ingest([headline('NVDA falls', 200), headline('NVDA gains', 30), headline('NVDA gains', 2)])
+    stats = news.snapshot('NVDA')
+    assert stats['mentions'] == 1
+    # Only the 30h-old headline is left in the baseline (spread over six windows)
+    assert abs(stats['baseline'] - 1 / 6) < 1e-9
+
+
+def test_single_headline_is_not_a_spike():
+    news = engine([headline('NVDA surges on record profit', 1), headline('NVDA chip', 100)])
+    score, details = news.score('NVDA')
+    assert 'spike' not in details.lower()
+    assert details.startswith('1 mention')
+    assert score == 6
+
+
+def test_spike_needs_volume_over_baseline():
+    items = [headline(f'NVDA story {i}', 1) for i in range(6)] + [headline('NVDA old', 100)]
+    score, details = engine(items).score('NVDA')
+    assert details.startswith('News spike (6 mentions')
+    assert score >= 5
+
+
+def test_concurrent_refresh_fetches_once():
+    provider = ListProvider([headline('NVDA gains', 1)])
+    news = NewsEngine(provider=provider, refresh_seconds=3600)
+    threads = [threading.Thread(target=news.score, args=('NVDA',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert provider.calls == 1
+    assert news.snapshot('NVDA')['mentions'] == 1
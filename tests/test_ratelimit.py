@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from ratelimit import SharedTokenBucket, TokenBucket
+
+
+def test_burst_then_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=5, per=1.0)
+    assert all(bucket.try_acquire() for _ in range(5))
+    assert not bucket.try_acquire()
+    assert abs(bucket.delay() - 0.2) < 1e-9
+    now[0] += 0.5
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_refill_is_capped_at_burst(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=10, per=1.0, burst=3)
+    now[0] += 100
+    assert sum(bucket.try_acquire() for _ in range(10)) == 3
+
+
+def test_penalize_holds_refills(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=10, per=1.0)
+    bucket.penalize(2.0)
+    assert not bucket.try_acquire()
+    assert abs(bucket.delay() - 2.1) < 1e-9
+    now[0] += 1.0
+    assert not bucket.try_acquire()
+    now[0] += 1.1
+    assert bucket.try_acquire()
+
+
+def test_acquire_waits_for_tokens():
+    bucket = TokenBucket(rate=20, per=1.0, burst=1)
+
+    async def take(n):
+        started = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(take(4))
+    assert 0.12 <= elapsed < 1.0
+
+
+def test_shared_bucket_is_one_budget_across_connections(tmp_path):
+    path = tmp_path / 'limits.db'
+    bot = SharedTokenBucket(path, 'alpha_vantage', rate=1, per=60, burst=2)
+    worker = SharedTokenBucket(path, 'alpha_vantage', rate=1, per=60, burst=2)
+    assert bot.try_acquire()
+    assert worker.try_acquire()
+    assert not bot.try_acquire()
+    assert not worker.try_acquire()
+    assert SharedTokenBucket(path, 'other', rate=1, per=60).try_acquire()
+
+
+def test_shared_bucket_penalty_reaches_every_connection(tmp_path):
+    path = tmp_path / 'limits.db'
+    bot = SharedTokenBucket(path, 'alpha_vantage', rate=100, per=1)
+    worker = SharedTokenBucket(path, 'alpha_vantage', rate=100, per=1)
+    worker.penalize(30)
+    assert not bot.try_acquire()
+    assert bot._update(take=1) > 29
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from score_cache import ScoreCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+class Scorer:
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.fail = False
+
+    async def __call__(self, ticker):
+        self.calls.append(ticker)
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError('provider down')
+        return {'score': 60 + len(self.calls)}
+
+
+def test_fresh_stale_and_expired(clock):
+    async def run():
+        cache = ScoreCache(fresh_seconds=60, max_stale_seconds=600)
+        scorer = Scorer()
+        scorer.release.set()
+
+        assert await cache.get('AAPL', scorer) == ({'score': 61}, 0.0, False)
+        clock[0] += 30
+        assert await cache.get('AAPL', scorer) == ({'score': 61}, 30.0, False)
+        assert scorer.calls == ['AAPL']
+
+        clock[0] += 100     # Stale: served now, refreshed behind the caller
+        assert await cache.get('AAPL', scorer) == ({'score': 61}, 130.0, True)
+        await asyncio.sleep(0)
+        assert cache.peek('AAPL') == ({'score': 62}, 0.0)
+
+        clock[0] += 601     # Expired: the caller waits for a new score
+        assert await cache.get('AAPL', scorer) == ({'score': 63}, 0.0, False)
+    asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_computation(clock):
+    async def run():
+        cache = ScoreCache(fresh_seconds=60, max_stale_seconds=600)
+        scorer = Scorer()
+        waiting = [asyncio.create_task(cache.get('TSLA', scorer)) for _ in range(5)]
+        await asyncio.sleep(0)
+        scorer.release.set()
+        results = await asyncio.gather(*waiting)
+        assert scorer.calls == ['TSLA']
+        assert {result[0]['score'] for result in results} == {61}
+        assert not cache.inflight
+    asyncio.run(run())
+
+
+def test_failed_refresh_keeps_the_stale_entry(clock):
+    async def run():
+        cache = ScoreCache(fresh_seconds=60, max_stale_seconds=600)
+        scorer = Scorer()
+        scorer.release.set()
+        await cache.get('NVDA', scorer)
+        scorer.fail = True
+        clock[0] += 120
+        assert (await cache.get('NVDA', scorer))[2]
+        await asyncio.sleep(0)
+        assert cache.peek('NVDA')[0] == {'score': 61}
+        assert not cache.inflight
+
+        with pytest.raises(RuntimeError):
+            await cache.get('SOFI', scorer)
+    asyncio.run(run())
+
+
+def test_evicts_least_recently_stored_and_notifies(clock):
+    seen = []
+    cache = ScoreCache(max_entries=2, on_put=lambda ticker, data: seen.append(ticker))
+    for ticker in ('A', 'B', 'A', 'C'):
+        cache.put(ticker, {'score': 1})
+    assert list(cache.entries) == ['A', 'C']
+    assert seen == ['A', 'B', 'A', 'C']
+    cache.put('D', {'score': 1})
+    assert cache.peek('A') is None and len(cache) == 2
@@ -0,0 +1,59 @@
+import io
+import random
+
+import pytest
+
+from sec_analyzer import SEC_KEYWORDS, KeywordAutomaton, SecAnalyzer, normalize
+
+
+def naive_counts(keywords, data: bytes):
+    """Whole-word occurrences of each keyword, overlapping ones included"""
+    text = b' ' + normalize(data).strip() + b' '
+    counts = {}
+    for keyword in keywords:
+        pattern = b' ' + normalize(keyword.encode()).strip() + b' '
+        n, i = 0, text.find(pattern)
+        while i != -1:
+            n += 1
+            i = text.find(pattern, i + 1)
+        if n:
+            counts[keyword] = n
+    return counts
+
+
+def random_filing(rng: random.Random, words: int = 3000) -> bytes:
+    vocabulary = [w for k in SEC_KEYWORDS for w in k.split()] + ['the', 'company', 'reacquisition', 'fda']
+    separators = [' ', '  ', '\n', ', ', '. ', '-', '\t']
+    parts = []
+    for _ in range(words):
+        if rng.random() < 0.05:
+            word = rng.choice(list(SEC_KEYWORDS))
+        else:
+            word = rng.choice(vocabulary)
+        if rng.random() < 0.2:
+            word = word.upper()
+        parts.append(word + rng.choice(separators))
+    return ''.join(parts).encode()
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('chunk_size', [7, 64, 1 << 20])
+def test_scan_matches_naive_search(seed, chunk_size):
+    data = random_filing(random.Random(seed))
+    automaton = KeywordAutomaton(SEC_KEYWORDS)
+    counts = automaton.scan_stream(io.BytesIO(data), chunk_size=chunk_size)
+    found = {automaton.keywords[i]: n for i, n in counts.items()}
+    assert found == naive_counts(SEC_KEYWORDS, data)
+
+
+def test_whole_words_only():
+    automaton = KeywordAutomaton({'acquisition': 5})
+    assert automaton.scan_stream(io.BytesIO(b'Reacquisition of shares')) == {}
+    assert automaton.scan_stream(io.BytesIO(b'ACQUISITION.')) == {0: 1}
+
+
+def test_scan_file(tmp_path):
+    path = tmp_path / 'AAPL_8-K_20240102.txt'
+    path.write_bytes(b'Entry into a Definitive\nAgreement; going concern doubts')
+    analyzer = SecAnalyzer(filings_path=str(tmp_path))
+    assert analyzer.scan_file(path) == {'definitive agreement': 1, 'going concern': 1}
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import sec_index
+from sec_analyzer import SecAnalyzer
+from sec_index import SecIndex
+
+HEADER = b'CENTRAL INDEX KEY: 0000320193\nCONFORMED SUBMISSION TYPE: 8-K\nFILED AS OF DATE: 20240102\n'
+
+
+def write_filing(root, name, body, stamp=None):
+    path = root / name
+    path.write_bytes(body)
+    if stamp is not None:
+        os.utime(path, ns=(stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def filings(tmp_path):
+    root = tmp_path / 'chirp'
+    root.mkdir()
+    return root
+
+
+def make_index(tmp_path, filings):
+    return SecIndex(index_path=str(tmp_path / 'index'), analyzer=SecAnalyzer(filings_path=str(filings)))
+
+
+def test_builds_incrementally_and_resolves_ciks(tmp_path, filings):
+    write_filing(filings, 'AAPL_8-K_20240102.txt', HEADER + b'Entry into a definitive agreement')
+    write_filing(filings, 'TSLA_10-Q_20240105.txt', b'Raises going concern questions')
+    index = make_index(tmp_path, filings)
+    assert index.update() == 2
+    assert index.update() == 0      # Unchanged files aren't rescanned
+
+    [hit] = index.query('AAPL')
+    assert hit.form == '8-K' and hit.counts == {'definitive agreement': 1}
+    assert [h.counts for h in index.query('320193')] == [{'definitive agreement': 1}]
+    assert index.query('TSLA')[0].counts == {'going concern': 1}
+    assert index.query('MSFT') == []
+
+    write_filing(filings, 'AAPL_8-K_20240110.txt', b'No keywords here')
+    assert index.update() == 1
+    fresh = make_index(tmp_path, filings)      # Another process reading the manifest
+    assert [h.counts for h in fresh.query('AAPL')] == [{}, {'definitive agreement': 1}]
+
+
+def test_compaction_drops_superseded_filings(tmp_path, filings, monkeypatch):
+    monkeypatch.setattr(sec_index, 'MAX_SEGMENTS', 2)
+    write_filing(filings, 'TSLA_10-Q_20240105.txt', b'going concern')
+    index = make_index(tmp_path, filings)
+    index.update()
+    for version in range(1, 6):
+        write_filing(filings, 'AAPL_8-K_20240102.txt', b'tender offer ' * version, stamp=version * 10**9)
+        assert index.update() == 1
+
+    assert len(index.segments) <= 2
+    assert len(index.filings) <= 4      # Rescanned versions are pruned, not just hidden
+    assert sorted(p.name for p in index.index_path.glob('seg-*.bin')) == sorted(index.segments)
+    assert index.query('AAPL')[0].counts == {'tender offer': 5}
+    assert index.query('TSLA')[0].counts == {'going concern': 1}
+
+    reloaded = make_index(tmp_path, filings)
+    reloaded.load()
+    assert reloaded.filings == index.filings
+    assert reloaded.query('AAPL')[0].counts == {'tender offer': 5}
+
+
+def test_query_survives_compaction_by_another_process(tmp_path, filings, monkeypatch):
+    monkeypatch.setattr(sec_index, 'MAX_SEGMENTS', 1)
+    write_filing(filings, 'AAPL_8-K_20240102.txt', b'tender offer')
+    writer = make_index(tmp_path, filings)
+    writer.update()
+    reader = make_index(tmp_path, filings)
+    reader.load()       # Knows the segment list but hasn't opened any
+
+    write_filing(filings, 'AAPL_8-K_20240103.txt', b'merger agreement')
+    writer.update()     # Compacts and deletes the segment the reader is about to open
+    # The reader checked the manifest just before the writer replaced it
+    load = reader._load
+    monkeypatch.setattr(reader, '_load', lambda: monkeypatch.setattr(reader, '_load', load))
+    assert [h.counts for h in reader.query('AAPL')] == [{'merger agreement': 1}, {'tender offer': 1}]
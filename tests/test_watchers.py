@@ -0,0 +1,80 @@
+import asyncio
+
+from ratelimit import TokenBucket
+from watchers import WatcherIndex, WatchlistNotifier
+
+
+class HTTPError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(status)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FakeDM:
+    def __init__(self, user_id, inbox, failures):
+        self.user_id = user_id
+        self.inbox = inbox
+        self.failures = failures
+
+    async def send(self, content):
+        if self.failures.get(self.user_id):
+            raise self.failures[self.user_id].pop(0)
+        self.inbox.setdefault(self.user_id, []).append(content)
+
+
+def make_notifier(index, failures=None, **kwargs):
+    inbox, opened = {}, []
+    failures = failures or {}
+
+    async def open_dm(user_id):
+        opened.append(user_id)
+        return FakeDM(user_id, inbox, failures)
+    notifier = WatchlistNotifier(index, open_dm, bucket=TokenBucket(1000, 1.0), **kwargs)
+    return notifier, inbox, opened
+
+
+def test_watcher_index_add_remove_load():
+    index = WatcherIndex()
+    index.load([(1, 'AAPL'), ('2', 'AAPL'), (1, 'TSLA')])
+    assert index.watchers('AAPL') == {1, 2}
+    snapshot = index.watchers('AAPL')
+    index.add(3, 'AAPL')
+    index.remove(1, 'AAPL')
+    assert snapshot == {1, 2} and index.watchers('AAPL') == {2, 3}
+    index.remove(1, 'TSLA')
+    assert index.watchers('TSLA') == frozenset() and len(index) == 1
+
+
+def test_coalesces_alerts_into_one_dm_per_user():
+    async def run():
+        index = WatcherIndex()
+        index.load([(1, 'AAPL'), (1, 'TSLA'), (2, 'TSLA')])
+        notifier, inbox, opened = make_notifier(
+            index, coalesce_window=60, merge=lambda messages: ' + '.join(m.ticker for m in messages))
+        assert notifier.notify('AAPL', 'AAPL alert') == 1
+        assert notifier.notify('TSLA', 'TSLA alert') == 2
+        assert notifier.notify('NVDA', 'nobody watches') == 0
+        await notifier.drain(timeout=5)
+        assert inbox == {1: ['AAPL + TSLA'], 2: ['TSLA alert']}
+
+        notifier.notify('AAPL', 'again')
+        await notifier.drain(timeout=5)
+        assert inbox[1][-1] == 'again' and sorted(opened) == [1, 2]     # DM channels reused
+    asyncio.run(run())
+
+
+def test_rate_limits_retry_and_closed_dms_are_skipped():
+    async def run():
+        index = WatcherIndex()
+        index.load([(1, 'AAPL'), (2, 'AAPL')])
+        failures = {1: [HTTPError(429, retry_after=0.01)], 2: [HTTPError(403)]}
+        notifier, inbox, _ = make_notifier(index, failures, coalesce_window=0)
+        notifier.notify('AAPL', 'first')
+        await notifier.drain(timeout=5)
+        assert inbox == {1: ['first']}
+        assert notifier.unreachable == {2}
+        assert notifier.notify('AAPL', 'second') == 1       # User 2 isn't tried again
+        await notifier.drain(timeout=5)
+        assert inbox == {1: ['first', 'second']} and notifier.sent == 2
+    asyncio.run(run())
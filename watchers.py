@@ -0,0 +1,177 @@
+"""
+Watchlist Notifications
+Ticker -> watcher index and batched DM fan-out for alerts on watched tickers
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+import metrics
+from dispatcher import MAX_MESSAGE_LENGTH, OutboundMessage, default_merge
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class WatcherIndex:
+    """
+    In-memory reverse index of the watchlists table
+
+    Loaded once at startup and updated alongside every watchlist change, so
+    finding who watches a ticker is a dict lookup instead of a query per alert.
+    """
+
+    def __init__(self):
+        self.by_ticker: Dict[str, FrozenSet[int]] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.by_ticker)
+
+    def load(self, rows: Iterable[Tuple[int, str]]):
+        """Replace the index with (user_id, ticker) rows"""
+        by_ticker: Dict[str, set] = {}
+        for user_id, ticker in rows:
+            by_ticker.setdefault(ticker, set()).add(int(user_id))
+        with self.lock:
+            self.by_ticker = {ticker: frozenset(users) for ticker, users in by_ticker.items()}
+        logger.info(f'Loaded watchers for {len(self.by_ticker)} ticker(s)')
+
+    def add(self, user_id: int, ticker: str):
+        with self.lock:
+            self.by_ticker[ticker] = self.by_ticker.get(ticker, frozenset()) | {int(user_id)}
+
+    def remove(self, user_id: int, ticker: str):
+        with self.lock:
+            users = self.by_ticker.get(ticker, frozenset()) - {int(user_id)}
+            if users:
+                self.by_ticker[ticker] = users
+            else:
+                self.by_ticker.pop(ticker, None)
+
+    def watchers(self, ticker: str) -> FrozenSet[int]:
+        """Users watching a ticker (snapshot; safe to iterate while the index changes)"""
+        return self.by_ticker.get(ticker, frozenset())
+
+
+class WatchlistNotifier:
+    """
+    DMs alerts to everyone watching the ticker
+
+    Alerts are buffered for `coalesce_window` seconds and each user gets one DM
+    for everything that fired in that window (merged via `merge`). A batch is
+    sent with at most `concurrency` DMs in flight, each taking a token from
+    `bucket` (share the dispatcher's global bucket to stay under Discord's
+    bot-wide limit). 429s back the bucket off and retry; users with DMs closed
+    are remembered and skipped.
+    """
+
+    def __init__(self, index: WatcherIndex, open_dm: Callable[[int], Awaitable],
+                 bucket: TokenBucket = None, concurrency: int = 25, coalesce_window: float = 5.0,
+                 merge: Callable[[List[OutboundMessage]], str] = None, max_attempts: int = 3):
+        self.index = index
+        self.open_dm = open_dm
+        self.bucket = bucket or TokenBucket(40, 1.0)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.coalesce_window = coalesce_window
+        self.merge = merge or default_merge
+        self.max_attempts = max_attempts
+        self.pending: Dict[int, List[OutboundMessage]] = {}
+        self.flush_handle = None
+        self.deliveries = set()
+        self.dm_channels: Dict[int, object] = {}
+        self.unreachable = set()
+        self.sent = 0
+
+    def notify(self, ticker: str, content: str, summary: str = None, tier: str = 'active') -> int:
+        """Queue an alert for the ticker's watchers; returns how many were queued"""
+        users = self.index.watchers(ticker) - self.unreachable
+        if not users:
+            return 0
+        msg = OutboundMessage(content, tier, ticker=ticker, summary=summary)
+        for user_id in users:
+            self.pending.setdefault(user_id, []).append(msg)
+        if self.coalesce_window <= 0:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.coalesce_window, self.flush)
+        metrics.set_gauge('swarm_queue_depth', len(self.pending), queue='dm')
+        return len(users)
+
+    def flush(self):
+        """Start delivering everything buffered so far"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._deliver(batch))
+        self.deliveries.add(task)
+        task.add_done_callback(self.deliveries.discard)
+
+    async def _deliver(self, batch: Dict[int, List[OutboundMessage]]):
+        started = time.monotonic()
+        results = await asyncio.gather(*(self._send(user_id, messages) for user_id, messages in batch.items()))
+        metrics.set_gauge('swarm_queue_depth', len(self.pending), queue='dm')
+        logger.info(f'Sent {sum(results)}/{len(batch)} watchlist DMs in {time.monotonic() - started:.1f}s')
+
+    def _content(self, messages: List[OutboundMessage]) -> str:
+        if len(messages) == 1:
+            content = messages[0].content
+        else:
+            try:
+                content = self.merge(messages)
+            except Exception as e:
+                logger.error(f'Error merging {len(messages)} watchlist alerts: {e}')
+                content = default_merge(messages)
+        if len(content) > MAX_MESSAGE_LENGTH:
+            content = content[:MAX_MESSAGE_LENGTH - 1] + '…'
+        return content
+
+    async def _send(self, user_id: int, messages: List[OutboundMessage]) -> bool:
+        content = self._content(messages)
+        async with self.semaphore:
+            for attempt in range(self.max_attempts):
+                try:
+                    channel = self.dm_channels.get(user_id)
+                    if channel is None:
+                        await self.bucket.acquire()
+                        channel = self.dm_channels[user_id] = await self.open_dm(user_id)
+                    await self.bucket.acquire()
+                    with metrics.timed('discord_dm'):
+                        await channel.send(content=content)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    status = getattr(e, 'status', None)
+                    if status == 429:
+                        retry_after = float(getattr(e, 'retry_after', None) or 1.0)
+                        logger.warning(f'Rate limited sending DMs, retrying in {retry_after:.1f}s')
+                        self.bucket.penalize(retry_after)
+                        continue
+                    if status in (403, 404):
+                        # DMs closed or account gone; stop trying until restart
+                        self.unreachable.add(user_id)
+                        self.dm_channels.pop(user_id, None)
+                        metrics.inc('swarm_dms_total', outcome='unreachable')
+                        return False
+                    logger.error(f'Error sending watchlist DM to {user_id}: {e}')
+                    metrics.inc('swarm_dms_total', outcome='error')
+                    return False
+                else:
+                    self.sent += 1
+                    metrics.inc('swarm_dms_total', outcome='sent')
+                    return True
+
+        metrics.inc('swarm_dms_total', outcome='rate_limited')
+        return False
+
+    async def drain(self, timeout: float = None):
+        """Flush the buffer and wait for in-flight deliveries"""
+        self.flush()
+        if self.deliveries:
+            await asyncio.wait_for(asyncio.gather(*self.deliveries), timeout)
@@ -0,0 +1,182 @@
+"""
+SWARM Scoring Workers
+Process pool that scores tickers from the job queue, outside the Discord process
+
+Run alongside the bot started with SCORING_MODE=workers:
+
+    python workers.py --processes 4
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from typing import Callable, Dict
+
+import indicators
+import market_data
+from job_queue import JobQueue
+from log_config import setup_logging
+from sec_index import get_index
+from swarm_score import SwarmScore, flatten_score
+
+logger = logging.getLogger(__name__)
+
+IDLE_POLL_SECONDS = 1.0
+SUPERVISE_SECONDS = 30
+STATE_SYNC_SECONDS = 60    # How often indicator state is saved (owner) or reloaded (others)
+OWNER_INDEX = 0            # Worker that backfills indicators and owns INDICATOR_STATE_PATH
+
+
+def handle_score(scorer: SwarmScore, payload: Dict) -> Dict:
+    """Score one ticker; the result is the flat score_data the bot posts"""
+    score_data = flatten_score(scorer.calculate_swarm_score(payload['ticker']))
+    if payload.get('strategy'):
+        score_data['strategy'] = payload['strategy']
+    return score_data
+
+
+def handle_sec_index(scorer: SwarmScore, payload: Dict) -> Dict:
+    """Index filings CHIRP has written since the last pass"""
+    return {'indexed': get_index().update()}
+
+
+def handle_seed_indicators(scorer: SwarmScore, payload: Dict) -> Dict:
+    """Backfill a year of bars for a ticker another worker scored (owner only)"""
+    store = indicators.get_store()
+    ticker = payload['ticker']
+    state = store.get(ticker)
+    if state is not None and state.seeded:
+        return {'seeded': True}
+    if store.backing_off(ticker):
+        return {'seeded': False, 'backing_off': True}
+    return {'seeded': store.backfill(ticker, scorer.get_daily_data)}
+
+
+JOB_HANDLERS: Dict[str, Callable[[SwarmScore, Dict], Dict]] = {
+    'score': handle_score,
+    'sec_index': handle_sec_index,
+    'seed_indicators': handle_seed_indicators,
+}
+OWNER_JOBS = {'seed_indicators'}
+
+
+def worker_main(index: int, stop, poll_interval: float = IDLE_POLL_SECONDS):
+    """
+    Claim and run jobs until `stop` is set
+
+    Worker OWNER_INDEX is the only one that fetches full histories and writes
+    INDICATOR_STATE_PATH. The others hand symbols that need a backfill to it
+    as seed_indicators jobs and reload the file when it changes, so the API
+    quota is spent once per symbol and no worker overwrites another's state.
+    """
+    # One log file per process; RotatingFileHandler isn't safe across processes
+    log_file = os.getenv('LOG_FILE', 'swarm_bot.log')
+    if log_file:
+        root, ext = os.path.splitext(log_file)
+        os.environ['LOG_FILE'] = f'{root}.worker{index}{ext or ".log"}'
+    setup_logging()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor coordinates shutdown
+
+    name = f'{os.uname().nodename}:{os.getpid()}'
+    queue = JobQueue()
+    market_data.share_limits(queue.path)  # One API budget across the workers and the bot
+    scorer = SwarmScore()
+    store = indicators.get_store()
+    store.load()
+    owner = index == OWNER_INDEX
+    kinds = None if owner else [kind for kind in JOB_HANDLERS if kind not in OWNER_JOBS]
+    next_sync = time.monotonic() + STATE_SYNC_SECONDS
+    logger.info(f'Worker {index} ({name}) started' + (' (indicator owner)' if owner else ''))
+
+    while not stop.is_set():
+        if time.monotonic() >= next_sync:
+            next_sync = time.monotonic() + STATE_SYNC_SECONDS
+            if owner:
+                store.save()
+            else:
+                store.load_if_changed()
+
+        job = queue.claim(name, kinds)
+        if job is None:
+            # Idle: backfill one symbol's indicator history (or hand it to the owner), then wait
+            if owner:
+                if not store.seed_pending(scorer.get_daily_data, 1):
+                    stop.wait(poll_interval)
+            else:
+                for ticker in store.take_pending():
+                    queue.enqueue('seed_indicators', {'ticker': ticker}, 5, f'seed:{ticker}')
+                stop.wait(poll_interval)
+            continue
+
+        handler = JOB_HANDLERS.get(job['kind'])
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind {job['kind']!r}")
+            if not queue.complete(job['id'], handler(scorer, job['payload']), name):
+                logger.warning(f"Job {job['id']} was reclaimed while running; result discarded")
+                continue
+            logger.info(f"Job {job['id']} ({job['kind']} {job['payload'].get('ticker', '')}) "
+                        f"done in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            queue.fail(job['id'], traceback.format_exc(), job['attempts'], name)
+
+    if owner:
+        store.save()
+    queue.close()
+    logger.info(f'Worker {index} stopped')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run SWARM scoring workers')
+    parser.add_argument('--processes', type=int,
+                        default=int(os.getenv('SCORING_WORKERS', os.cpu_count() or 2)),
+                        help='Worker processes (default: SCORING_WORKERS or CPU count)')
+    args = parser.parse_args()
+
+    setup_logging()
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    queue = JobQueue()
+
+    def start(index):
+        process = context.Process(target=worker_main, args=(index, stop), name=f'swarm-worker-{index}')
+        process.start()
+        return process
+
+    workers = [start(i) for i in range(args.processes)]
+    logger.info(f'Started {len(workers)} scoring workers on {queue.path}')
+
+    # The handler only flips a thread-level flag: setting the shared
+    # multiprocessing Event from inside a handler can deadlock its own wait()
+    stopping = threading.Event()
+
+    def shutdown(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while not stopping.wait(SUPERVISE_SECONDS):
+        queue.requeue_stale()
+        queue.purge()
+        for i, process in enumerate(workers):
+            if not process.is_alive():
+                logger.warning(f'Worker {i} exited with {process.exitcode}, restarting')
+                workers[i] = start(i)
+
+    logger.info('Stopping scoring workers')
+    stop.set()
+    for process in workers:
+        process.join(timeout=60)
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()